@@ -0,0 +1,38 @@
+"""add user_recommendation
+
+Revision ID: 4f6b2d8e9a17
+Revises: 9a4e2c7b1f38
+Create Date: 2026-10-16 14:37:05.183264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6b2d8e9a17'
+down_revision = '9a4e2c7b1f38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Precomputed top-N lists; the (user_id, rank) primary key serves the
+    # per-user lookup in rank order
+    op.create_table('user_recommendation',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('model_version', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('interaction_count', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['property_id'], ['property.property_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('user_recommendation')
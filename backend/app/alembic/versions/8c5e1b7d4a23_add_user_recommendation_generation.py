@@ -0,0 +1,28 @@
+"""add user_recommendation interactions_generation
+
+Revision ID: 8c5e1b7d4a23
+Revises: d41a8c6f2e95
+Create Date: 2026-10-17 09:41:18.226047
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8c5e1b7d4a23'
+down_revision = 'd41a8c6f2e95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Interaction store generation a list was scored from; existing lists
+    # are written again by the next precompute run
+    op.add_column('user_recommendation',
+                  sa.Column('interactions_generation', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('user_recommendation', 'interactions_generation')
@@ -0,0 +1,58 @@
+"""add recommendation event triggers
+
+Revision ID: 9a4e2c7b1f38
+Revises: 5365269226b1
+Create Date: 2026-10-16 09:12:44.512903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e2c7b1f38'
+down_revision = '5365269226b1'
+branch_labels = None
+depends_on = None
+
+# Row changes the recommendation service reacts to are published on this
+# channel as {"table", "op", "user_id", "property_id", "status"}.
+CHANNEL = 'recommendation_events'
+TABLES = ('wishlist', 'review', 'propertyview', 'viewingrequest', 'property')
+
+
+def upgrade():
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_recommendation_event() RETURNS trigger AS $$
+        DECLARE
+            row_data jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data := to_jsonb(OLD);
+            ELSE
+                row_data := to_jsonb(NEW);
+            END IF;
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'table', TG_TABLE_NAME,
+                'op', TG_OP,
+                'user_id', row_data->'user_id',
+                'property_id', row_data->'property_id',
+                'status', row_data->>'status'
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_recommendation_event
+            AFTER INSERT OR UPDATE OR DELETE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION notify_recommendation_event();
+        """)
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_recommendation_event ON "{table}";')
+    op.execute("DROP FUNCTION IF EXISTS notify_recommendation_event();")
@@ -0,0 +1,33 @@
+"""add property search sort indexes
+
+Revision ID: b7d3e5a1c402
+Revises: 4f6b2d8e9a17
+Create Date: 2026-10-16 17:05:31.648210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e5a1c402'
+down_revision = '4f6b2d8e9a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (sort field, property_id) in search order, so a keyset page is an
+    # index range scan however deep it is
+    op.create_index('ix_property_listed_at_property_id', 'property', ['listed_at', 'property_id'], unique=False)
+    op.create_index('ix_property_bedrooms_property_id', 'property', ['bedrooms', 'property_id'], unique=False)
+    op.create_index('ix_property_floor_area_property_id', 'property', ['floor_area', 'property_id'], unique=False)
+    op.create_index('ix_propertypricing_rent_price_property_id', 'propertypricing', ['rent_price', 'property_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_propertypricing_rent_price_property_id', table_name='propertypricing')
+    op.drop_index('ix_property_floor_area_property_id', table_name='property')
+    op.drop_index('ix_property_bedrooms_property_id', table_name='property')
+    op.drop_index('ix_property_listed_at_property_id', table_name='property')
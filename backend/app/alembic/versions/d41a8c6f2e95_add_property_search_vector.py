@@ -0,0 +1,114 @@
+"""add property search_vector
+
+Revision ID: d41a8c6f2e95
+Revises: b7d3e5a1c402
+Create Date: 2026-10-16 18:22:09.377514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a8c6f2e95'
+down_revision = 'b7d3e5a1c402'
+branch_labels = None
+depends_on = None
+
+# Must match SEARCH_CONFIG in app/crud/crud_property.py
+SEARCH_CONFIG = 'english'
+
+
+def upgrade():
+    op.add_column('property', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Title (A), feature names (B) and description (C) of one listing
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION property_search_document(
+            p_property_id integer, p_title text, p_description text
+        ) RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(p_title, '')), 'A')
+                || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+                       SELECT string_agg(f.feature_name, ' ')
+                       FROM propertyfeature pf JOIN feature f ON f.feature_id = pf.feature_id
+                       WHERE pf.property_id = p_property_id), '')), 'B')
+                || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(p_description, '')), 'C');
+        $$ LANGUAGE sql STABLE;
+    """)
+
+    # The listing's own columns, as it is written
+    op.execute("""
+        CREATE OR REPLACE FUNCTION property_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := property_search_document(NEW.property_id, NEW.title, NEW.description);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER property_search_vector
+        BEFORE INSERT OR UPDATE OF title, description ON property
+        FOR EACH ROW EXECUTE FUNCTION property_search_vector_update();
+    """)
+
+    # Features added to or removed from a listing, and renamed features
+    op.execute("""
+        CREATE OR REPLACE FUNCTION propertyfeature_search_vector_update() RETURNS trigger AS $$
+        DECLARE
+            changed_id integer;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed_id := OLD.property_id;
+            ELSE
+                changed_id := NEW.property_id;
+            END IF;
+            UPDATE property
+            SET search_vector = property_search_document(property_id, title, description)
+            WHERE property_id = changed_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER propertyfeature_search_vector
+        AFTER INSERT OR UPDATE OR DELETE ON propertyfeature
+        FOR EACH ROW EXECUTE FUNCTION propertyfeature_search_vector_update();
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION feature_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE property
+            SET search_vector = property_search_document(property_id, title, description)
+            WHERE property_id IN (
+                SELECT property_id FROM propertyfeature WHERE feature_id = NEW.feature_id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER feature_search_vector
+        AFTER UPDATE OF feature_name ON feature
+        FOR EACH ROW EXECUTE FUNCTION feature_search_vector_update();
+    """)
+
+    # Backfill without publishing a recommendation event per listing
+    op.execute("ALTER TABLE property DISABLE TRIGGER property_recommendation_event;")
+    op.execute("UPDATE property SET search_vector = property_search_document(property_id, title, description);")
+    op.execute("ALTER TABLE property ENABLE TRIGGER property_recommendation_event;")
+
+    op.create_index('ix_property_search_vector', 'property', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_property_search_vector', table_name='property', postgresql_using='gin')
+    op.execute("DROP TRIGGER IF EXISTS feature_search_vector ON feature;")
+    op.execute("DROP TRIGGER IF EXISTS propertyfeature_search_vector ON propertyfeature;")
+    op.execute("DROP TRIGGER IF EXISTS property_search_vector ON property;")
+    op.execute("DROP FUNCTION IF EXISTS feature_search_vector_update();")
+    op.execute("DROP FUNCTION IF EXISTS propertyfeature_search_vector_update();")
+    op.execute("DROP FUNCTION IF EXISTS property_search_vector_update();")
+    op.execute("DROP FUNCTION IF EXISTS property_search_document(integer, text, text);")
+    op.drop_column('property', 'search_vector')
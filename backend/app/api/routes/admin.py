@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func
 from app.api.deps import get_db_session, require_admin
+from app.core.gazetteer import refresh_gazetteer
 from app.models.models import User, Property
 from app.models.enums import UserRole
-from app.models.admin_schemas import AdminDashboardStats
+from app.models.admin_schemas import AdminDashboardStats, GazetteerRefreshResponse
 
 router = APIRouter(prefix="/admin")
 
@@ -46,4 +47,30 @@ async def get_dashboard_stats(
         raise HTTPException(
             status_code=500,
             detail=f"Error fetching dashboard stats: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+
+@router.post("/gazetteer/refresh", response_model=GazetteerRefreshResponse)
+def refresh_gazetteer_handler(
+    session: Session = Depends(get_db_session),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Reload the in-memory city/district/commune hierarchy after the reference
+    data has been changed in the database. The autocomplete index, which
+    also covers categories and features, is rebuilt on its next use; it
+    notices added or deleted categories and features by itself, but not
+    renamed ones.
+    """
+    try:
+        gazetteer = refresh_gazetteer(session)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error refreshing gazetteer: {str(e)}"
+        )
+    return GazetteerRefreshResponse(
+        cities=len(gazetteer.city_names),
+        districts=len(gazetteer.district_names),
+        communes=len(gazetteer.commune_names)
+    )
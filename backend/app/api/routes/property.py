@@ -18,7 +18,9 @@ from app.crud.crud_property import (
     get_related_properties,
     get_user_properties
 )
-from app.models.models import User, PropertyCategory, City, District, Commune, Feature
+from app.core.autocomplete import SUGGESTION_TYPES, get_autocomplete_index
+from app.core.gazetteer import get_gazetteer
+from app.models.models import User, PropertyCategory, Feature
 from app.models.property_schemas import (
     PropertyRead,
     PropertyCreate,
@@ -32,6 +34,7 @@ from app.models.property_schemas import (
     CategoryResponse,
     PropertyComparisonRequest,
     FeatureResponse,
+    AutocompleteSuggestion,
     PropertyStatsResponse,
     PropertyCountResponse
 )
@@ -209,7 +212,7 @@ def delete_existing_property(
 @router.get("/", response_model=PaginatedPropertyRead)
 def search_properties_handler(
     keyword: Optional[str] = Query(
-        None, description="Search title, description, or features"),
+        None, description="Search title, description, or features (supports \"quoted phrases\", or, -exclude)"),
     city_id: Optional[int] = Query(None, description="Filter by city ID"),
     district_id: Optional[int] = Query(
         None, description="Filter by district ID"),
@@ -218,16 +221,20 @@ def search_properties_handler(
     category_id: Optional[int] = Query(
         None, description="Filter by category ID"),
     sort_by: Optional[str] = Query(
-        None, description="Field to sort by (e.g., rent_price, bedrooms, floor_area, listed_at)"),
+        None, description="Field to sort by (rent_price, bedrooms, floor_area, listed_at, or relevance with a keyword)"),
     sort_order: Optional[str] = Query(
         None, description="Sort order (asc or desc)", regex="^(asc|desc)$"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
     limit: int = Query(10, ge=1, le=50, description="Pagination limit"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; replaces offset"),
+    include_total: bool = Query(
+        True, description="Count all matching properties (skip for infinite scroll)"),
     session: Session = Depends(get_db_session)
 ):
     logger.debug(
-        "Searching properties with keyword=%s, sort_by=%s, sort_order=%s, session=%s",
-        keyword, sort_by, sort_order, session)
+        "Searching properties with keyword=%s, sort_by=%s, sort_order=%s, cursor=%s, session=%s",
+        keyword, sort_by, sort_order, cursor, session)
     return search_properties(
         session=session,
         keyword=keyword,
@@ -238,7 +245,9 @@ def search_properties_handler(
         sort_by=sort_by,
         sort_order=sort_order,
         offset=offset,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total
     )
 
 
@@ -263,6 +272,43 @@ def compare_properties(
             status_code=500, detail=f"Error comparing properties: {str(e)}")
 
 
+@router.get("/filters/autocomplete", response_model=list[AutocompleteSuggestion])
+def autocomplete(
+    query: str = Query(..., min_length=1, max_length=100,
+                       description="Partial, possibly misspelled name"),
+    types: str | None = Query(
+        None, description="Comma-separated suggestion types (city, district, commune, category, feature)"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    session: Session = Depends(get_db_session)
+):
+    """
+    Suggest cities, districts, communes, categories and features whose names
+    start with or resemble the query, best match first.
+    """
+    logger.debug("Autocomplete query=%s, types=%s, session=%s", query, types, session)
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    if type_list and not set(type_list) <= set(SUGGESTION_TYPES):
+        raise HTTPException(
+            status_code=400, detail=f"Invalid types. Must be among {list(SUGGESTION_TYPES)}")
+    try:
+        suggestions = get_autocomplete_index(session).search(query, limit=limit, types=type_list)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch suggestions: {str(e)}")
+    return [
+        AutocompleteSuggestion(
+            type=s.entry.type,
+            id=s.entry.id,
+            name=s.entry.name,
+            label=s.entry.label,
+            score=s.score,
+            city_id=s.entry.city_id,
+            district_id=s.entry.district_id
+        )
+        for s in suggestions
+    ]
+
+
 @router.get("/filters/cities", response_model=List[CityResponse])
 def get_cities(
     query: Optional[str] = Query(
@@ -271,12 +317,9 @@ def get_cities(
 ):
     logger.debug("Fetching cities with query=%s, session=%s", query, session)
     try:
-        statement = select(City)
-        if query:
-            statement = statement.where(City.city_name.ilike(f"%{query}%"))
-        statement = statement.order_by(City.city_name)
-        cities = session.exec(statement).all()
-        return [CityResponse(city_id=c.city_id, city_name=c.city_name) for c in cities]
+        gazetteer = get_gazetteer(session)
+        return [CityResponse(city_id=city_id, city_name=name)
+                for city_id, name in gazetteer.cities(query)]
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch cities: {str(e)}")
@@ -292,15 +335,11 @@ def get_districts(
     logger.debug("Fetching districts for city_id=%s, session=%s",
                  city_id, session)
     try:
-        if not session.exec(select(City).where(City.city_id == city_id)).first():
+        gazetteer = get_gazetteer(session, city_ids=[city_id])
+        if city_id not in gazetteer.city_names:
             raise HTTPException(status_code=400, detail="Invalid city_id")
-        statement = select(District).where(District.city_id == city_id)
-        if query:
-            statement = statement.where(
-                District.district_name.ilike(f"%{query}%"))
-        statement = statement.order_by(District.district_name)
-        districts = session.exec(statement).all()
-        return [DistrictResponse(district_id=d.district_id, district_name=d.district_name) for d in districts]
+        return [DistrictResponse(district_id=district_id, district_name=name)
+                for district_id, name in gazetteer.districts(city_id, query)]
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -319,15 +358,11 @@ def get_communes(
     logger.debug("Fetching communes for district_id=%s, session=%s",
                  district_id, session)
     try:
-        if not session.exec(select(District).where(District.district_id == district_id)).first():
+        gazetteer = get_gazetteer(session, district_ids=[district_id])
+        if district_id not in gazetteer.district_names:
             raise HTTPException(status_code=400, detail="Invalid district_id")
-        statement = select(Commune).where(Commune.district_id == district_id)
-        if query:
-            statement = statement.where(
-                Commune.commune_name.ilike(f"%{query}%"))
-        statement = statement.order_by(Commune.commune_name)
-        communes = session.exec(statement).all()
-        return [CommuneResponse(commune_id=c.commune_id, commune_name=c.commune_name) for c in communes]
+        return [CommuneResponse(commune_id=commune_id, commune_name=name)
+                for commune_id, name in gazetteer.communes(district_id, query)]
     except HTTPException as e:
         raise e
     except Exception as e:
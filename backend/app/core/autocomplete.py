@@ -0,0 +1,263 @@
+"""
+In-memory fuzzy autocomplete over cities, districts, communes, categories and
+features.
+
+Names are normalized (case, accents and punctuation folded) and indexed two
+ways: a sorted list of words for prefix matches, which is what short queries
+need, and posting lists of padded trigrams (as pg_trgm builds them) for typo
+tolerance. A suggestion's score is the best of its prefix score and the
+trigram similarity of the whole name to the query.
+
+The index is built from the gazetteer plus one query each for categories and
+features. It is rebuilt whenever the gazetteer is refreshed, and whenever
+the row count or highest ID of categories or features differs from the one
+it was built with, which one aggregate query checks per use; renaming a
+category or feature in place needs POST /api/admin/gazetteer/refresh.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+import weakref
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from sqlalchemy import func
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.gazetteer import Gazetteer, get_gazetteer
+from app.models.models import Feature, PropertyCategory
+
+SUGGESTION_TYPES = ("city", "district", "commune", "category", "feature")
+
+# Minimum trigram similarity of a fuzzy match (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Scores of prefix matches: the whole name, or one of its words
+NAME_PREFIX_SCORE = 1.0
+WORD_PREFIX_SCORE = 0.9
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase ``text``, strip accents and collapse everything else to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", ascii_text).strip()
+
+
+def trigrams(normalized: str) -> set:
+    """Trigrams of each word padded with two spaces in front and one behind."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class Entry:
+    type: str
+    id: int
+    name: str
+    label: str
+    normalized: str
+    city_id: int | None = None
+    district_id: int | None = None
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    entry: Entry
+    score: float
+
+
+class AutocompleteIndex:
+    """Prefix and trigram index over a fixed list of entries; never modified after construction."""
+
+    def __init__(self, entries: Sequence[Entry]):
+        self.entries = tuple(entries)
+        self._trigram_counts = [len(trigrams(e.normalized)) for e in self.entries]
+        postings: dict[str, list[int]] = {}
+        words = []
+        for k, entry in enumerate(self.entries):
+            for gram in trigrams(entry.normalized):
+                postings.setdefault(gram, []).append(k)
+            words.extend((word, k) for word in set(entry.normalized.split()))
+        self._postings = postings
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_entries = [k for _, k in words]
+        # Ties go to cities before districts before communes, then shorter names
+        self._tie_keys = [
+            (SUGGESTION_TYPES.index(e.type), len(e.name), e.name) for e in self.entries
+        ]
+
+    @classmethod
+    def build(
+        cls,
+        gazetteer: Gazetteer,
+        categories: Sequence[tuple[int, str]],
+        features: Sequence[tuple[int, str]],
+    ) -> "AutocompleteIndex":
+        entries = []
+        for city_id, name in gazetteer.city_names.items():
+            entries.append(
+                Entry(
+                    "city",
+                    city_id,
+                    name,
+                    f"{name} (city)",
+                    normalize(name),
+                    city_id=city_id,
+                )
+            )
+        for district_id, name in gazetteer.district_names.items():
+            city_id = gazetteer.district_city.get(district_id)
+            city = gazetteer.city_names.get(city_id)
+            label = f"{name} (district, {city})" if city else f"{name} (district)"
+            entries.append(
+                Entry(
+                    "district",
+                    district_id,
+                    name,
+                    label,
+                    normalize(name),
+                    city_id=city_id,
+                    district_id=district_id,
+                )
+            )
+        for commune_id, name in gazetteer.commune_names.items():
+            district_id = gazetteer.commune_district.get(commune_id)
+            city_id = gazetteer.district_city.get(district_id)
+            parents = [
+                p
+                for p in (
+                    gazetteer.district_names.get(district_id),
+                    gazetteer.city_names.get(city_id),
+                )
+                if p
+            ]
+            label = f"{name} ({', '.join(['commune'] + parents)})"
+            entries.append(
+                Entry(
+                    "commune",
+                    commune_id,
+                    name,
+                    label,
+                    normalize(name),
+                    city_id=city_id,
+                    district_id=district_id,
+                )
+            )
+        for category_id, name in categories:
+            entries.append(
+                Entry(
+                    "category", category_id, name, f"{name} (category)", normalize(name)
+                )
+            )
+        for feature_id, name in features:
+            entries.append(
+                Entry("feature", feature_id, name, f"{name} (feature)", normalize(name))
+            )
+        return cls(entries)
+
+    def _prefix_scores(self, query: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        # Prefix matches of the query's last, possibly unfinished, word
+        query_words = query.split()
+        last_word = query_words[-1]
+        start = bisect.bisect_left(self._words, last_word)
+        for i in range(start, len(self._words)):
+            if not self._words[i].startswith(last_word):
+                break
+            k = self._word_entries[i]
+            normalized = self.entries[k].normalized
+            if normalized.startswith(query):
+                scores[k] = NAME_PREFIX_SCORE
+            elif len(query_words) == 1 or f" {query}" in f" {normalized}":
+                scores[k] = max(scores.get(k, 0.0), WORD_PREFIX_SCORE)
+        return scores
+
+    def _trigram_scores(self, query: str) -> dict[int, float]:
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        scores = {}
+        for k, count in shared.items():
+            similarity = count / (len(query_grams) + self._trigram_counts[k] - count)
+            if similarity >= SIMILARITY_THRESHOLD:
+                scores[k] = similarity
+        return scores
+
+    def search(
+        self, query: str, limit: int = 10, types: Sequence[str] | None = None
+    ) -> list[Suggestion]:
+        """
+        Best ``limit`` suggestions for ``query``, highest score first; ties go
+        to cities before districts before communes, then shorter names.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        # One or two letters are only meaningful as a prefix
+        scores = self._trigram_scores(normalized) if len(normalized) >= 3 else {}
+        for k, score in self._prefix_scores(normalized).items():
+            scores[k] = max(scores.get(k, 0.0), score)
+        # An exact name beats every prefix of a longer one
+        for k in scores:
+            if self.entries[k].normalized == normalized:
+                scores[k] += 0.1
+
+        allowed = set(types) if types else None
+        ranked = heapq.nsmallest(
+            limit,
+            (k for k in scores if allowed is None or self.entries[k].type in allowed),
+            key=lambda k: (-scores[k], self._tie_keys[k]),
+        )
+        return [Suggestion(self.entries[k], round(scores[k], 4)) for k in ranked]
+
+
+def _table_version(session: Session) -> tuple:
+    """Row counts and highest IDs of categories and features."""
+    return tuple(
+        session.exec(
+            select(
+                select(func.count()).select_from(PropertyCategory).scalar_subquery(),
+                select(func.max(PropertyCategory.category_id)).scalar_subquery(),
+                select(func.count()).select_from(Feature).scalar_subquery(),
+                select(func.max(Feature.feature_id)).scalar_subquery(),
+            )
+        ).one()
+    )
+
+
+_lock = threading.Lock()
+# Engine -> (gazetteer and table version the index was built from, index)
+_indexes: "weakref.WeakKeyDictionary[Engine, tuple[Gazetteer, tuple, AutocompleteIndex]]" = weakref.WeakKeyDictionary()
+
+
+def get_autocomplete_index(session: Session) -> AutocompleteIndex:
+    """
+    The autocomplete index of the database behind ``session``, rebuilt when
+    its gazetteer, categories or features change.
+    """
+    gazetteer = get_gazetteer(session)
+    version = _table_version(session)
+    cached = _indexes.get(session.get_bind())
+    if cached is not None and cached[0] is gazetteer and cached[1] == version:
+        return cached[2]
+    categories = session.exec(
+        select(PropertyCategory.category_id, PropertyCategory.category_name)
+    ).all()
+    features = session.exec(select(Feature.feature_id, Feature.feature_name)).all()
+    index = AutocompleteIndex.build(gazetteer, categories, features)
+    with _lock:
+        _indexes[session.get_bind()] = (gazetteer, version, index)
+    return index
@@ -92,6 +92,10 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Minimum seconds between gazetteer reloads triggered by an unknown
+    # city, district or commune ID
+    GAZETTEER_RELOAD_INTERVAL_SECONDS: int = 60
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
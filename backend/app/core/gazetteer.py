@@ -0,0 +1,143 @@
+"""
+In-memory gazetteer of the city > district > commune hierarchy.
+
+The administrative hierarchy (seeded from app/data/cambodia_admin_nested.csv)
+almost never changes, so it is read once per database engine and served from
+memory instead of being queried for every property. A Gazetteer is never
+modified: refresh_gazetteer() swaps in a freshly loaded one. An ID missing
+from the loaded snapshot triggers at most one reload every
+GAZETTEER_RELOAD_INTERVAL_SECONDS, so rows added outside the app show up
+without a restart.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.models import City, Commune, District
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Gazetteer:
+    """
+    Names, parent links and children (sorted by name) of every city,
+    district and commune.
+    """
+    city_names: Mapping[int, str]
+    district_names: Mapping[int, str]
+    commune_names: Mapping[int, str]
+    district_city: Mapping[int, int]
+    commune_district: Mapping[int, int]
+    city_districts: Mapping[int, tuple[int, ...]]
+    district_communes: Mapping[int, tuple[int, ...]]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def load(cls, session: Session) -> "Gazetteer":
+        cities = session.exec(select(City.city_id, City.city_name)).all()
+        districts = session.exec(
+            select(District.district_id, District.city_id, District.district_name)).all()
+        communes = session.exec(
+            select(Commune.commune_id, Commune.district_id, Commune.commune_name)).all()
+
+        district_names = {d: name for d, _, name in districts}
+        commune_names = {c: name for c, _, name in communes}
+        city_districts = {}
+        for district_id, city_id, _ in districts:
+            city_districts.setdefault(city_id, []).append(district_id)
+        district_communes = {}
+        for commune_id, district_id, _ in communes:
+            district_communes.setdefault(district_id, []).append(commune_id)
+
+        return cls(
+            city_names=MappingProxyType(dict(cities)),
+            district_names=MappingProxyType(district_names),
+            commune_names=MappingProxyType(commune_names),
+            district_city=MappingProxyType({d: c for d, c, _ in districts}),
+            commune_district=MappingProxyType({c: d for c, d, _ in communes}),
+            city_districts=MappingProxyType({
+                c: tuple(sorted(ids, key=district_names.__getitem__))
+                for c, ids in city_districts.items()}),
+            district_communes=MappingProxyType({
+                d: tuple(sorted(ids, key=commune_names.__getitem__))
+                for d, ids in district_communes.items()}),
+        )
+
+    def cities(self, query: str | None = None) -> list[tuple[int, str]]:
+        """(city_id, city_name) sorted by name, optionally filtered by a partial name match."""
+        return _matching(self.city_names.items(), query)
+
+    def districts(self, city_id: int, query: str | None = None) -> list[tuple[int, str]]:
+        """(district_id, district_name) of a city, sorted by name."""
+        return _matching(
+            ((d, self.district_names[d]) for d in self.city_districts.get(city_id, ())), query)
+
+    def communes(self, district_id: int, query: str | None = None) -> list[tuple[int, str]]:
+        """(commune_id, commune_name) of a district, sorted by name."""
+        return _matching(
+            ((c, self.commune_names[c]) for c in self.district_communes.get(district_id, ())), query)
+
+    def has_all(
+        self,
+        city_ids: Iterable[int | None] = (),
+        district_ids: Iterable[int | None] = (),
+        commune_ids: Iterable[int | None] = ()
+    ) -> bool:
+        return (all(c is None or c in self.city_names for c in city_ids)
+                and all(d is None or d in self.district_names for d in district_ids)
+                and all(c is None or c in self.commune_names for c in commune_ids))
+
+
+def _matching(items: Iterable[tuple[int, str]], query: str | None) -> list[tuple[int, str]]:
+    # Same semantics as the ILIKE '%query%' filters it replaces
+    if query:
+        needle = query.casefold()
+        items = (item for item in items if needle in item[1].casefold())
+    return sorted(items, key=lambda item: item[1])
+
+
+_lock = threading.Lock()
+_gazetteers: "weakref.WeakKeyDictionary[Engine, Gazetteer]" = weakref.WeakKeyDictionary()
+
+
+def refresh_gazetteer(session: Session) -> Gazetteer:
+    """Reload the hierarchy from the database behind ``session``."""
+    gazetteer = Gazetteer.load(session)
+    with _lock:
+        _gazetteers[session.get_bind()] = gazetteer
+    logger.info(
+        "Loaded gazetteer: %d cities, %d districts, %d communes",
+        len(gazetteer.city_names), len(gazetteer.district_names), len(gazetteer.commune_names))
+    return gazetteer
+
+
+def get_gazetteer(
+    session: Session,
+    *,
+    city_ids: Iterable[int | None] = (),
+    district_ids: Iterable[int | None] = (),
+    commune_ids: Iterable[int | None] = ()
+) -> Gazetteer:
+    """
+    The cached gazetteer of the database behind ``session``, loading it on
+    first use.
+
+    If any of the given IDs is unknown, the gazetteer is reloaded, at most
+    once every GAZETTEER_RELOAD_INTERVAL_SECONDS.
+    """
+    gazetteer = _gazetteers.get(session.get_bind())
+    if gazetteer is None:
+        return refresh_gazetteer(session)
+    if (not gazetteer.has_all(city_ids, district_ids, commune_ids)
+            and time.monotonic() - gazetteer.loaded_at >= settings.GAZETTEER_RELOAD_INTERVAL_SECONDS):
+        return refresh_gazetteer(session)
+    return gazetteer
@@ -1,7 +1,11 @@
+import base64
+import json
 import logging
+from datetime import datetime
 from decimal import Decimal
 from sqlmodel import Session, select, func, delete
 from collections import defaultdict
+from app.core.gazetteer import Gazetteer, get_gazetteer
 from app.models.enums import UserRole, PropertyStatusEnum
 from app.models.property_schemas import (
     PropertyCreate, PropertyRead, PropertyUpdate,
@@ -14,11 +18,142 @@ from app.models.models import (
 )
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import Double, Float, case, cast, literal, or_, tuple_
+from sqlalchemy.orm import defer, joinedload
 from typing import Optional, List
 
 logger = logging.getLogger(__name__)
 
+
+def get_location_gazetteer(session: Session, locations: List[Optional[PropertyLocation]]) -> Gazetteer:
+    """
+    Get the gazetteer that names the given locations, reloading it if any of
+    their city, district or commune IDs is not in the cached one.
+    """
+    locations = [location for location in locations if location]
+    return get_gazetteer(
+        session,
+        city_ids=[location.city_id for location in locations],
+        district_ids=[location.district_id for location in locations],
+        commune_ids=[location.commune_id for location in locations]
+    )
+
+
+def build_location_read(
+    location: PropertyLocation,
+    gazetteer: Gazetteer,
+    unknown: Optional[str] = "Unknown"
+) -> PropertyLocationRead:
+    """
+    Build a PropertyLocationRead, naming its city, district and commune from
+    the gazetteer (``unknown`` for IDs it does not know).
+    """
+    return PropertyLocationRead(
+        location_id=location.location_id,
+        property_id=location.property_id,
+        city_id=location.city_id,
+        district_id=location.district_id,
+        commune_id=location.commune_id,
+        street_number=location.street_number,
+        latitude=location.latitude,
+        longitude=location.longitude,
+        city_name=gazetteer.city_names.get(location.city_id, unknown),
+        district_name=gazetteer.district_names.get(location.district_id, unknown),
+        commune_name=gazetteer.commune_names.get(location.commune_id, unknown)
+    )
+
+
+
+def build_property_reads(session: Session, property_ids: List[int]) -> List[PropertyRead]:
+    """
+    Build PropertyRead objects for the given property IDs in a fixed number
+    of queries, however many IDs there are.
+
+    The properties, their pricing, locations, media, features and categories
+    are each fetched with one IN query; location names come from the
+    gazetteer.
+
+    Args:
+        session: SQLModel database session.
+        property_ids: IDs of the properties to read.
+
+    Returns:
+        List of PropertyRead objects in the order of property_ids. IDs that
+        do not exist are skipped, and repeated IDs appear once.
+    """
+    property_ids = list(dict.fromkeys(property_ids))
+    if not property_ids:
+        return []
+
+    properties = {
+        p.property_id: p
+        for p in session.exec(
+            select(Property)
+            .where(Property.property_id.in_(property_ids))
+            .options(defer(Property.search_vector))).all()
+    }
+    if not properties:
+        return []
+    found_ids = list(properties)
+
+    pricings = {
+        pricing.property_id: pricing
+        for pricing in session.exec(
+            select(PropertyPricing).where(PropertyPricing.property_id.in_(found_ids))).all()
+    }
+    locations = {
+        location.property_id: location
+        for location in session.exec(
+            select(PropertyLocation).where(PropertyLocation.property_id.in_(found_ids))).all()
+    }
+    media = defaultdict(list)
+    for m in session.exec(
+            select(PropertyMedia)
+            .where(PropertyMedia.property_id.in_(found_ids))
+            .order_by(PropertyMedia.media_id)).all():
+        media[m.property_id].append(PropertyMediaRead.model_validate(m))
+    features = defaultdict(list)
+    for feature_property_id, feature in session.exec(
+            select(PropertyFeature.property_id, Feature)
+            .join(Feature, Feature.feature_id == PropertyFeature.feature_id)
+            .where(PropertyFeature.property_id.in_(found_ids))
+            .order_by(Feature.feature_id)).all():
+        features[feature_property_id].append(FeatureRead.model_validate(feature))
+    category_ids = {p.category_id for p in properties.values() if p.category_id is not None}
+    category_names = dict(session.exec(
+        select(PropertyCategory.category_id, PropertyCategory.category_name)
+        .where(PropertyCategory.category_id.in_(category_ids))).all()) if category_ids else {}
+    gazetteer = get_location_gazetteer(session, list(locations.values()))
+
+    property_reads = []
+    for property_id in property_ids:
+        p = properties.get(property_id)
+        if p is None:
+            continue
+        location = locations.get(property_id)
+        pricing = pricings.get(property_id)
+        property_reads.append(PropertyRead(
+            property_id=p.property_id,
+            title=p.title,
+            description=p.description,
+            bedrooms=p.bedrooms,
+            bathrooms=p.bathrooms,
+            land_area=p.land_area,
+            floor_area=p.floor_area,
+            status=p.status,
+            updated_at=p.updated_at,
+            listed_at=p.listed_at,
+            user_id=p.user_id,
+            category_name=category_names.get(p.category_id),
+            rating=p.rating,
+            pricing=PropertyPricingRead.model_validate(pricing) if pricing else None,
+            location=build_location_read(location, gazetteer) if location else None,
+            media=media[property_id],
+            features=features[property_id]
+        ))
+    return property_reads
+
+
 def get_user_properties(
     *,
     session: Session,
@@ -44,73 +179,11 @@ def get_user_properties(
             raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
 
         # Query properties for the user
-        statement = (
-            select(Property)
-            .where(Property.user_id == user_id)
-            .options(
-                selectinload(Property.property_location),
-                selectinload(Property.pricing),
-                selectinload(Property.features),
-                selectinload(Property.property_medias),
-                selectinload(Property.property_category)
-            )
-        )
-
-        properties = session.exec(statement).all()
-        logger.debug("Found %d properties for user_id=%d", len(properties), user_id)
-
-        # Convert to PropertyRead objects
-        property_reads = []
-        for p in properties:
-            location = p.property_location
-            city = session.exec(select(City).where(
-                City.city_id == location.city_id)).first() if location else None
-            district = session.exec(select(District).where(
-                District.district_id == location.district_id)).first() if location else None
-            commune = session.exec(select(Commune).where(
-                Commune.commune_id == location.commune_id)).first() if location else None
-
-            location_read = None
-            if location:
-                location_read = PropertyLocationRead(
-                    location_id=location.location_id,
-                    property_id=location.property_id,
-                    city_id=location.city_id,
-                    district_id=location.district_id,
-                    commune_id=location.commune_id,
-                    street_number=location.street_number,
-                    latitude=location.latitude,
-                    longitude=location.longitude,
-                    city_name=city.city_name if city else "Unknown",
-                    district_name=district.district_name if district else "Unknown",
-                    commune_name=commune.commune_name if commune else "Unknown"
-                )
+        property_ids = session.exec(
+            select(Property.property_id).where(Property.user_id == user_id)).all()
+        logger.debug("Found %d properties for user_id=%d", len(property_ids), user_id)
 
-            property_read = PropertyRead(
-                property_id=p.property_id,
-                title=p.title,
-                description=p.description,
-                bedrooms=p.bedrooms,
-                bathrooms=p.bathrooms,
-                land_area=p.land_area,
-                floor_area=p.floor_area,
-                status=p.status,
-                updated_at=p.updated_at,
-                listed_at=p.listed_at,
-                user_id=p.user_id,
-                category_name=p.property_category.category_name if p.property_category else None,
-                rating=p.rating,
-                pricing=PropertyPricingRead.model_validate(
-                    p.pricing) if p.pricing else None,
-                location=location_read,
-                media=[PropertyMediaRead.model_validate(
-                    m) for m in p.property_medias] if p.property_medias else [],
-                features=[FeatureRead.model_validate(
-                    f) for f in p.features] if p.features else []
-            )
-            property_reads.append(property_read)
-
-        return property_reads
+        return build_property_reads(session, property_ids)
 
     except HTTPException:
         raise
@@ -166,81 +239,20 @@ def get_related_properties(
 
         # Build query for related properties
         statement = (
-            select(Property)
+            select(Property.property_id)
             .join(PropertyLocation)
             .where(Property.property_id != property_id)  # Exclude target property
             .where(PropertyLocation.city_id == city_id)
             .where(Property.category_id == category_id)
             .where(Property.status == PropertyStatusEnum.available)
-            .options(
-                selectinload(Property.property_location),
-                selectinload(Property.pricing),
-                selectinload(Property.features),
-                selectinload(Property.property_medias),
-                joinedload(Property.property_category)
-            )
             .order_by(Property.listed_at.desc())  # Most recent first
             .limit(limit)
         )
 
-        properties = session.exec(statement).all()
-        logger.debug("Query returned %d properties", len(properties))
-
-        # Convert to PropertyRead objects
-        property_reads = []
-        for p in properties:
-            try:
-                location = p.property_location
-                city = session.exec(select(City).where(
-                    City.city_id == location.city_id)).first() if location else None
-                district = session.exec(select(District).where(
-                    District.district_id == location.district_id)).first() if location else None
-                commune = session.exec(select(Commune).where(
-                    Commune.commune_id == location.commune_id)).first() if location else None
-
-                location_read = None
-                if location:
-                    location_read = PropertyLocationRead(
-                        location_id=location.location_id,
-                        property_id=location.property_id,
-                        city_id=location.city_id,
-                        district_id=location.district_id,
-                        commune_id=location.commune_id,
-                        street_number=location.street_number,
-                        latitude=location.latitude,
-                        longitude=location.longitude,
-                        city_name=city.city_name if city else "Unknown",
-                        district_name=district.district_name if district else "Unknown",
-                        commune_name=commune.commune_name if commune else "Unknown"
-                    )
-
-                property_read = PropertyRead(
-                    property_id=p.property_id,
-                    title=p.title,
-                    description=p.description,
-                    bedrooms=p.bedrooms,
-                    bathrooms=p.bathrooms,
-                    land_area=p.land_area,
-                    floor_area=p.floor_area,
-                    status=p.status,
-                    updated_at=p.updated_at,
-                    listed_at=p.listed_at,
-                    user_id=p.user_id,
-                    category_name=p.property_category.category_name if p.property_category else None,
-                    rating=p.rating,
-                    pricing=PropertyPricingRead.model_validate(
-                        p.pricing) if p.pricing else None,
-                    location=location_read,
-                    media=[PropertyMediaRead.model_validate(
-                        m) for m in p.property_medias] if hasattr(p, "property_medias") else [],
-                    features=[FeatureRead.model_validate(
-                        f) for f in p.features] if hasattr(p, "features") else []
-                )
-                property_reads.append(property_read)
-            except Exception as e:
-                logger.warning(f"Error processing property {p.property_id}: {e}")
-                continue
+        property_ids = session.exec(statement).all()
+        logger.debug("Query returned %d properties", len(property_ids))
 
+        property_reads = build_property_reads(session, property_ids)
         logger.debug("Returning %d related properties", len(property_reads))
         return property_reads
 
@@ -577,82 +589,26 @@ def get_property_detail_by_id(
     property_id: int,
     current_user: Optional[User] = None
 ) -> PropertyRead:
-    # Use selectinload for collections to avoid Cartesian product
-    statement = (
-        select(Property)
-        .where(Property.property_id == property_id)
-        .options(
-            joinedload(Property.property_category),
-            joinedload(Property.pricing),
-            joinedload(Property.property_location),
-            selectinload(Property.property_medias),
-            selectinload(Property.features)
-        )
-    )
-    result = session.exec(statement).unique().first()
-
-    if not result:
+    property_reads = build_property_reads(session, [property_id])
+    if not property_reads:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    property = result
+    property_read = property_reads[0]
 
     # Check required related objects
-    if not property.pricing:
+    if not property_read.pricing:
         raise HTTPException(status_code=500, detail="Missing pricing")
-    if not property.property_location:
+    if not property_read.location:
         raise HTTPException(status_code=500, detail="Missing location")
 
     # Check permissions based on status
-    # if property.status != PropertyStatusEnum.available:
-    #     if not current_user or (property.user_id != current_user.user_id and current_user.role != UserRole.admin):
+    # if property_read.status != PropertyStatusEnum.available:
+    #     if not current_user or (property_read.user_id != current_user.user_id and current_user.role != UserRole.admin):
     #         raise HTTPException(status_code=403, detail="Not authorized")
     #     if not current_user.is_active:
     #         raise HTTPException(status_code=403, detail="Account inactive")
 
-    # Build location response with names using the ids from PropertyLocation
-    location = property.property_location
-    city = session.exec(select(City).where(
-        City.city_id == location.city_id)).first()
-    district = session.exec(select(District).where(
-        District.district_id == location.district_id)).first()
-    commune = session.exec(select(Commune).where(
-        Commune.commune_id == location.commune_id)).first()
-
-    location_read = PropertyLocationRead(
-        location_id=location.location_id,
-        property_id=location.property_id,
-        city_id=location.city_id,
-        district_id=location.district_id,
-        commune_id=location.commune_id,
-        street_number=location.street_number,
-        latitude=location.latitude,
-        longitude=location.longitude,
-        city_name=city.city_name if city else "Unknown",
-        district_name=district.district_name if district else "Unknown",
-        commune_name=commune.commune_name if commune else "Unknown"
-    )
-
-    # Convert media and features to schemas
-    return PropertyRead(
-        property_id=property.property_id,
-        title=property.title,
-        description=property.description,
-        bedrooms=property.bedrooms,
-        bathrooms=property.bathrooms,
-        land_area=property.land_area,
-        floor_area=property.floor_area,
-        status=property.status,
-        updated_at=property.updated_at,
-        listed_at=property.listed_at,
-        user_id=property.user_id,
-        category_name=property.property_category.category_name,
-        rating=property.rating,
-        pricing=PropertyPricingRead.model_validate(property.pricing),
-        location=location_read,
-        media=[PropertyMediaRead.model_validate(
-            m) for m in property.property_medias],
-        features=[FeatureRead.model_validate(f) for f in property.features]
-    )
+    return property_read
 
 
 def get_property_media_by_id(*, session: Session, property_id: int) -> List[PropertyMediaRead]:
@@ -753,37 +709,105 @@ def get_property_locations_by_id(*, session: Session, property_id: Optional[int]
         HTTPException: 
             - 404 if the specified property ID is not found or has no associated location.
     """
-    statement = select(PropertyLocation, City, District, Commune).outerjoin(
-        City, PropertyLocation.city_id == City.city_id
-    ).outerjoin(
-        District, PropertyLocation.district_id == District.district_id
-    ).outerjoin(
-        Commune, PropertyLocation.commune_id == Commune.commune_id
-    )
+    statement = select(PropertyLocation)
     if property_id:
         statement = statement.where(
             PropertyLocation.property_id == property_id)
-    results = session.exec(statement).all()
-    if property_id and not results:
+    locations = session.exec(statement).all()
+    if property_id and not locations:
         raise HTTPException(
             status_code=404, detail=f"Property with ID {property_id} not found or has no location")
 
-    property_locations = []
-    for location, city, district, commune in results:
-        property_locations.append(PropertyLocationRead(
-            location_id=location.location_id,
-            property_id=location.property_id,
-            city_id=location.city_id,
-            district_id=location.district_id,
-            commune_id=location.commune_id,
-            street_number=location.street_number,
-            latitude=location.latitude,
-            longitude=location.longitude,
-            city_name=city.city_name if city else None,
-            district_name=district.district_name if district else None,
-            commune_name=commune.commune_name if commune else None
-        ))
-    return property_locations
+    gazetteer = get_location_gazetteer(session, locations)
+    return [build_location_read(location, gazetteer, unknown=None) for location in locations]
+
+
+SEARCH_SORT_FIELDS = {
+    'rent_price': PropertyPricing.rent_price,
+    'bedrooms': Property.bedrooms,
+    'floor_area': Property.floor_area,
+    'listed_at': Property.listed_at
+}
+
+# Text search configuration of Property.search_vector; the migration that
+# maintains it must use the same one
+SEARCH_CONFIG = 'english'
+
+
+def keyword_match(session: Session, keyword: str) -> tuple:
+    """
+    Build the (filter, relevance) expressions of a keyword search.
+
+    On PostgreSQL the keyword is parsed with websearch_to_tsquery (quoted
+    phrases, "or", "-excluded") and matched against the GIN-indexed
+    Property.search_vector, ranked by ts_rank. The rank is cast from real to
+    double precision, which the driver returns exactly, so a cursor holding
+    it compares equal to the server's value. Other databases fall back to
+    substring matches on the title, description and feature names, ranked
+    by which of them matched.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, keyword)
+        return (Property.search_vector.op("@@")(query),
+                cast(func.ts_rank(Property.search_vector, query), Double))
+
+    keyword_like = f"%{keyword}%"
+    title_match = Property.title.ilike(keyword_like)
+    feature_match = (
+        select(PropertyFeature.property_id)
+        .join(Feature, Feature.feature_id == PropertyFeature.feature_id)
+        .where(PropertyFeature.property_id == Property.property_id)
+        .where(Feature.feature_name.ilike(keyword_like))
+        .exists()
+    )
+    return (title_match | feature_match | Property.description.ilike(keyword_like),
+            case((title_match, 1.0), (feature_match, 0.4), else_=0.2).cast(Float))
+
+
+def encode_search_cursor(sort_by: Optional[str], sort_order: str, sort_value, property_id: int) -> str:
+    """
+    Encode the position after a search result row as an opaque cursor.
+
+    The cursor records the sort it was issued for, so it cannot be replayed
+    against a different ordering.
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, Decimal):
+        sort_value = str(sort_value)
+    payload = {"sort_by": sort_by, "sort_order": sort_order, "value": sort_value, "id": property_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str, sort_by: Optional[str], sort_order: str) -> tuple:
+    """
+    Decode a cursor from encode_search_cursor into (sort value, property_id);
+    the sort value is None if the row had no value for the sort field.
+
+    Raises:
+        HTTPException: If the cursor is malformed or was issued for another sort.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, property_id = payload["value"], int(payload["id"])
+        valid = payload["sort_by"] == sort_by and payload["sort_order"] == sort_order
+        if value is None:
+            # The page ended on a row without a sort key
+            valid = valid and sort_by is not None
+        elif sort_by == 'listed_at':
+            value = datetime.fromisoformat(value)
+        elif sort_by in ('rent_price', 'floor_area'):
+            value = Decimal(value)
+        elif sort_by == 'bedrooms':
+            value = int(value)
+        elif sort_by == 'relevance':
+            value = float(value)
+    except (ValueError, TypeError, KeyError, ArithmeticError):
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=400, detail="Invalid cursor for this sort order; restart from the first page")
+    return value, property_id
 
 
 def search_properties(
@@ -797,43 +821,53 @@ def search_properties(
     sort_by: Optional[str] = None,
     sort_order: Optional[str] = None,
     offset: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = True
 ) -> "PaginatedPropertyRead":  # Use string literal for forward reference
     """
     Search and filter properties by keyword, location, and property type with sorting.
+
+    ``sort_by='relevance'`` orders keyword matches best first (descending
+    unless sort_order says otherwise); see keyword_match.
+
+    Results are ordered by the sort field, then property_id, so every page
+    also carries a ``next_cursor``. Passing it back as ``cursor`` fetches the
+    next page by seeking past the last row instead of skipping ``offset``
+    rows, which costs the same on every page. ``include_total=False`` skips
+    the count query.
     """
     try:
-        valid_sort_fields = {
-            'rent_price': PropertyPricing.rent_price,
-            'bedrooms': Property.bedrooms,
-            'floor_area': Property.floor_area,
-            'listed_at': Property.listed_at
-        }
-
-        # Start with selecting Property, and potentially the sort column
-        # if it's not already part of the Property model.
-        # For 'rent_price', we need to explicitly select it if we are using DISTINCT.
-        select_columns = [Property]
-        if sort_by == 'rent_price':
-            # Add rent_price to the select list
-            select_columns.append(PropertyPricing.rent_price)
-
-        statement = select(*select_columns).join(PropertyLocation).join(PropertyPricing).options(
-            selectinload(Property.property_location),
-            selectinload(Property.pricing),
-            selectinload(Property.features),
-            selectinload(Property.property_medias),
-            joinedload(Property.property_category)
-        )
+        if sort_by and sort_by not in SEARCH_SORT_FIELDS and sort_by != 'relevance':
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid sort_by field. Must be one of {list(SEARCH_SORT_FIELDS.keys()) + ['relevance']}"
+            )
+        if sort_by == 'relevance' and not keyword:
+            raise HTTPException(
+                status_code=400, detail="sort_by=relevance requires a keyword")
+        if cursor and offset:
+            raise HTTPException(
+                status_code=400, detail="Use either cursor or offset, not both")
+        if sort_by == 'relevance' and not sort_order:
+            sort_order = 'desc'
+        sort_order = 'desc' if sort_order == 'desc' else 'asc'
 
+        keyword_filter = relevance = None
         if keyword:
-            keyword_like = f"%{keyword}%"
-            statement = statement.outerjoin(PropertyFeature).outerjoin(Feature)
-            statement = statement.where(
-                (Property.title.ilike(keyword_like)) |
-                (Property.description.ilike(keyword_like)) |
-                (Feature.feature_name.ilike(keyword_like))
-            )
+            keyword_filter, relevance = keyword_match(session, keyword)
+
+        # Select only the IDs of the page and the sort key; build_property_reads
+        # loads the rest. Without sort_by, property_id alone is the sort key
+        sort_columns = [Property.property_id]
+        if sort_by == 'relevance':
+            sort_columns.insert(0, relevance)
+        elif sort_by:
+            sort_columns.insert(0, SEARCH_SORT_FIELDS[sort_by])
+        statement = select(*sort_columns).join(PropertyLocation).join(PropertyPricing)
+
+        if keyword_filter is not None:
+            statement = statement.where(keyword_filter)
 
         if city_id:
             statement = statement.where(PropertyLocation.city_id == city_id)
@@ -847,100 +881,51 @@ def search_properties(
         if category_id:
             statement = statement.where(Property.category_id == category_id)
 
-        if sort_by:
-            if sort_by not in valid_sort_fields:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid sort_by field. Must be one of {list(valid_sort_fields.keys())}"
-                )
-            sort_column = valid_sort_fields[sort_by]
-            if sort_order == 'desc':
-                statement = statement.order_by(sort_column.desc())
+        # Get total count, over all pages
+        total_count = None
+        if include_total:
+            count_query = select(func.count()).select_from(statement.subquery())
+            result = session.exec(count_query).first()
+            total_count = result if result is not None else 0
+            if total_count == 0:
+                return PaginatedPropertyRead(total=0, properties=[])
+
+        # Seek past the cursor on (sort key, property_id); ascending, that is
+        # the order of the (column, property_id) indexes. NULL sort keys go
+        # last in either direction, and as a row-value comparison never
+        # matches them, they are added to every seek that starts before them
+        descending = sort_order == 'desc'
+        if cursor:
+            sort_value, last_id = decode_search_cursor(cursor, sort_by, sort_order)
+            id_after = Property.property_id < last_id if descending else Property.property_id > last_id
+            if not sort_by:
+                statement = statement.where(id_after)
+            elif sort_value is None:
+                statement = statement.where(sort_columns[0].is_(None), id_after)
             else:
-                statement = statement.order_by(sort_column.asc())
-
-        # Get total count
-        # For the count query, you might need a separate statement if the main statement
-        # has a complex distinct or eager loading that complicates counting.
-        # However, for this error, the count query itself isn't the problem.
-        # The subquery approach for count is generally robust.
-        count_query = select(func.count()).select_from(statement.subquery())
-        result = session.exec(count_query).first()
-        total_count = result if result is not None else 0
-
-        if total_count == 0:
-            return PaginatedPropertyRead(total=0, properties=[])
-
-        statement = statement.offset(offset).limit(limit)
-        # Apply distinct *after* ordering if you want the ordering to apply before distincting
-        # or, ensure the order by column is in the distinct selection
-        properties_raw = session.exec(statement).all()
-
-        # If you added PropertyPricing.rent_price to the select_columns,
-        # 'properties_raw' will contain tuples like (Property_object, rent_price).
-        # You'll need to adjust how you extract the Property object.
-        if sort_by == 'rent_price':
-            # Extract the Property object
-            properties = [item[0] for item in properties_raw]
-        else:
-            properties = properties_raw
-
-        property_reads = []
-        for p in properties:
-            try:
-                location = p.property_location
-                city = session.exec(select(City).where(
-                    City.city_id == location.city_id)).first() if location else None
-                district = session.exec(select(District).where(
-                    District.district_id == location.district_id)).first() if location else None
-                commune = session.exec(select(Commune).where(
-                    Commune.commune_id == location.commune_id)).first() if location else None
-
-                location_read = None
-                if location:
-                    location_read = PropertyLocationRead(
-                        location_id=location.location_id,
-                        property_id=location.property_id,
-                        city_id=location.city_id,
-                        district_id=location.district_id,
-                        commune_id=location.commune_id,
-                        street_number=location.street_number,
-                        latitude=location.latitude,
-                        longitude=location.longitude,
-                        city_name=city.city_name if city else "Unknown",
-                        district_name=district.district_name if district else "Unknown",
-                        commune_name=commune.commune_name if commune else "Unknown"
-                    )
-
-                property_read = PropertyRead(
-                    property_id=p.property_id,
-                    title=p.title,
-                    description=p.description,
-                    bedrooms=p.bedrooms,
-                    bathrooms=p.bathrooms,
-                    land_area=p.land_area,
-                    floor_area=p.floor_area,
-                    status=p.status,
-                    updated_at=p.updated_at,
-                    listed_at=p.listed_at,
-                    user_id=p.user_id,
-                    category_name=p.property_category.category_name if p.property_category else None,
-                    rating=p.rating,
-                    pricing=PropertyPricingRead.model_validate(
-                        p.pricing) if p.pricing else None,
-                    location=location_read,
-                    media=[PropertyMediaRead.model_validate(
-                        m) for m in p.property_medias] if hasattr(p, "property_medias") else [],
-                    features=[FeatureRead.model_validate(
-                        f) for f in p.features] if hasattr(p, "features") else []
-                )
-                property_reads.append(property_read)
-            except Exception as e:
-                # Log the specific error for debugging
-                print(f"Error processing property: {e}")
-                pass
-
-        return PaginatedPropertyRead(total=total_count, properties=property_reads)
+                sort_key = tuple_(*sort_columns)
+                position = tuple_(literal(sort_value, sort_columns[0].type),
+                                  literal(last_id, Property.property_id.type))
+                statement = statement.where(or_(
+                    sort_key < position if descending else sort_key > position, sort_columns[0].is_(None)))
+        order = [column.desc() if descending else column.asc() for column in sort_columns]
+        if sort_by:
+            order[0] = order[0].nulls_last()
+        statement = statement.order_by(*order)
+
+        # One extra row tells whether there is a next page
+        rows = session.exec(statement.offset(offset).limit(limit + 1)).all()
+        if not sort_by:
+            rows = [(property_id,) for property_id in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_search_cursor(sort_by, sort_order, rows[-1][0], rows[-1][-1])
+
+        property_reads = build_property_reads(session, [row[-1] for row in rows])
+        return PaginatedPropertyRead(total=total_count, properties=property_reads, next_cursor=next_cursor)
+    except HTTPException:
+        raise
     except SQLAlchemyError as e:
         # Log the SQLAlchemy error for more details
         print(f"SQLAlchemy Error: {e}")
@@ -1220,38 +1205,24 @@ def get_recommended_properties(
                 status_code=400, detail=f"Invalid status: {status}")
 
         # Build query (ignore status if not provided)
-        query = select(Property).where(Property.property_id.in_(property_ids))
+        query = select(Property.property_id).where(Property.property_id.in_(property_ids))
         if status:
             query = query.where(Property.status == status)
 
-        # Fetch properties
-        properties = session.exec(query).all()
+        # Fetch matching IDs
+        found_ids = set(session.exec(query).all())
 
         # Preserve order of property_ids and respect limit
-        ordered_properties = []
-        seen_ids = set()
-        for pid in property_ids:
-            if len(ordered_properties) >= limit:
-                break
-            for prop in properties:
-                if prop.property_id == pid and pid not in seen_ids:
-                    ordered_properties.append(prop)
-                    seen_ids.add(pid)
-                    break
-
-        # Convert to PropertyRead (reusing get_property_detail_by_id for consistency)
+        ordered_ids = [pid for pid in dict.fromkeys(property_ids) if pid in found_ids][:limit]
+
+        # Skip listings that could not be shown on their detail page
         result = []
-        for prop in ordered_properties:
-            try:
-                prop_read = get_property_detail_by_id(
-                    session=session,
-                    property_id=prop.property_id,
-                    current_user=None  # Public access, no user needed
-                )
-                result.append(prop_read)
-            except HTTPException as e:
+        for prop_read in build_property_reads(session, ordered_ids):
+            if not prop_read.pricing or not prop_read.location:
                 logger.warning(
-                    f"Skipping property {prop.property_id}: {e.detail}")
+                    f"Skipping property {prop_read.property_id}: missing pricing or location")
+                continue
+            result.append(prop_read)
 
         logger.debug("Fetched %d recommended properties", len(result))
         return result
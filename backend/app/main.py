@@ -1,10 +1,19 @@
+import logging
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.autocomplete import get_autocomplete_index
 from app.core.config import settings
+from app.core.db import sync_engine
+from app.core.gazetteer import refresh_gazetteer
+
+logger = logging.getLogger(__name__)
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +23,25 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm the gazetteer and the autocomplete index; if the database is not
+    # reachable yet they are loaded on first use instead
+    try:
+        with Session(sync_engine) as session:
+            refresh_gazetteer(session)
+            get_autocomplete_index(session)
+    except Exception as e:
+        logger.warning("Could not load the gazetteer at startup: %s", e)
+    yield
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -6,4 +6,9 @@ class AdminDashboardStats(BaseModel):
     totalPropertyOwners: int
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class GazetteerRefreshResponse(BaseModel):
+    cities: int
+    districts: int
+    communes: int
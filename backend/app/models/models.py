@@ -1,5 +1,6 @@
 from datetime import datetime, date
-from sqlalchemy import Column, DateTime, Integer, Text, CheckConstraint, Numeric, String, text, func, UniqueConstraint
+from sqlalchemy import Column, DateTime, Integer, Text, CheckConstraint, Numeric, String, text, func, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import SQLModel, Field, Relationship
 from decimal import Decimal
 from datetime import timezone
@@ -82,6 +83,9 @@ class PropertyMedia(SQLModel, table=True):
 
 
 class PropertyPricing(SQLModel, table=True):
+    # Keyset pagination of property search sorted by rent_price
+    __table_args__ = (Index(
+        "ix_propertypricing_rent_price_property_id", "rent_price", "property_id"),)
     pricing_id: Optional[int] = Field(default=None, primary_key=True)
     property_id: int = Field(
         foreign_key="property.property_id", unique=True, ondelete="CASCADE")
@@ -146,6 +150,13 @@ class Feature(SQLModel, table=True):
 
 
 class Property(SQLModel, table=True):
+    # Keyset pagination of property search by each sort field
+    __table_args__ = (
+        Index("ix_property_listed_at_property_id", "listed_at", "property_id"),
+        Index("ix_property_bedrooms_property_id", "bedrooms", "property_id"),
+        Index("ix_property_floor_area_property_id", "floor_area", "property_id"),
+        Index("ix_property_search_vector", "search_vector", postgresql_using="gin"),
+    )
     property_id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(
         default=None, foreign_key="user.user_id", index=True, ondelete="CASCADE")
@@ -171,6 +182,10 @@ class Property(SQLModel, table=True):
     )
     rating: Optional[Decimal] = Field(default=None, sa_column=Column(
         Numeric(4, 2)), description="Bayesian average rating based on reviews")
+    # Weighted title, feature names and description for keyword search,
+    # maintained by database triggers (see migration d41a8c6f2e95)
+    search_vector: Optional[str] = Field(default=None, sa_column=Column(
+        TSVECTOR().with_variant(Text(), "sqlite"), nullable=True))
     user: "User" = Relationship(back_populates="properties")
     property_category: "PropertyCategory" = Relationship(
         back_populates="properties")
@@ -243,6 +258,19 @@ class PropertyView(SQLModel, table=True):
     property: "Property" = Relationship(back_populates="views")
 
 
+class UserRecommendation(SQLModel, table=True):
+    """Precomputed top-N list, written nightly by the recommendation service."""
+    __tablename__ = "user_recommendation"
+    user_id: int = Field(foreign_key="user.user_id", primary_key=True, ondelete="CASCADE")
+    rank: int = Field(primary_key=True)
+    property_id: int = Field(foreign_key="property.property_id", ondelete="CASCADE")
+    score: float
+    model_version: str = Field(max_length=32)
+    interaction_count: int
+    interactions_generation: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    computed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
 # ---------------------
 # OPTIONAL TRACKING TABLES
 # Uncomment these if you decide to track more detailed user interactions.
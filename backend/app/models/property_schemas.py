@@ -191,7 +191,8 @@ class PropertyUpdate(SQLModel):
 
 
 class PropertyPricingRead(SQLModel):
-    rent_price: Decimal
+    # Nullable in the database, although PropertyPricingCreate requires it
+    rent_price: Optional[Decimal] = None
     electricity_price: Optional[Decimal] = None
     water_price: Optional[Decimal] = None
     other_price: Optional[Decimal] = None
@@ -244,13 +245,25 @@ class PropertyRead(SQLModel):
 
 
 class PaginatedPropertyRead(BaseModel):
-    total: int
+    # None when the count was not requested
+    total: Optional[int] = None
     properties: List[PropertyRead]
+    # Pass back as ``cursor`` for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 class FeatureResponse(BaseModel):
     feature_id: int
     feature_name: str
 
+class AutocompleteSuggestion(BaseModel):
+    type: str  # city, district, commune, category or feature
+    id: int
+    name: str
+    label: str  # e.g. "Chamkar Mon (district, Phnom Penh)"
+    score: float
+    city_id: int | None = None
+    district_id: int | None = None
+
 class PropertyStatsResponse(BaseModel):
     total_owned: int
     total_rented: int
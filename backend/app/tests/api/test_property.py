@@ -375,4 +375,28 @@ def test_get_categories_api(client, db_session, setup_common_data):
     response = client.get("/api/properties/filters/categories")
     assert response.status_code == 200
     assert len(response.json()) == 1
-    assert response.json()[0]["category_name"] == "Apartment"
\ No newline at end of file
+    assert response.json()[0]["category_name"] == "Apartment"
+
+def test_autocomplete_api(client, db_session, setup_common_data):
+    response = client.get("/api/properties/filters/autocomplete?query=ba dihn")
+    assert response.status_code == 200
+    suggestions = response.json()
+    assert suggestions[0]["type"] == "district"
+    assert suggestions[0]["label"] == "Ba Dinh (district, Hanoi)"
+    assert suggestions[0]["city_id"] == 1
+
+    response = client.get("/api/properties/filters/autocomplete?query=par&types=feature,category")
+    assert response.status_code == 200
+    assert [s["label"] for s in response.json()] == ["Parking (feature)"]
+
+    response = client.get("/api/properties/filters/autocomplete?query=x&types=street")
+    assert response.status_code == 400
+
+def test_autocomplete_api_sees_new_features(client, db_session, setup_common_data):
+    response = client.get("/api/properties/filters/autocomplete?query=balc&types=feature")
+    assert response.json() == []
+
+    db_session.add(Feature(feature_id=2, feature_name="Balcony"))
+    db_session.commit()
+    response = client.get("/api/properties/filters/autocomplete?query=balc&types=feature")
+    assert [s["label"] for s in response.json()] == ["Balcony (feature)"]
@@ -0,0 +1,145 @@
+"""Approximate nearest-neighbour retrieval over item content vectors.
+
+An IVF (inverted file) index in plain NumPy: the sparse content rows are
+mapped to a small dense space with a Gaussian random projection (which
+preserves cosine similarity up to small distortion), a spherical k-means
+coarse quantizer splits that space into ``n_lists`` cells, and every item
+is filed under its nearest centroid. A query only scores the centroids and
+reads the items of the closest few cells, so retrieval cost depends on the
+number of cells and candidates wanted, not on the catalog size. Candidates
+are meant to be re-scored exactly by the caller.
+"""
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+DTYPE = np.float32
+
+# Rows scored against the centroids per matrix product
+ASSIGN_CHUNK = 8192
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(points), dtype=np.int32)
+    for start in range(0, len(points), ASSIGN_CHUNK):
+        chunk = points[start:start + ASSIGN_CHUNK]
+        assignments[start:start + ASSIGN_CHUNK] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(points: np.ndarray, n_lists: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit-norm centroids of ``points`` (unit rows) maximising total cosine similarity."""
+    centroids = points[rng.choice(len(points), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(points, centroids)
+        members = sp.csr_matrix(
+            (np.ones(len(points), dtype=DTYPE), (assignments, np.arange(len(points)))),
+            shape=(n_lists, len(points)))
+        sums = members @ points
+        # Empty cells keep their previous centroid
+        filled = np.asarray(members.sum(axis=1)).ravel() > 0
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index from catalog rows to coarse cells.
+
+    ``assignments[row]`` is the cell of each catalog row, -1 for rows left
+    out (e.g. listings taken off the market). Rows can be added and removed
+    while searches run: the per-cell lists are rebuilt and swapped in whole.
+    """
+
+    def __init__(self, projection: np.ndarray, centroids: np.ndarray, assignments: np.ndarray):
+        self.projection = projection
+        self.centroids = centroids
+        self.assignments = assignments.astype(np.int32, copy=True)
+        self._lock = threading.Lock()
+        self._lists = self._build_lists(self.assignments)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.assignments >= 0))
+
+    def _build_lists(self, assignments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        indexed = np.flatnonzero(assignments >= 0)
+        order = indexed[np.argsort(assignments[indexed], kind="stable")]
+        offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments[indexed], minlength=self.n_lists), out=offsets[1:])
+        return order, offsets
+
+    def project(self, vectors) -> np.ndarray:
+        """Unit-norm projections of sparse or dense content vectors."""
+        return _normalize(np.asarray(vectors @ self.projection, dtype=DTYPE))
+
+    def add(self, rows: np.ndarray, vectors) -> None:
+        """File catalog ``rows`` (content ``vectors``, one per row) under their nearest cell."""
+        cells = _nearest(self.project(vectors), self.centroids)
+        with self._lock:
+            assignments = self.assignments
+            if len(rows) and rows.max() >= len(assignments):
+                assignments = np.concatenate(
+                    [assignments, np.full(rows.max() + 1 - len(assignments), -1, dtype=np.int32)])
+            else:
+                assignments = assignments.copy()
+            assignments[rows] = cells
+            self._lists = self._build_lists(assignments)
+            self.assignments = assignments
+
+    def remove(self, rows: np.ndarray) -> None:
+        with self._lock:
+            rows = rows[rows < len(self.assignments)]
+            assignments = self.assignments.copy()
+            assignments[rows] = -1
+            self._lists = self._build_lists(assignments)
+            self.assignments = assignments
+
+    def search(self, profiles, n_candidates: int, min_probes: int = 1) -> List[np.ndarray]:
+        """Catalog rows near each profile, from at least ``min_probes`` cells.
+
+        Cells are visited in order of centroid similarity until they hold
+        ``n_candidates`` rows. Profiles with no content get no candidates.
+        """
+        order, offsets = self._lists
+        queries = self.project(profiles)
+        sizes = np.diff(offsets)
+        ranked = np.argsort(-(queries @ self.centroids.T), axis=1)
+        results = []
+        for query, cells in zip(queries, ranked):
+            if not query.any():
+                results.append(np.zeros(0, dtype=np.int64))
+                continue
+            n_probes = max(min_probes, int(np.searchsorted(np.cumsum(sizes[cells]), n_candidates)) + 1)
+            results.append(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in cells[:n_probes]]))
+        return results
+
+
+def build_index(matrix: sp.csr_matrix, n_dimensions: int, n_lists: Optional[int] = None,
+                sample_size: int = 100000, iterations: int = 8, seed: int = 42) -> IVFIndex:
+    """Build an IVF index over the rows of ``matrix``.
+
+    ``n_lists`` defaults to 4 * sqrt(n_rows). The quantizer is trained on a
+    sample of at least 40 rows per cell; every row is then assigned.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = matrix.shape[0]
+    projection = rng.normal(0, 1 / np.sqrt(n_dimensions), (matrix.shape[1], n_dimensions)).astype(DTYPE)
+    points = _normalize(np.asarray(matrix @ projection, dtype=DTYPE))
+    n_lists = min(n_lists or max(1, int(4 * np.sqrt(n_rows))), max(n_rows, 1))
+    if n_rows == 0:
+        return IVFIndex(projection, np.zeros((1, n_dimensions), dtype=DTYPE), np.zeros(0, dtype=np.int32))
+    sample = points
+    if n_rows > max(sample_size, 40 * n_lists):
+        sample = points[rng.choice(n_rows, max(sample_size, 40 * n_lists), replace=False)]
+    centroids = spherical_kmeans(sample, n_lists, iterations, rng)
+    return IVFIndex(projection, centroids, _nearest(points, centroids))
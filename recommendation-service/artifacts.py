@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from ann import IVFIndex
+from config import MODEL_DIR, MODEL_KEEP_VERSIONS, MODEL_MMAP
+from profiles import UserProfiles
+
+logger = logging.getLogger(__name__)
+
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+# Sparse item features of versions written before they were stored as
+# separate CSR arrays
+ITEM_FEATURES_FILE = "item_features.npz"
+
+# Arrays of the sparse item feature matrix, saved as item_features_<name>.npy
+SPARSE_FIELDS = ("data", "indices", "indptr")
+
+# Dense arrays written as one .npy file each inside a version directory.
+# Every array file is a flat .npy that workers map read-only
+ARRAY_FIELDS = (
+    "item_ids",
+    "item_city_ids",
+    "item_norms",
+    "feature_ids",
+    "idf",
+    "numeric_mean",
+    "numeric_std",
+    "cf_user_ids",
+    "cf_item_ids",
+    "user_factors",
+    "item_factors",
+    "user_bias",
+    "item_bias",
+    "item_district_ids",
+    "item_prices",
+    "item_bedrooms",
+    "item_popularity",
+    "item_neighbors",
+    "item_neighbor_scores",
+)
+
+# Arrays of the content ANN index; absent in versions trained without one
+ANN_FIELDS = ("projection", "centroids", "assignments")
+
+# Stored user profiles, saved as profile_<name>.npy (sums as profile_sums_<name>.npy
+# CSR arrays); absent in versions trained before profiles were stored
+PROFILE_FIELDS = ("user_ids", "totals")
+
+# Arrays online updates write to in place; mapped copy-on-write, so a worker
+# only holds private copies of the pages it has changed
+WRITABLE_FIELDS = ("user_factors", "item_factors", "user_bias", "item_bias")
+
+
+@dataclass
+class HybridModel:
+    """Everything the request path needs to score a user without retraining.
+
+    Rows of ``item_features`` and ``item_norms`` line up with ``item_ids``
+    (the catalog that was available at training time). The collaborative factors are indexed by
+    ``cf_user_ids`` / ``cf_item_ids``, i.e. the raw ids seen in interactions.
+    ``interactions_generation`` / ``interactions_count`` identify the prefix
+    of the interaction store the factors and ``user_profiles`` were built
+    from. ``ann_index`` files catalog rows by content for candidate retrieval.
+    """
+    version: str
+    trained_at: str
+    item_ids: np.ndarray
+    item_city_ids: np.ndarray
+    item_features: sp.csr_matrix
+    item_norms: np.ndarray
+    feature_ids: np.ndarray
+    vocabulary: Dict[str, int]
+    idf: np.ndarray
+    numeric_mean: np.ndarray
+    numeric_std: np.ndarray
+    cf_user_ids: np.ndarray
+    cf_item_ids: np.ndarray
+    user_factors: np.ndarray
+    item_factors: np.ndarray
+    user_bias: np.ndarray
+    item_bias: np.ndarray
+    global_mean: float
+    rating_scale: Tuple[float, float] = (1.0, 5.0)
+    cf_engine: str = "svd"
+    interactions_generation: int = -1
+    interactions_count: int = 0
+    # Seconds each training stage took
+    training_seconds: Dict[str, float] = field(default_factory=dict)
+    ann_index: Optional[IVFIndex] = field(default=None, repr=False)
+    # Per-item attributes the candidate stage filters and ranks on; missing
+    # from older versions, which get neutral values
+    item_district_ids: Optional[np.ndarray] = field(default=None, repr=False)
+    item_prices: Optional[np.ndarray] = field(default=None, repr=False)
+    item_bedrooms: Optional[np.ndarray] = field(default=None, repr=False)
+    item_popularity: Optional[np.ndarray] = field(default=None, repr=False)
+    # Catalog rows (-1 padded) and scores of each item's co-occurrence
+    # neighbors, best first; older versions have none
+    item_neighbors: Optional[np.ndarray] = field(default=None, repr=False)
+    item_neighbor_scores: Optional[np.ndarray] = field(default=None, repr=False)
+    # Content profile of every user with interactions; computed per request
+    # when missing
+    user_profiles: Optional[UserProfiles] = field(default=None, repr=False)
+    # Built on first use by candidates.candidate_index
+    candidate_index: Any = field(init=False, default=None, repr=False, compare=False)
+    item_index: Dict[int, int] = field(init=False, repr=False)
+    cf_user_index: Dict[int, int] = field(init=False, repr=False)
+    cf_item_index: Dict[int, int] = field(init=False, repr=False)
+    item_cf_rows: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        n_items = len(self.item_ids)
+        if self.item_district_ids is None:
+            self.item_district_ids = np.full(n_items, -1, dtype=np.int64)
+        if self.item_prices is None:
+            self.item_prices = np.full(n_items, np.nan)
+        if self.item_bedrooms is None:
+            self.item_bedrooms = np.full(n_items, np.nan)
+        if self.item_popularity is None:
+            self.item_popularity = np.zeros(n_items)
+        if self.item_neighbors is None:
+            self.item_neighbors = np.full((n_items, 0), -1, dtype=np.int32)
+            self.item_neighbor_scores = np.zeros((n_items, 0), dtype=np.float32)
+        self.item_index = {int(pid): i for i, pid in enumerate(self.item_ids)}
+        self.cf_user_index = {int(uid): i for i, uid in enumerate(self.cf_user_ids)}
+        self.cf_item_index = {int(pid): i for i, pid in enumerate(self.cf_item_ids)}
+        # Row of each catalog item in the factor matrices, -1 if it has no interactions
+        self.item_cf_rows = np.array(
+            [self.cf_item_index.get(int(pid), -1) for pid in self.item_ids], dtype=np.int64)
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def save_model(model: HybridModel, model_dir: str = MODEL_DIR) -> str:
+    """Write ``model`` to ``model_dir/<version>`` and point LATEST at it.
+
+    The version directory is written under a temporary name and renamed into
+    place, so readers never observe a half-written model.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    final_path = os.path.join(model_dir, model.version)
+    tmp_path = final_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name in ARRAY_FIELDS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(model, name))
+    for name in SPARSE_FIELDS:
+        np.save(os.path.join(tmp_path, f"item_features_{name}.npy"), getattr(model.item_features, name))
+    if model.ann_index is not None:
+        for name in ANN_FIELDS:
+            np.save(os.path.join(tmp_path, f"ann_{name}.npy"), getattr(model.ann_index, name))
+    if model.user_profiles is not None:
+        for name in PROFILE_FIELDS:
+            np.save(os.path.join(tmp_path, f"profile_{name}.npy"), getattr(model.user_profiles, name))
+        for name in SPARSE_FIELDS:
+            np.save(os.path.join(tmp_path, f"profile_sums_{name}.npy"), getattr(model.user_profiles.sums, name))
+    meta = {
+        "version": model.version,
+        "trained_at": model.trained_at,
+        "global_mean": float(model.global_mean),
+        "rating_scale": list(model.rating_scale),
+        "vocabulary": model.vocabulary,
+        "n_items": int(len(model.item_ids)),
+        "item_features_shape": list(model.item_features.shape),
+        "n_cf_users": int(len(model.cf_user_ids)),
+        "n_cf_items": int(len(model.cf_item_ids)),
+        "cf_engine": model.cf_engine,
+        "interactions_generation": model.interactions_generation,
+        "interactions_count": model.interactions_count,
+        "training_seconds": model.training_seconds,
+    }
+    if model.user_profiles is not None:
+        meta["profile_sums_shape"] = list(model.user_profiles.sums.shape)
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    os.rename(tmp_path, final_path)
+    _write_latest(model_dir, model.version)
+    prune_versions(model_dir)
+    logger.info("Saved model version %s to %s", model.version, final_path)
+    return final_path
+
+
+def _write_latest(model_dir: str, version: str) -> None:
+    tmp = os.path.join(model_dir, LATEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(model_dir, LATEST_FILE))
+
+
+def latest_mtime(model_dir: str = MODEL_DIR) -> Optional[int]:
+    """Modification time of LATEST in ns; changes whenever a version is published."""
+    try:
+        return os.stat(os.path.join(model_dir, LATEST_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def latest_version(model_dir: str = MODEL_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(model_dir, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(model_dir: str = MODEL_DIR) -> list:
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(model_dir)
+        if os.path.isfile(os.path.join(model_dir, name, META_FILE))
+    )
+
+
+def prune_versions(model_dir: str = MODEL_DIR, keep: int = MODEL_KEEP_VERSIONS) -> None:
+    current = latest_version(model_dir)
+    for name in list_versions(model_dir)[:-keep or None]:
+        if name != current:
+            shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
+
+
+def _load_array(path: str, name: str, mmap: bool) -> np.ndarray:
+    mode = None
+    if mmap:
+        mode = "c" if name in WRITABLE_FIELDS else "r"
+    return np.load(path, mmap_mode=mode)
+
+
+def _load_item_features(path: str, meta: dict, mmap: bool) -> sp.csr_matrix:
+    if "item_features_shape" not in meta:
+        return sp.load_npz(os.path.join(path, ITEM_FEATURES_FILE)).tocsr()
+    parts = [_load_array(os.path.join(path, f"item_features_{name}.npy"), name, mmap) for name in SPARSE_FIELDS]
+    return sp.csr_matrix(tuple(parts), shape=tuple(meta["item_features_shape"]), copy=False)
+
+
+def _load_user_profiles(path: str, meta: dict, mmap: bool) -> Optional[UserProfiles]:
+    if "profile_sums_shape" not in meta:
+        return None
+    user_ids, totals = (_load_array(os.path.join(path, f"profile_{name}.npy"), name, mmap) for name in PROFILE_FIELDS)
+    parts = [_load_array(os.path.join(path, f"profile_sums_{name}.npy"), name, mmap) for name in SPARSE_FIELDS]
+    sums = sp.csr_matrix(tuple(parts), shape=tuple(meta["profile_sums_shape"]), copy=False)
+    return UserProfiles(user_ids, sums, totals)
+
+
+def load_model(version: Optional[str] = None, model_dir: str = MODEL_DIR,
+               mmap: bool = MODEL_MMAP) -> Optional[HybridModel]:
+    """Load ``version`` (default: the one LATEST points at), or None if absent.
+
+    With ``mmap`` the arrays are memory-mapped rather than read, so loading
+    is nearly free and workers of the same version share physical pages.
+    """
+    version = version or latest_version(model_dir)
+    if version is None:
+        return None
+    path = os.path.join(model_dir, version)
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = {name: _load_array(os.path.join(path, f"{name}.npy"), name, mmap) for name in ARRAY_FIELDS
+              if os.path.exists(os.path.join(path, f"{name}.npy"))}
+    ann_index = None
+    if os.path.exists(os.path.join(path, f"ann_{ANN_FIELDS[0]}.npy")):
+        ann_index = IVFIndex(*(_load_array(os.path.join(path, f"ann_{name}.npy"), name, mmap)
+                               for name in ANN_FIELDS))
+    return HybridModel(
+        version=meta["version"],
+        trained_at=meta["trained_at"],
+        item_features=_load_item_features(path, meta, mmap),
+        vocabulary=meta["vocabulary"],
+        global_mean=meta["global_mean"],
+        rating_scale=tuple(meta["rating_scale"]),
+        cf_engine=meta.get("cf_engine", "svd"),
+        interactions_generation=meta.get("interactions_generation", -1),
+        interactions_count=meta.get("interactions_count", 0),
+        training_seconds=meta.get("training_seconds", {}),
+        ann_index=ann_index,
+        user_profiles=_load_user_profiles(path, meta, mmap),
+        **arrays,
+    )
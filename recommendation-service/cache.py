@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+
+@dataclass
+class CacheEntry:
+    property_ids: List[int]
+    model_version: Optional[str]
+    computed_at: float
+    stale: bool = False
+
+
+class RecommendationCache:
+    """Per-user recommendation results, bounded by LRU and aged by TTL.
+
+    Entries older than ``ttl_seconds``, built by another model version, or
+    invalidated by an event are returned marked ``stale`` so the caller can
+    serve them while refreshing in the background. Past
+    ``ttl_seconds + max_stale_seconds`` an entry is dropped outright.
+
+    Invalidations are remembered (LRU-bounded as well) so a result computed
+    from data read before an invalidation is stored as stale, never fresh.
+    The clock is wall time so data timestamps written by other processes
+    (e.g. the interaction store's last ingest) can be compared against it.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float, max_stale_seconds: float,
+                 clock: Callable[[], float] = time.time):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._users_by_property: Dict[int, Set[int]] = {}
+        self._user_invalidated_at: "OrderedDict[int, float]" = OrderedDict()
+        self._property_invalidated_at: "OrderedDict[int, float]" = OrderedDict()
+        self._refreshing: Set[int] = set()
+
+    def now(self) -> float:
+        return self._clock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int, model_version: Optional[str]) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            age = self.now() - entry.computed_at
+            if age > self.ttl_seconds + self.max_stale_seconds:
+                self._remove(user_id)
+                return None
+            self._entries.move_to_end(user_id)
+            stale = entry.stale or age > self.ttl_seconds or entry.model_version != model_version
+            return CacheEntry(list(entry.property_ids), entry.model_version, entry.computed_at, stale)
+
+    def put(self, user_id: int, model_version: Optional[str], property_ids: List[int], started_at: float) -> None:
+        """Store a result whose inputs were read at ``started_at`` (a ``now()`` value)."""
+        with self._lock:
+            stale = self._user_invalidated_at.get(user_id, float("-inf")) >= started_at
+            kept = []
+            for property_id in property_ids:
+                if self._property_invalidated_at.get(property_id, float("-inf")) >= started_at:
+                    stale = True
+                else:
+                    kept.append(property_id)
+            self._remove(user_id)
+            self._entries[user_id] = CacheEntry(kept, model_version, started_at, stale)
+            for property_id in kept:
+                self._users_by_property.setdefault(property_id, set()).add(user_id)
+            while len(self._entries) > self.max_users:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._remember(self._user_invalidated_at, user_id)
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.stale = True
+
+    def invalidate_property(self, property_id: int) -> None:
+        """Drop a property that left the market from every cached result."""
+        with self._lock:
+            self._remember(self._property_invalidated_at, property_id)
+            for user_id in self._users_by_property.pop(property_id, set()):
+                entry = self._entries.get(user_id)
+                if entry is not None:
+                    entry.property_ids = [p for p in entry.property_ids if p != property_id]
+                    entry.stale = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._users_by_property.clear()
+
+    def try_begin_refresh(self, user_id: int) -> bool:
+        """Claim the background refresh for ``user_id``; False if one is already running."""
+        with self._lock:
+            if user_id in self._refreshing:
+                return False
+            self._refreshing.add(user_id)
+            return True
+
+    def end_refresh(self, user_id: int) -> None:
+        with self._lock:
+            self._refreshing.discard(user_id)
+
+    def _remember(self, invalidations: "OrderedDict[int, float]", key: int) -> None:
+        invalidations[key] = self.now()
+        invalidations.move_to_end(key)
+        while len(invalidations) > self.max_users:
+            invalidations.popitem(last=False)
+
+    def _remove(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        for property_id in entry.property_ids:
+            users = self._users_by_property.get(property_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._users_by_property[property_id]
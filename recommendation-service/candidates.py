@@ -0,0 +1,153 @@
+"""Candidate stage of the recommendation pipeline.
+
+The re-rank stage computes the full hybrid score, so it only sees the rows
+drawn for each user from a few cheap sources:
+
+- location: listings in the districts, then the cities, of the user's
+  interacted listings, most popular first
+- price band: listings within PRICE_BAND of the median rent among the
+  user's interacted listings, most popular first
+- popularity: the most popular listings overall
+- content: ANN neighbours of the user's content profile
+
+Hard constraints (city, budget, bedrooms) filter the catalog before any
+source runs.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifacts import HybridModel
+from config import ANN_CANDIDATES, ANN_MIN_ITEMS, ANN_MIN_PROBES, CANDIDATES_PER_SOURCE, PRICE_BAND
+
+
+@dataclass
+class Constraints:
+    """Hard filters from the request; ``None`` means unconstrained."""
+    city_id: Optional[int] = None
+    max_price: Optional[float] = None
+    min_bedrooms: Optional[int] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return self.city_id is None and self.max_price is None and self.min_bedrooms is None
+
+    def allows(self, model: HybridModel, rows: np.ndarray) -> np.ndarray:
+        keep = np.ones(len(rows), dtype=bool)
+        if self.city_id is not None:
+            keep &= model.item_city_ids[rows] == self.city_id
+        if self.max_price is not None:
+            keep &= model.item_prices[rows] <= self.max_price
+        if self.min_bedrooms is not None:
+            keep &= model.item_bedrooms[rows] >= self.min_bedrooms
+        return keep
+
+
+def _group(keys: np.ndarray, order: np.ndarray) -> Dict[int, np.ndarray]:
+    """Rows of each non-negative key, each group kept in ``order``."""
+    ordered_keys = keys[order]
+    grouping = np.argsort(ordered_keys, kind="stable")
+    rows, grouped_keys = order[grouping], ordered_keys[grouping]
+    unique_keys, starts = np.unique(grouped_keys, return_index=True)
+    ends = np.append(starts[1:], len(rows))
+    return {int(key): rows[start:end] for key, start, end in zip(unique_keys, starts, ends) if key >= 0}
+
+
+class CandidateIndex:
+    """Catalog rows pre-sorted for each source, for one size of a model's catalog."""
+
+    def __init__(self, model: HybridModel):
+        self.size = n_items = len(model.item_ids)
+        self.popularity = model.item_popularity[:n_items]
+        self.by_popularity = np.argsort(-self.popularity, kind="stable")
+        self.by_city = _group(model.item_city_ids[:n_items], self.by_popularity)
+        self.by_district = _group(model.item_district_ids[:n_items], self.by_popularity)
+        prices = model.item_prices[:n_items]
+        priced = np.flatnonzero(np.isfinite(prices) & (prices > 0))
+        self.by_price = priced[np.argsort(prices[priced], kind="stable")]
+        self.sorted_prices = prices[self.by_price]
+
+    def top(self, rows: np.ndarray, allowed: np.ndarray, k: int) -> np.ndarray:
+        """The first ``k`` of ``rows`` that are ``allowed``."""
+        return rows[allowed[rows]][:k]
+
+    def location(self, districts: np.ndarray, cities: np.ndarray, allowed: np.ndarray, k: int) -> np.ndarray:
+        empty = np.zeros(0, dtype=np.int64)
+        found = [self.top(self.by_district.get(int(d), empty), allowed, k) for d in districts]
+        found += [self.top(self.by_city.get(int(c), empty), allowed, k) for c in cities]
+        if not found:
+            return empty
+        # District matches come first; drop their repeats from the city lists
+        found = np.concatenate(found)
+        _, first = np.unique(found, return_index=True)
+        return found[np.sort(first)][:k]
+
+    def price_band(self, price: float, allowed: np.ndarray, k: int) -> np.ndarray:
+        lo, hi = np.searchsorted(self.sorted_prices, [price * (1 - PRICE_BAND), price * (1 + PRICE_BAND)])
+        band = self.by_price[lo:hi]
+        band = band[allowed[band]]
+        if len(band) > k:
+            band = band[np.argpartition(-self.popularity[band], k - 1)[:k]]
+        return band
+
+
+def candidate_index(model: HybridModel) -> CandidateIndex:
+    """The model's CandidateIndex, rebuilt whenever listings were added to or updated in its catalog."""
+    index = model.candidate_index
+    if index is None or index.size != len(model.item_ids):
+        index = CandidateIndex(model)
+        model.candidate_index = index
+    return index
+
+
+def generate_candidates(
+    model: HybridModel,
+    weights: sp.csr_matrix,
+    profiles: sp.csr_matrix,
+    rows: np.ndarray,
+    constraints: Optional[Constraints] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate rows for a group of users and which user each candidate belongs to.
+
+    ``weights`` holds each user's interactions over catalog rows and
+    ``profiles`` their content profiles; ``rows`` are the available rows.
+    Returns the sorted union of candidates and a (users x candidates) mask.
+    """
+    eligible = rows if constraints is None or constraints.is_empty else rows[constraints.allows(model, rows)]
+    n_users = weights.shape[0]
+    if len(eligible) <= ANN_MIN_ITEMS:
+        return eligible, np.ones((n_users, len(eligible)), dtype=bool)
+
+    index = candidate_index(model)
+    allowed = np.zeros(max(index.size, weights.shape[1]), dtype=bool)
+    allowed[eligible] = True
+    allowed[index.size:] = False
+    popular = index.top(index.by_popularity, allowed, CANDIDATES_PER_SOURCE)
+    ann_hits = None
+    if model.ann_index is not None:
+        ann_hits = model.ann_index.search(profiles, ANN_CANDIDATES, ANN_MIN_PROBES)
+
+    per_user: List[np.ndarray] = []
+    for u in range(n_users):
+        interacted = weights.indices[weights.indptr[u]:weights.indptr[u + 1]]
+        interacted = interacted[interacted < index.size]
+        districts = np.unique(model.item_district_ids[interacted])
+        cities = np.unique(model.item_city_ids[interacted])
+        sources = [popular, index.location(districts[districts >= 0], cities[cities >= 0],
+                                           allowed, CANDIDATES_PER_SOURCE)]
+        prices = model.item_prices[interacted]
+        prices = prices[np.isfinite(prices) & (prices > 0)]
+        if len(prices):
+            sources.append(index.price_band(float(np.median(prices)), allowed, CANDIDATES_PER_SOURCE))
+        if ann_hits is not None:
+            hits = ann_hits[u][ann_hits[u] < len(allowed)]
+            sources.append(hits[allowed[hits]])
+        per_user.append(np.unique(np.concatenate(sources)))
+
+    candidates = np.unique(np.concatenate(per_user))
+    membership = np.zeros((n_users, len(candidates)), dtype=bool)
+    for u, user_rows in enumerate(per_user):
+        membership[u, np.searchsorted(candidates, user_rows)] = True
+    return candidates, membership
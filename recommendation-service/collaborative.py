@@ -0,0 +1,199 @@
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from surprise import SVD, Dataset, Reader
+
+import als
+from artifacts import HybridModel
+from config import CF_ENGINE, ONLINE_SGD_EPOCHS
+from interaction_store import InteractionStore, StoreState, to_interactions
+from loader import Interactions
+
+logger = logging.getLogger(__name__)
+
+RATING_SCALE = (1.0, 5.0)
+
+# SGD hyperparameters shared by the offline fit and online updates
+# (surprise's SVD defaults)
+LEARNING_RATE = 0.005
+REGULARIZATION = 0.02
+INIT_STD = 0.1
+
+
+CF_ENGINES = ("svd", "als")
+
+
+def train_collaborative(interactions: Interactions, engine: str = CF_ENGINE) -> dict:
+    """Fit the ``engine`` collaborative model on the full interaction set and return its learned parameters."""
+    if engine not in CF_ENGINES:
+        raise ValueError(f"Unknown collaborative engine {engine!r}; expected one of {CF_ENGINES}")
+    if not len(interactions):
+        return {
+            "cf_user_ids": np.zeros(0, dtype=np.int64),
+            "cf_item_ids": np.zeros(0, dtype=np.int64),
+            "user_factors": np.zeros((0, 0)),
+            "item_factors": np.zeros((0, 0)),
+            "user_bias": np.zeros(0),
+            "item_bias": np.zeros(0),
+            "global_mean": 3.0 if engine == "svd" else 0.0,
+            "cf_engine": engine,
+        }
+    if engine == "als":
+        return als.train_als(interactions)
+    reader = Reader(rating_scale=RATING_SCALE)
+    data = Dataset.load_from_df(pd.DataFrame({
+        "user_id": interactions.user_ids,
+        "property_id": interactions.property_ids,
+        "rating": interactions.ratings,
+    }), reader)
+    trainset = data.build_full_trainset()
+    algo = SVD(lr_all=LEARNING_RATE, reg_all=REGULARIZATION, init_std_dev=INIT_STD, random_state=42)
+    algo.fit(trainset)
+    return {
+        "cf_user_ids": np.array([trainset.to_raw_uid(u) for u in range(trainset.n_users)], dtype=np.int64),
+        "cf_item_ids": np.array([trainset.to_raw_iid(i) for i in range(trainset.n_items)], dtype=np.int64),
+        "user_factors": algo.pu,
+        "item_factors": algo.qi,
+        "user_bias": algo.bu,
+        "item_bias": algo.bi,
+        "global_mean": float(trainset.global_mean),
+        "cf_engine": "svd",
+    }
+
+
+def predict_ratings(model: HybridModel, user_ids: List[int], rows: np.ndarray) -> np.ndarray:
+    """Estimated ratings of ``user_ids`` for the catalog items at ``rows``.
+
+    Same estimate as surprise's SVD.predict (global mean + biases + q_i.p_u,
+    clipped to the rating scale), computed as one (users x items) matrix
+    product. Unknown users get the item-bias estimate and items without any
+    interactions get the global mean. For ALS models biases and mean are zero
+    and the unclipped preference x_u.y_i is returned.
+    """
+    cf_rows = model.item_cf_rows[rows]
+    known = cf_rows >= 0
+    known_rows = cf_rows[known]
+    user_rows = np.array([model.cf_user_index.get(u, -1) for u in user_ids], dtype=np.int64)
+    has_factors = user_rows >= 0
+    factor_rows = user_rows[has_factors]
+
+    estimates = np.tile(model.global_mean + model.item_bias[known_rows], (len(user_ids), 1))
+    estimates[has_factors] += (
+        model.user_bias[factor_rows][:, None]
+        + model.user_factors[factor_rows] @ model.item_factors[known_rows].T
+    )
+    if model.cf_engine == "svd":
+        low, high = model.rating_scale
+        estimates = np.clip(estimates, low, high)
+    scores = np.full((len(user_ids), len(cf_rows)), model.global_mean, dtype=np.float64)
+    scores[:, known] = estimates
+    return scores
+
+
+def _grow(model: HybridModel, user_ids: np.ndarray, item_ids: np.ndarray, rng: np.random.Generator) -> None:
+    """Add factor rows for users and items the model has never seen.
+
+    Arrays are replaced before the id indexes that point into them, so a
+    concurrent ``predict_ratings`` never looks up a row that does not exist.
+    """
+    n_factors = model.user_factors.shape[1]
+    dtype = model.user_factors.dtype
+    new_users = [u for u in dict.fromkeys(user_ids.tolist()) if u not in model.cf_user_index]
+    new_items = [i for i in dict.fromkeys(item_ids.tolist()) if i not in model.cf_item_index]
+    if new_users:
+        first = len(model.cf_user_ids)
+        model.user_factors = np.vstack([model.user_factors, rng.normal(0, INIT_STD, (len(new_users), n_factors)).astype(dtype)])
+        model.user_bias = np.concatenate([model.user_bias, np.zeros(len(new_users), dtype=model.user_bias.dtype)])
+        model.cf_user_ids = np.concatenate([model.cf_user_ids, np.array(new_users, dtype=np.int64)])
+        model.cf_user_index.update({u: first + k for k, u in enumerate(new_users)})
+    if new_items:
+        first = len(model.cf_item_ids)
+        model.item_factors = np.vstack([model.item_factors, rng.normal(0, INIT_STD, (len(new_items), n_factors)).astype(dtype)])
+        model.item_bias = np.concatenate([model.item_bias, np.zeros(len(new_items), dtype=model.item_bias.dtype)])
+        model.cf_item_ids = np.concatenate([model.cf_item_ids, np.array(new_items, dtype=np.int64)])
+        model.cf_item_index.update({i: first + k for k, i in enumerate(new_items)})
+        item_cf_rows = model.item_cf_rows.copy()
+        for k, property_id in enumerate(new_items):
+            row = model.item_index.get(property_id)
+            if row is not None:
+                item_cf_rows[row] = first + k
+        model.item_cf_rows = item_cf_rows
+
+
+def update_online(model: HybridModel, interactions: Interactions, epochs: int = ONLINE_SGD_EPOCHS,
+                  rng: Optional[np.random.Generator] = None, history: Optional[Interactions] = None) -> None:
+    """Fold new interactions into ``model`` in place.
+
+    Only the factors and biases of the users and items in ``interactions``
+    move; the global mean and every other row stay as trained until the next
+    full retrain. SVD models take a few SGD passes with the same update rule
+    as the offline fit. ALS models re-solve the affected rows exactly from
+    ``history``, every stored interaction of those users and items.
+    """
+    if not len(interactions):
+        return
+    _grow(model, interactions.user_ids, interactions.property_ids, rng or np.random.default_rng())
+    if model.cf_engine == "als":
+        als.fold_in(model, history if history is not None else interactions,
+                    np.unique(interactions.user_ids), np.unique(interactions.property_ids))
+        return
+    user_rows = [model.cf_user_index[u] for u in interactions.user_ids.tolist()]
+    item_rows = [model.cf_item_index[i] for i in interactions.property_ids.tolist()]
+    pu, qi, bu, bi = model.user_factors, model.item_factors, model.user_bias, model.item_bias
+    mean = model.global_mean
+    for _ in range(epochs):
+        for u, i, rating in zip(user_rows, item_rows, interactions.ratings.tolist()):
+            err = rating - (mean + bu[u] + bi[i] + qi[i] @ pu[u])
+            bu[u] += LEARNING_RATE * (err - REGULARIZATION * bu[u])
+            bi[i] += LEARNING_RATE * (err - REGULARIZATION * bi[i])
+            user_factors = pu[u].copy()
+            pu[u] += LEARNING_RATE * (err * qi[i] - REGULARIZATION * pu[u])
+            qi[i] += LEARNING_RATE * (err * user_factors - REGULARIZATION * qi[i])
+
+
+class OnlineUpdater:
+    """Keeps a loaded model's factors current with the interaction store.
+
+    Each model remembers which prefix of the store it was trained on; records
+    appended after that are applied once with ``update_online``. If the store
+    was compacted since training, positions no longer line up and updates
+    resume from the current end of the store.
+    """
+
+    def __init__(self, store: InteractionStore, epochs: int = ONLINE_SGD_EPOCHS):
+        self.store = store
+        self.epochs = epochs
+        self._lock = threading.Lock()
+        self._model: Optional[HybridModel] = None
+        self._generation = -1
+        self._position = 0
+
+    def apply(self, model: Optional[HybridModel], state: Optional[StoreState] = None) -> int:
+        """Apply records not yet seen by ``model``; returns how many were applied."""
+        if model is None:
+            return 0
+        state = state or self.store.state()
+        with self._lock:
+            if model is not self._model:
+                self._model = model
+                self._generation = model.interactions_generation
+                self._position = model.interactions_count
+            if state.generation != self._generation or state.count < self._position:
+                self._generation = state.generation
+                self._position = state.count
+                return 0
+            stored = self.store.read(state)
+            records = stored[self._position:state.count]
+            history = None
+            if model.cf_engine == "als" and len(records):
+                affected = (np.isin(stored["user_id"], records["user_id"])
+                            | np.isin(stored["property_id"], records["property_id"]))
+                history = to_interactions(stored[affected])
+            self._position = state.count
+            update_online(model, to_interactions(records), self.epochs, history=history)
+        if len(records):
+            logger.info("Applied %d new interactions to model %s online", len(records), model.version)
+        return len(records)
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+# Database connection
+DATABASE_URL = (
+    f"postgresql://{os.getenv('POSTGRES_USER')}:"
+    f"{os.getenv('POSTGRES_PASSWORD')}@"
+    f"{os.getenv('POSTGRES_SERVER')}:"
+    f"{os.getenv('POSTGRES_PORT')}/"
+    f"{os.getenv('POSTGRES_DB')}"
+)
+
+# Directory holding the versioned model artifacts written by train.py
+MODEL_DIR = os.getenv(
+    "RECOMMENDER_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"),
+)
+
+# How many trained versions to keep on disk (older ones are pruned)
+MODEL_KEEP_VERSIONS = int(os.getenv("RECOMMENDER_MODEL_KEEP_VERSIONS", "3"))
+
+# Map model arrays from disk instead of reading them into each worker, so
+# workers serving the same version share them through the page cache
+MODEL_MMAP = os.getenv("RECOMMENDER_MODEL_MMAP", "true").lower() == "true"
+
+# How often the serving process checks LATEST for a new version, and how
+# many previously active versions it remembers for rollback
+MODEL_POLL_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_MODEL_POLL_INTERVAL", "5"))
+REGISTRY_HISTORY = int(os.getenv("RECOMMENDER_REGISTRY_HISTORY", "5"))
+
+# Token required in the X-Admin-Token header of the /admin endpoints, which
+# can pin the served model; they answer 503 when it is unset
+ADMIN_TOKEN = os.getenv("RECOMMENDER_ADMIN_TOKEN")
+
+# Seconds between runs when train.py runs in scheduled mode
+TRAIN_INTERVAL_SECONDS = int(os.getenv("RECOMMENDER_TRAIN_INTERVAL", "3600"))
+
+# Element type of the content feature matrix; float32 halves its memory
+FEATURE_DTYPE = np.dtype(os.getenv("RECOMMENDER_FEATURE_DTYPE", "float64"))
+
+# Content ANN index built by train.py: projected dimensions, rows retrieved
+# per user and minimum cells probed. When fewer than ANN_MIN_ITEMS listings
+# pass the constraints, all of them are re-ranked and candidate generation
+# is skipped
+ANN_DIMENSIONS = int(os.getenv("RECOMMENDER_ANN_DIMENSIONS", "64"))
+ANN_CANDIDATES = int(os.getenv("RECOMMENDER_ANN_CANDIDATES", "300"))
+ANN_MIN_PROBES = int(os.getenv("RECOMMENDER_ANN_MIN_PROBES", "8"))
+ANN_MIN_ITEMS = int(os.getenv("RECOMMENDER_ANN_MIN_ITEMS", "20000"))
+
+# Candidate stage: rows each source (location, price band, popularity)
+# contributes per user, and the price band as a fraction around the median
+# rent of the user's interacted listings
+CANDIDATES_PER_SOURCE = int(os.getenv("RECOMMENDER_CANDIDATES_PER_SOURCE", "200"))
+PRICE_BAND = float(os.getenv("RECOMMENDER_PRICE_BAND", "0.25"))
+
+# Co-occurrence neighbors kept per listing, for /recommend/similar
+SIMILAR_TOP_K = int(os.getenv("RECOMMENDER_SIMILAR_TOP_K", "20"))
+
+# Cold-start popularity: half-life of an interaction's weight, and how far
+# back the serving process reads interactions when it starts
+POPULARITY_HALF_LIFE_DAYS = float(os.getenv("RECOMMENDER_POPULARITY_HALF_LIFE_DAYS", "7"))
+POPULARITY_WINDOW_DAYS = float(os.getenv("RECOMMENDER_POPULARITY_WINDOW_DAYS", "56"))
+
+# Nightly precomputed lists (precompute.py): entries kept per user, how
+# many user shards to split the job into and how many processes run them,
+# and the interval in --schedule mode. Lists older than
+# PRECOMPUTED_MAX_AGE_SECONDS are ignored by the endpoint
+PRECOMPUTE_TOP_N = int(os.getenv("RECOMMENDER_PRECOMPUTE_TOP_N", "50"))
+PRECOMPUTE_SHARDS = int(os.getenv("RECOMMENDER_PRECOMPUTE_SHARDS", str(os.cpu_count() or 1)))
+PRECOMPUTE_WORKERS = int(os.getenv("RECOMMENDER_PRECOMPUTE_WORKERS", str(os.cpu_count() or 1)))
+PRECOMPUTE_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_PRECOMPUTE_INTERVAL", "86400"))
+PRECOMPUTED_MAX_AGE_SECONDS = float(os.getenv("RECOMMENDER_PRECOMPUTED_MAX_AGE", "172800"))
+
+# Users scored per matrix product in batch recommendations; bounds the
+# (users x catalog) score matrix held in memory at once
+BATCH_CHUNK_SIZE = int(os.getenv("RECOMMENDER_BATCH_CHUNK_SIZE", "256"))
+
+# Largest number of users accepted by one batch request
+MAX_BATCH_USERS = int(os.getenv("RECOMMENDER_MAX_BATCH_USERS", "5000"))
+
+# Per-user result cache: size bound, freshness, and how long a stale result
+# may still be served while it is refreshed in the background
+CACHE_MAX_USERS = int(os.getenv("RECOMMENDER_CACHE_MAX_USERS", "100000"))
+CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDER_CACHE_TTL", "600"))
+CACHE_MAX_STALE_SECONDS = float(os.getenv("RECOMMENDER_CACHE_MAX_STALE", "3600"))
+
+# Postgres NOTIFY channel the backend's triggers publish row changes on
+EVENTS_CHANNEL = os.getenv("RECOMMENDER_EVENTS_CHANNEL", "recommendation_events")
+
+# Threads that run scoring off the event loop, and how many more requests
+# may wait for one before the service answers 503
+SCORING_WORKERS = int(os.getenv("RECOMMENDER_SCORING_WORKERS", str(os.cpu_count() or 1)))
+SCORING_QUEUE_DEPTH = int(os.getenv("RECOMMENDER_SCORING_QUEUE_DEPTH", "32"))
+
+# Rows fetched per round trip from server-side cursors when loading data
+LOADER_CHUNK_SIZE = int(os.getenv("RECOMMENDER_LOADER_CHUNK_SIZE", "50000"))
+
+# Local interaction store fed incrementally from Postgres, and how often the
+# training job ingests new rows / rewrites the store to apply deletes
+INTERACTION_STORE_DIR = os.getenv(
+    "RECOMMENDER_INTERACTION_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "interactions"),
+)
+INGEST_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_INGEST_INTERVAL", "10"))
+COMPACT_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_COMPACT_INTERVAL", "86400"))
+
+# Collaborative engine trained by train.py: "svd" (explicit ratings with
+# surprise) or "als" (implicit-feedback ALS with conjugate-gradient solves),
+# and the ALS hyperparameters
+CF_ENGINE = os.getenv("RECOMMENDER_CF_ENGINE", "svd")
+ALS_FACTORS = int(os.getenv("RECOMMENDER_ALS_FACTORS", "64"))
+ALS_ITERATIONS = int(os.getenv("RECOMMENDER_ALS_ITERATIONS", "15"))
+ALS_REGULARIZATION = float(os.getenv("RECOMMENDER_ALS_REGULARIZATION", "0.1"))
+ALS_ALPHA = float(os.getenv("RECOMMENDER_ALS_ALPHA", "40"))
+ALS_CG_STEPS = int(os.getenv("RECOMMENDER_ALS_CG_STEPS", "3"))
+ALS_THREADS = int(os.getenv("RECOMMENDER_ALS_THREADS", str(os.cpu_count() or 1)))
+
+# Online collaborative updates in the serving process: new interactions from
+# the store are folded into the loaded model's factors with this many SGD
+# passes each, until the next full retrain replaces it
+ONLINE_UPDATES = os.getenv("RECOMMENDER_ONLINE_UPDATES", "true").lower() == "true"
+ONLINE_SGD_EPOCHS = int(os.getenv("RECOMMENDER_ONLINE_SGD_EPOCHS", "5"))
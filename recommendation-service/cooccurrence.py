@@ -0,0 +1,114 @@
+"""Item-to-item neighbors from co-occurring interactions.
+
+Views, wishlist additions and viewing requests form a sparse (users x
+catalog rows) matrix B weighted like the implicit collaborative signal, one
+entry per user and item (strongest signal wins). B^T B counts how strongly
+each pair of items was interacted with by the same users; dividing by the
+item norms turns it into cosine similarity, so popular listings do not
+become everyone's neighbor. The product is computed a block of item rows at
+a time and only each item's top ``top_k`` neighbors are kept, as two dense
+(catalog rows x top_k) arrays saved with the model.
+"""
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from interaction_store import IMPLICIT_WEIGHTS
+
+# Item rows of B^T B computed per sparse product
+ITEM_CHUNK = 4096
+
+# Most recent interactions per user that count; a handful of very active
+# users would otherwise dominate the (quadratic in items per user) product
+MAX_USER_ITEMS = 500
+
+# Implicit weight of each interaction kind (a uint8), indexed by kind
+KIND_WEIGHTS = np.zeros(256, dtype=np.float32)
+for _kind, _weight in IMPLICIT_WEIGHTS.items():
+    KIND_WEIGHTS[_kind] = _weight
+
+
+def _within_group_rank(groups: np.ndarray) -> np.ndarray:
+    """Position of each element within its run of equal ``groups`` values (sorted input)."""
+    starts = np.flatnonzero(np.append(True, groups[1:] != groups[:-1])) if len(groups) else np.zeros(0, dtype=np.int64)
+    return np.arange(len(groups)) - np.repeat(starts, np.diff(np.append(starts, len(groups))))
+
+
+def interaction_matrix(records: np.ndarray, item_ids: np.ndarray,
+                       max_user_items: int = MAX_USER_ITEMS) -> sp.csr_matrix:
+    """(users x catalog rows) implicit weights of the interaction ``records``.
+
+    Each (user, item) pair keeps its strongest signal; each user keeps the
+    ``max_user_items`` items they interacted with most recently.
+    """
+    n_items = len(item_ids)
+    weights = KIND_WEIGHTS[records["kind"]]
+    keep = weights > 0
+    records, weights, sequence = records[keep], weights[keep], np.flatnonzero(keep)
+    order = np.argsort(item_ids, kind="stable")
+    sorted_ids = item_ids[order]
+    property_ids = records["property_id"].astype(np.int64)
+    positions = np.minimum(np.searchsorted(sorted_ids, property_ids), max(n_items - 1, 0))
+    in_catalog = (sorted_ids[positions] == property_ids) if n_items else np.zeros(len(records), dtype=bool)
+    items = order[positions[in_catalog]].astype(np.int64)
+    _, users = np.unique(records["user_id"][in_catalog], return_inverse=True)
+    weights, sequence = weights[in_catalog], sequence[in_catalog]
+    n_users = int(users.max(initial=-1)) + 1
+
+    # One entry per (user, item): the strongest signal, dated by the pair's
+    # latest record (records are in store order, so later means newer).
+    # Sorting one combined integer key is far faster than np.lexsort
+    keys = users.astype(np.int64) * max(n_items, 1) + items
+    levels, weight_levels = np.unique(weights, return_inverse=True)
+    order = np.argsort(keys * len(levels) + weight_levels)
+    keys, weights, sequence = keys[order], weights[order], sequence[order]
+    last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.zeros(0, dtype=bool)
+    first = np.flatnonzero(np.append(True, keys[1:] != keys[:-1])) if len(keys) else np.zeros(0, dtype=np.int64)
+    latest = np.maximum.reduceat(sequence, first) if len(keys) else sequence
+    keys, weights = keys[last], weights[last]
+    users, items = keys // max(n_items, 1), keys % max(n_items, 1)
+
+    recent = np.argsort(users * (len(records) + 1) + (len(records) - latest))
+    users, items, weights = users[recent], items[recent], weights[recent]
+    keep = _within_group_rank(users) < max_user_items
+    return sp.csr_matrix((weights[keep], (users[keep], items[keep])), shape=(n_users, n_items))
+
+
+def top_k_rows(matrix: sp.csr_matrix, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Columns and values of the ``top_k`` largest entries of each row, best first, -1 / 0 padded."""
+    n_rows = matrix.shape[0]
+    rows = np.repeat(np.arange(n_rows), np.diff(matrix.indptr))
+    # Row-major, largest first, as one float key: rows are spaced further
+    # apart than any two values
+    span = 2 * np.abs(matrix.data).max(initial=0) + 1
+    order = np.argsort(rows * span - matrix.data)
+    rows, columns, values = rows[order], matrix.indices[order], matrix.data[order]
+    ranks = _within_group_rank(rows)
+    keep = ranks < top_k
+    neighbors = np.full((n_rows, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, top_k), dtype=np.float32)
+    neighbors[rows[keep], ranks[keep]] = columns[keep]
+    scores[rows[keep], ranks[keep]] = values[keep]
+    return neighbors, scores
+
+
+def build_neighbors(records: np.ndarray, item_ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top ``top_k`` co-occurrence neighbors (catalog rows, cosine scores) of every catalog row."""
+    interactions = interaction_matrix(records, item_ids)
+    by_item = interactions.T.tocsr()
+    norms = np.sqrt(np.asarray(by_item.multiply(by_item).sum(axis=1)).ravel())
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = (sp.diags(inverse_norms) @ by_item).tocsr()
+    normalized_t = normalized.T.tocsr()
+
+    neighbors = np.full((len(item_ids), top_k), -1, dtype=np.int32)
+    scores = np.zeros((len(item_ids), top_k), dtype=np.float32)
+    for start in range(0, len(item_ids), ITEM_CHUNK):
+        block = (normalized[start:start + ITEM_CHUNK] @ normalized_t).tocsr()
+        # An item is not its own neighbor
+        block_rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        block.data[block.indices == block_rows + start] = 0
+        block.eliminate_zeros()
+        neighbors[start:start + ITEM_CHUNK], scores[start:start + ITEM_CHUNK] = top_k_rows(block, top_k)
+    return neighbors, scores
@@ -0,0 +1,107 @@
+"""Change events from Postgres, delivered with LISTEN/NOTIFY.
+
+The backend migration ``add_recommendation_event_triggers`` installs row
+triggers on wishlist, review, propertyview, viewingrequest and property that
+``pg_notify`` a small JSON payload on EVENTS_CHANNEL. ``EventListener`` keeps
+a dedicated connection listening on that channel and hands every event to the
+registered handlers.
+"""
+import json
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Tables whose rows are user interactions (as opposed to the property itself)
+INTERACTION_TABLES = {"wishlist", "review", "propertyview", "viewingrequest"}
+
+
+@dataclass
+class ChangeEvent:
+    table: str
+    op: str
+    user_id: Optional[int]
+    property_id: Optional[int]
+    status: Optional[str]
+
+    @property
+    def is_interaction(self) -> bool:
+        return self.table in INTERACTION_TABLES
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ChangeEvent":
+        data = json.loads(payload)
+        return cls(
+            table=data["table"],
+            op=data["op"],
+            user_id=data.get("user_id"),
+            property_id=data.get("property_id"),
+            status=data.get("status"),
+        )
+
+
+class EventListener:
+    def __init__(self, dsn: str, channel: str, poll_seconds: float = 5.0, retry_seconds: float = 5.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self._handlers: List[Callable[[ChangeEvent], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, handler: Callable[[ChangeEvent], None]) -> None:
+        self._handlers.append(handler)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="recommendation-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 1)
+
+    def dispatch(self, event: ChangeEvent) -> None:
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Event handler failed for %s", event)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except psycopg2.Error:
+                logger.exception("Lost event connection; reconnecting in %ss", self.retry_seconds)
+                time.sleep(self.retry_seconds)
+
+    def _listen(self) -> None:
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self.channel}")
+            logger.info("Listening for change events on %s", self.channel)
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        event = ChangeEvent.from_payload(notify.payload)
+                    except (ValueError, KeyError):
+                        logger.warning("Ignoring malformed event payload %r", notify.payload)
+                        continue
+                    self.dispatch(event)
+        finally:
+            conn.close()
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolFullError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class ScoringPool:
+    """Bounded thread pool for the blocking, CPU-heavy part of a request.
+
+    Scoring is dominated by NumPy/SciPy matrix products that release the GIL,
+    so threads can use every core while sharing one in-memory model. At most
+    ``max_workers + max_queue`` jobs are admitted at a time; beyond that
+    ``run`` raises PoolFullError instead of letting latency grow unbounded.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_submit(self, fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+        """Submit ``fn(*args)`` if there is room, otherwise return None."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        future = self.try_submit(fn, *args)
+        if future is None:
+            raise PoolFullError()
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+class PeriodicTask:
+    """Run ``fn`` every ``interval`` seconds on a daemon thread until stopped."""
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Any]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from artifacts import HybridModel
+from config import FEATURE_DTYPE
+from loader import Catalog, PropertyFeatureLinks
+
+
+@dataclass
+class ItemFeatures:
+    """Sparse content feature matrix for a catalog plus the state needed to rebuild it."""
+    matrix: sp.csr_matrix
+    norms: np.ndarray
+    vocabulary: Dict[str, int]
+    idf: np.ndarray
+    numeric_mean: np.ndarray
+    numeric_std: np.ndarray
+    feature_ids: np.ndarray
+
+
+def lookup_rows(ids: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of ``values`` in ``ids`` and a mask of which values were found."""
+    if len(ids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(len(values), dtype=bool)
+    order = np.argsort(ids, kind="stable")
+    positions = np.minimum(np.searchsorted(ids, values, sorter=order), len(ids) - 1)
+    found = ids[order[positions]] == values
+    return order[positions[found]], found
+
+
+def row_norms(matrix: sp.csr_matrix) -> np.ndarray:
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+
+
+def cosine_scores(matrix: sp.csr_matrix, profiles: np.ndarray, norms: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each profile row against every row of ``matrix``.
+
+    Returns an array of shape (len(profiles), matrix.shape[0]). Zero-norm rows
+    or profiles score 0, as in sklearn's cosine_similarity.
+    """
+    profiles = np.atleast_2d(profiles)
+    dots = np.asarray(matrix @ profiles.T).T
+    denominators = np.outer(np.linalg.norm(profiles, axis=1), norms)
+    scores = np.zeros(dots.shape, dtype=np.float64)
+    np.divide(dots, denominators, out=scores, where=denominators > 0)
+    return scores
+
+
+def _stack_features(catalog: Catalog, links: PropertyFeatureLinks, tfidf_matrix: sp.csr_matrix,
+                    numeric_mean: np.ndarray, numeric_std: np.ndarray, feature_ids: np.ndarray,
+                    dtype: np.dtype) -> sp.csr_matrix:
+    n_items = len(catalog)
+
+    # Numerical features including land_area, floor_area
+    numerical_features = (catalog.numeric - numeric_mean) / numeric_std
+
+    # One-hot encode features (amenities) straight from the link table
+    rows, row_found = lookup_rows(catalog.property_ids, links.property_ids)
+    cols, col_found = lookup_rows(feature_ids, links.link_feature_ids[row_found])
+    amenity_matrix = sp.csr_matrix(
+        (np.ones(len(cols), dtype=dtype), (rows[col_found], cols)),
+        shape=(n_items, len(feature_ids)),
+    )
+    # Duplicate link rows would otherwise sum to 2
+    amenity_matrix.data[:] = 1
+
+    return sp.hstack(
+        [tfidf_matrix, sp.csr_matrix(numerical_features.astype(dtype)), amenity_matrix],
+        format="csr",
+        dtype=dtype,
+    )
+
+
+def build_item_features(catalog: Catalog, links: PropertyFeatureLinks, dtype: np.dtype = FEATURE_DTYPE) -> ItemFeatures:
+    """Build the CSR matrix [TF-IDF | scaled numeric | amenity one-hot], one row per catalog item."""
+    n_items = len(catalog)
+
+    # TF-IDF over descriptions; an empty vocabulary (e.g. only stop words)
+    # just contributes no text columns
+    tfidf = TfidfVectorizer(stop_words="english", dtype=dtype)
+    try:
+        tfidf_matrix = tfidf.fit_transform(catalog.descriptions).tocsr()
+        vocabulary = {term: int(i) for term, i in tfidf.vocabulary_.items()}
+        idf = tfidf.idf_
+    except ValueError:
+        tfidf_matrix = sp.csr_matrix((n_items, 0), dtype=dtype)
+        vocabulary, idf = {}, np.zeros(0)
+
+    numeric_mean = catalog.numeric.mean(axis=0) if n_items else np.zeros(catalog.numeric.shape[1])
+    numeric_std = (catalog.numeric.std(axis=0) if n_items else np.zeros(catalog.numeric.shape[1])) + 1e-8
+    matrix = _stack_features(catalog, links, tfidf_matrix, numeric_mean, numeric_std, links.feature_ids, dtype)
+    return ItemFeatures(
+        matrix=matrix,
+        norms=row_norms(matrix),
+        vocabulary=vocabulary,
+        idf=idf,
+        numeric_mean=numeric_mean,
+        numeric_std=numeric_std,
+        feature_ids=links.feature_ids,
+    )
+
+
+def vectorize_items(catalog: Catalog, links: PropertyFeatureLinks, model: HybridModel) -> sp.csr_matrix:
+    """Feature rows for the properties in ``catalog``, in ``model``'s columns.
+
+    Uses the vocabulary, idf weights, numeric scaling and amenity columns saved
+    at training time, so the rows match what training would have built.
+    """
+    dtype = model.item_features.dtype
+    if model.vocabulary:
+        counts = CountVectorizer(stop_words="english", vocabulary=model.vocabulary, dtype=dtype).transform(
+            catalog.descriptions)
+        tfidf_matrix = normalize(counts @ sp.diags(model.idf.astype(dtype))).tocsr()
+    else:
+        tfidf_matrix = sp.csr_matrix((len(catalog), 0), dtype=dtype)
+    return _stack_features(catalog, links, tfidf_matrix, model.numeric_mean, model.numeric_std,
+                           model.feature_ids, dtype)
@@ -0,0 +1,397 @@
+"""Local, append-only store of user/property interactions.
+
+Postgres is read incrementally: each ingest only fetches rows past the
+high-water marks kept in ``state.json`` and appends them as fixed-size
+records to ``interactions.<generation>.bin``, which readers map with
+``np.memmap``. Deletes (and anything the watermarks cannot see, e.g. a review
+moving from approved to rejected) are applied by ``compact``, which rewrites
+the store from a full column scan into the next generation's file; replacing
+``state.json`` is the only commit point, so a reader always opens the file
+its state names.
+
+Only ``train.py`` writes the store; serving processes only read it.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.engine import Connection
+
+from config import INTERACTION_STORE_DIR
+from enums import ReviewStatusEnum
+from loader import (
+    Interactions, VIEW_RATING, VIEWING_REQUEST_RATING, WISHLIST_RATING, load_array,
+)
+from models import PropertyView, Review, ViewingRequest, WishList
+
+logger = logging.getLogger(__name__)
+
+RECORDS_FILE = "interactions.{generation}.bin"
+STATE_FILE = "state.json"
+
+# Interaction kinds stored in each record
+KIND_REVIEW = 1
+KIND_WISHLIST = 2
+KIND_VIEW = 3
+KIND_VIEWING_REQUEST = 4
+
+# Weight of each interaction kind in the content profile (viewing requests
+# only feed the collaborative model)
+PROFILE_WEIGHTS = {KIND_WISHLIST: 2.0, KIND_REVIEW: 1.5, KIND_VIEW: 1.0}
+
+# Implicit signal strength of each kind for the ALS engine; reviews add
+# REVIEW_WEIGHT_PER_STAR for every star above one instead
+IMPLICIT_WEIGHTS = {KIND_WISHLIST: 3.0, KIND_VIEWING_REQUEST: 2.0, KIND_VIEW: 1.0}
+REVIEW_WEIGHT_PER_STAR = 0.75
+
+# row_id is the source row's primary key (0 for wishlist, keyed by user/property)
+RECORD_DTYPE = np.dtype([
+    ("user_id", "<i4"),
+    ("property_id", "<i4"),
+    ("row_id", "<i8"),
+    ("kind", "u1"),
+    ("rating", "<f4"),
+])
+
+
+@dataclass
+class Watermarks:
+    view_id: int = 0
+    request_id: int = 0
+    review_id: int = 0
+    # Smallest review id that was still pending at the last ingest; approved
+    # reviews at or above it are re-checked since approval has no timestamp
+    review_pending_floor: int = 0
+    # Approved reviews at or above review_pending_floor already ingested
+    review_ids_above_floor: List[int] = field(default_factory=list)
+    wishlist_added_at: Optional[str] = None
+    # Wishlist keys already ingested at exactly wishlist_added_at
+    wishlist_keys_at_watermark: List[Tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class StoreState:
+    count: int = 0
+    generation: int = 0
+    # Wall-clock time the last ingest started reading Postgres; everything
+    # committed before it is in the store
+    ingested_at: float = 0.0
+    watermarks: Watermarks = field(default_factory=Watermarks)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "StoreState":
+        watermarks = Watermarks(**data.get("watermarks", {}))
+        watermarks.wishlist_keys_at_watermark = [tuple(k) for k in watermarks.wishlist_keys_at_watermark]
+        return cls(count=data["count"], generation=data.get("generation", 0),
+                   ingested_at=data.get("ingested_at", 0.0), watermarks=watermarks)
+
+    def to_json(self) -> dict:
+        return {"count": self.count, "generation": self.generation,
+                "ingested_at": self.ingested_at, "watermarks": self.watermarks.__dict__}
+
+
+def make_records(user_ids, property_ids, row_ids, kind: int, ratings) -> np.ndarray:
+    records = np.zeros(len(user_ids), dtype=RECORD_DTYPE)
+    records["user_id"] = user_ids
+    records["property_id"] = property_ids
+    records["row_id"] = row_ids
+    records["kind"] = kind
+    records["rating"] = ratings
+    return records
+
+
+def implicit_weights(records: np.ndarray) -> np.ndarray:
+    weights = np.zeros(len(records), dtype=np.float32)
+    for kind, weight in IMPLICIT_WEIGHTS.items():
+        weights[records["kind"] == kind] = weight
+    reviews = records["kind"] == KIND_REVIEW
+    weights[reviews] = np.maximum(records["rating"][reviews] - 1, 0) * REVIEW_WEIGHT_PER_STAR
+    return weights
+
+
+def profile_weights(records: np.ndarray) -> Dict[int, Dict[int, float]]:
+    """Map each user in ``records`` to {property_id: profile weight}, strongest signal wins."""
+    interactions: Dict[int, Dict[int, float]] = {}
+    for user_id, property_id, kind in zip(records["user_id"].tolist(), records["property_id"].tolist(),
+                                          records["kind"].tolist()):
+        weight = PROFILE_WEIGHTS.get(kind)
+        if weight is not None:
+            user_items = interactions.setdefault(user_id, {})
+            user_items[property_id] = max(weight, user_items.get(property_id, 0.0))
+    return interactions
+
+
+def to_interactions(records: np.ndarray) -> Interactions:
+    return Interactions(
+        user_ids=records["user_id"].astype(np.int64),
+        property_ids=records["property_id"].astype(np.int64),
+        ratings=records["rating"].astype(np.float64),
+        weights=implicit_weights(records),
+    )
+
+
+class InteractionStore:
+    def __init__(self, path: str = INTERACTION_STORE_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def records_path(self, generation: int) -> str:
+        return os.path.join(self.path, RECORDS_FILE.format(generation=generation))
+
+    def state(self) -> StoreState:
+        try:
+            with open(os.path.join(self.path, STATE_FILE)) as f:
+                return StoreState.from_json(json.load(f))
+        except FileNotFoundError:
+            return StoreState()
+
+    def read(self, state: Optional[StoreState] = None) -> np.ndarray:
+        """Read-only view of the committed records (bytes past ``count`` are ignored)."""
+        state = state or self.state()
+        if state.count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.records_path(state.generation), dtype=RECORD_DTYPE, mode="r", shape=(state.count,))
+
+    def interactions(self, state: Optional[StoreState] = None) -> Interactions:
+        return to_interactions(self.read(state))
+
+    def append(self, records: np.ndarray, state: StoreState) -> StoreState:
+        """Append ``records`` and commit ``state`` (with the new count) after they are durable."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            path = self.records_path(state.generation)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # Drop any torn write left past the last committed record
+                f.truncate(state.count * RECORD_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                records.astype(RECORD_DTYPE, copy=False).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            state.count += len(records)
+            self._write_state(state)
+            return state
+
+    def adopt(self, other: "InteractionStore") -> StoreState:
+        """Atomically take over the records and watermarks of ``other``.
+
+        The records become the next generation's file, which no reader opens
+        until the new state is written. The previous generation's file is
+        kept for readers that read the old state just before; older ones are
+        deleted (readers that already mapped them keep a valid view).
+        """
+        with self._lock:
+            theirs = other.state()
+            state = self.state()
+            os.makedirs(self.path, exist_ok=True)
+            state.generation += 1
+            if os.path.exists(other.records_path(theirs.generation)):
+                os.replace(other.records_path(theirs.generation), self.records_path(state.generation))
+            state.count = theirs.count
+            state.ingested_at = theirs.ingested_at
+            state.watermarks = theirs.watermarks
+            self._write_state(state)
+            self._remove_records_before(state.generation - 1)
+            return state
+
+    def _remove_records_before(self, generation: int) -> None:
+        prefix, suffix = RECORDS_FILE.split("{generation}")
+        for name in os.listdir(self.path):
+            number = name[len(prefix):-len(suffix)] if name.startswith(prefix) and name.endswith(suffix) else ""
+            if number.isdigit() and int(number) < generation:
+                os.remove(os.path.join(self.path, name))
+
+    def _write_state(self, state: StoreState) -> None:
+        tmp = os.path.join(self.path, STATE_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state.to_json(), f)
+        os.replace(tmp, os.path.join(self.path, STATE_FILE))
+
+
+def _fetch_views(conn: Connection, after_id: int) -> np.ndarray:
+    rows = load_array(conn, select(PropertyView.view_id, PropertyView.user_id, PropertyView.property_id)
+                      .where(PropertyView.view_id > after_id).order_by(PropertyView.view_id), 3, np.int64)
+    return make_records(rows[:, 1], rows[:, 2], rows[:, 0], KIND_VIEW, VIEW_RATING)
+
+
+def _fetch_viewing_requests(conn: Connection, after_id: int) -> np.ndarray:
+    rows = load_array(conn, select(ViewingRequest.request_id, ViewingRequest.user_id, ViewingRequest.property_id)
+                      .where(ViewingRequest.request_id > after_id).order_by(ViewingRequest.request_id), 3, np.int64)
+    return make_records(rows[:, 1], rows[:, 2], rows[:, 0], KIND_VIEWING_REQUEST, VIEWING_REQUEST_RATING)
+
+
+def _fetch_approved_reviews(conn: Connection, from_id: int) -> np.ndarray:
+    rows = load_array(conn, select(Review.review_id, Review.user_id, Review.property_id, cast(Review.rating, Float))
+                      .where(Review.status == ReviewStatusEnum.approved, Review.review_id >= from_id)
+                      .order_by(Review.review_id), 4)
+    return make_records(rows[:, 1], rows[:, 2], rows[:, 0], KIND_REVIEW, rows[:, 3])
+
+
+def _review_pending_floor(conn: Connection, default: int) -> int:
+    floor = conn.execute(
+        select(func.min(Review.review_id)).where(Review.status == ReviewStatusEnum.pending)).scalar()
+    return int(floor) if floor is not None else default
+
+
+def _fetch_wishlist(conn: Connection, since: Optional[str]) -> list:
+    statement = select(WishList.user_id, WishList.property_id, WishList.added_at)
+    if since is not None:
+        statement = statement.where(WishList.added_at >= datetime.fromisoformat(since))
+    return conn.execute(statement.order_by(WishList.added_at)).all()
+
+
+def ingest(conn: Connection, store: InteractionStore) -> int:
+    """Append interactions created since the last ingest; returns how many were added."""
+    state = store.state()
+    started_at = time.time()
+    marks = state.watermarks
+    batches = []
+
+    reviews = _fetch_approved_reviews(conn, min(marks.review_pending_floor, marks.review_id + 1))
+    # Reviews below the watermark were re-fetched only to catch late approvals
+    ingested = set(marks.review_ids_above_floor)
+    reviews = reviews[~np.isin(reviews["row_id"], list(ingested))]
+    if len(reviews):
+        batches.append(reviews)
+        marks.review_id = max(marks.review_id, int(reviews["row_id"].max()))
+        ingested.update(reviews["row_id"].tolist())
+    floor = _review_pending_floor(conn, marks.review_id + 1)
+    if floor < marks.review_pending_floor:
+        # A review below the old floor is pending again (rare): look up what was ingested from there
+        existing = store.read(state)
+        below = existing["row_id"][(existing["kind"] == KIND_REVIEW) & (existing["row_id"] >= floor)
+                                   & (existing["row_id"] < marks.review_pending_floor)]
+        ingested.update(below.tolist())
+    marks.review_pending_floor = floor
+    marks.review_ids_above_floor = sorted(r for r in ingested if r >= floor)
+
+    wishlist_rows = _fetch_wishlist(conn, marks.wishlist_added_at)
+    seen = set(marks.wishlist_keys_at_watermark)
+    new_wishlist = [(u, p, added_at) for u, p, added_at in wishlist_rows if (u, p) not in seen]
+    if new_wishlist:
+        batches.append(make_records(
+            [u for u, _, _ in new_wishlist], [p for _, p, _ in new_wishlist], 0, KIND_WISHLIST, WISHLIST_RATING))
+        latest = max(added_at for _, _, added_at in new_wishlist)
+        keys = [(u, p) for u, p, added_at in wishlist_rows if added_at == latest]
+        if latest.isoformat() == marks.wishlist_added_at:
+            keys = list(seen) + keys
+        marks.wishlist_added_at = latest.isoformat()
+        marks.wishlist_keys_at_watermark = sorted(set(keys))
+
+    views = _fetch_views(conn, marks.view_id)
+    if len(views):
+        batches.append(views)
+        marks.view_id = int(views["row_id"].max())
+
+    requests = _fetch_viewing_requests(conn, marks.request_id)
+    if len(requests):
+        batches.append(requests)
+        marks.request_id = int(requests["row_id"].max())
+
+    records = np.concatenate(batches) if batches else np.zeros(0, dtype=RECORD_DTYPE)
+    state.ingested_at = started_at
+    store.append(records, state)
+    if len(records):
+        logger.info("Ingested %d new interactions (store now holds %d)", len(records), state.count)
+    return len(records)
+
+
+def compact(conn: Connection, store: InteractionStore) -> int:
+    """Rewrite the store from a full scan, dropping deleted or unapproved rows.
+
+    Watermarks restart from the rebuilt contents, so rows committed out of id
+    order before the scan are picked up here as well.
+    """
+    fresh = InteractionStore(store.path + ".compact")
+    shutil.rmtree(fresh.path, ignore_errors=True)
+    ingest(conn, fresh)
+    state = store.adopt(fresh)
+    shutil.rmtree(fresh.path, ignore_errors=True)
+    logger.info("Compacted interaction store to %d records", state.count)
+    return state.count
+
+
+class UserInteractionIndex:
+    """Per-user lookup over the store for the request path.
+
+    Records are sorted by user once (``np.argsort``) and looked up with
+    ``searchsorted``. Records appended since then form a small unsorted tail
+    that is scanned directly until it grows past ``rebuild_fraction`` of the
+    base, or until a compaction changes the store generation.
+    """
+
+    def __init__(self, store: InteractionStore, rebuild_fraction: float = 0.1):
+        self.store = store
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.Lock()
+        self._generation = -1
+        self._as_of = 0.0
+        self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._base_count = 0
+        self._order = np.zeros(0, dtype=np.int64)
+        self._sorted_users = np.zeros(0, dtype=np.int32)
+
+    @property
+    def count(self) -> int:
+        return len(self._records)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def as_of(self) -> float:
+        """Wall-clock time up to which the indexed interactions are complete."""
+        return self._as_of
+
+    def refresh(self, state: Optional[StoreState] = None) -> None:
+        state = state or self.store.state()
+        if state.generation == self._generation and state.count == len(self._records):
+            self._as_of = state.ingested_at
+            return
+        records = self.store.read(state)
+        tail = state.count - self._base_count
+        with self._lock:
+            if (state.generation != self._generation or tail < 0
+                    or tail > max(1000, self.rebuild_fraction * self._base_count)):
+                order = np.argsort(records["user_id"], kind="stable")
+                self._order = order
+                self._sorted_users = records["user_id"][order]
+                self._base_count = state.count
+                self._generation = state.generation
+            self._records = records
+            self._as_of = state.ingested_at
+
+    def counts(self, user_ids: List[int]) -> np.ndarray:
+        """Number of stored interactions of each user, of any kind."""
+        with self._lock:
+            records, sorted_users, base = self._records, self._sorted_users, self._base_count
+        wanted = np.asarray(user_ids, dtype=np.int64)
+        counts = np.searchsorted(sorted_users, wanted, side="right") - np.searchsorted(sorted_users, wanted, side="left")
+        if len(records) > base:
+            tail_users, tail_counts = np.unique(records["user_id"][base:], return_counts=True)
+            at = np.minimum(np.searchsorted(tail_users, wanted), len(tail_users) - 1)
+            counts += np.where(tail_users[at] == wanted, tail_counts[at], 0)
+        return counts
+
+    def records(self, user_ids: List[int]) -> np.ndarray:
+        """Every indexed record of ``user_ids``."""
+        with self._lock:
+            records, order, sorted_users, base = self._records, self._order, self._sorted_users, self._base_count
+        wanted = np.asarray(user_ids, dtype=np.int64)
+        lo = np.searchsorted(sorted_users, wanted, side="left")
+        hi = np.searchsorted(sorted_users, wanted, side="right")
+        positions = [order[lo[i]:hi[i]] for i in range(len(wanted))]
+        tail = base + np.flatnonzero(np.isin(records["user_id"][base:], wanted))
+        return records[np.concatenate(positions + [tail])] if len(records) else records
+
+    def lookup(self, user_ids: List[int]) -> Dict[int, Dict[int, float]]:
+        """Map each user to {property_id: profile weight}, strongest signal wins."""
+        return profile_weights(self.records(user_ids))
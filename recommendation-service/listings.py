@@ -0,0 +1,132 @@
+"""Keeps the serving model's catalog in step with listing changes between retrains.
+
+Property change events only mark a listing. ``ListingUpdater.apply`` then
+reloads every marked listing in one query and vectorizes the available ones
+with the model's saved TF-IDF vocabulary and scaling. Listings that left the
+market leave the ANN index; ones the model already knows get their feature
+row, price, location and bedrooms overwritten and are filed again; ones it
+has never seen are appended to its catalog and filed in the index. Their
+collaborative rows come from online updates once users interact with them.
+"""
+import logging
+import threading
+from typing import Optional, Set
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.engine import Engine
+
+from artifacts import HybridModel
+from features import row_norms, vectorize_items
+from loader import Catalog, load_catalog, load_feature_links
+
+logger = logging.getLogger(__name__)
+
+
+def append_items(model: HybridModel, catalog: Catalog, matrix: sp.csr_matrix) -> np.ndarray:
+    """Add ``catalog`` (feature rows ``matrix``) to the model's catalog; returns their rows.
+
+    ``item_ids`` is replaced last, so rows derived from it during a
+    concurrent request always exist in the other per-item arrays.
+    """
+    first = len(model.item_ids)
+    model.item_features = sp.vstack([model.item_features, matrix], format="csr")
+    model.item_norms = np.concatenate([model.item_norms, row_norms(matrix)])
+    model.item_city_ids = np.concatenate([model.item_city_ids, catalog.city_ids])
+    model.item_district_ids = np.concatenate([model.item_district_ids, catalog.district_ids])
+    model.item_prices = np.concatenate([model.item_prices, catalog.column("rent_price")])
+    model.item_bedrooms = np.concatenate([model.item_bedrooms, catalog.column("bedrooms")])
+    model.item_popularity = np.concatenate([model.item_popularity, np.zeros(len(catalog))])
+    model.item_cf_rows = np.concatenate([model.item_cf_rows, np.array(
+        [model.cf_item_index.get(int(pid), -1) for pid in catalog.property_ids], dtype=np.int64)])
+    model.item_ids = np.concatenate([model.item_ids, catalog.property_ids])
+    model.item_index.update({int(pid): first + k for k, pid in enumerate(catalog.property_ids)})
+    return np.arange(first, len(model.item_ids))
+
+
+def _replaced(array: np.ndarray, rows: np.ndarray, values: np.ndarray) -> np.ndarray:
+    array = np.array(array)
+    array[rows] = values
+    return array
+
+
+def replace_items(model: HybridModel, rows: np.ndarray, catalog: Catalog, matrix: sp.csr_matrix) -> None:
+    """Overwrite the catalog ``rows`` with ``catalog`` (feature rows ``matrix``).
+
+    Every per-item array is copied, updated and swapped in whole, so a
+    concurrent request sees a row's previous entry or the new one.
+    """
+    features = model.item_features
+    n_items = features.shape[0]
+    keep = np.ones(n_items, dtype=features.dtype)
+    keep[rows] = 0
+    placement = sp.csr_matrix((np.ones(len(rows), dtype=features.dtype), (rows, np.arange(len(rows)))),
+                              shape=(n_items, len(rows)))
+    updated = (sp.diags(keep) @ features + placement @ matrix).tocsr()
+    updated.eliminate_zeros()
+    updated.sort_indices()
+    model.item_norms = _replaced(model.item_norms, rows, row_norms(matrix))
+    model.item_city_ids = _replaced(model.item_city_ids, rows, catalog.city_ids)
+    model.item_district_ids = _replaced(model.item_district_ids, rows, catalog.district_ids)
+    model.item_prices = _replaced(model.item_prices, rows, catalog.column("rent_price"))
+    model.item_bedrooms = _replaced(model.item_bedrooms, rows, catalog.column("bedrooms"))
+    model.item_features = updated
+    # The candidate sources are sorted by location and price
+    model.candidate_index = None
+
+
+def _subset(catalog: Catalog, mask: np.ndarray) -> Catalog:
+    return Catalog(
+        property_ids=catalog.property_ids[mask],
+        descriptions=[d for d, keep in zip(catalog.descriptions, mask) if keep],
+        numeric=catalog.numeric[mask],
+        city_ids=catalog.city_ids[mask],
+        district_ids=catalog.district_ids[mask],
+    )
+
+
+class ListingUpdater:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._pending: Set[int] = set()
+
+    def mark(self, property_id: int) -> None:
+        with self._lock:
+            self._pending.add(property_id)
+
+    def apply(self, model: Optional[HybridModel]) -> int:
+        """Bring ``model`` up to date with the marked listings; returns how many were handled."""
+        # Marks are kept until there is a model to apply them to
+        if model is None:
+            return 0
+        with self._lock:
+            property_ids, self._pending = sorted(self._pending), set()
+        if not property_ids:
+            return 0
+        with self.engine.connect() as conn:
+            catalog = load_catalog(conn, property_ids)
+            links = load_feature_links(conn, catalog.property_ids.tolist())
+        known = np.isin(catalog.property_ids, model.item_ids)
+
+        available = set(catalog.property_ids.tolist())
+        gone = np.array([model.item_index[p] for p in property_ids
+                         if p in model.item_index and p not in available], dtype=np.int64)
+        updated = np.array([model.item_index[int(p)] for p in catalog.property_ids[known]], dtype=np.int64)
+        added = np.zeros(0, dtype=np.int64)
+        if len(catalog):
+            matrix = vectorize_items(catalog, links, model)
+            if len(updated):
+                replace_items(model, updated, _subset(catalog, known), matrix[known])
+            if not known.all():
+                added = append_items(model, _subset(catalog, ~known), matrix[~known])
+
+        if model.ann_index is not None:
+            if len(gone):
+                model.ann_index.remove(gone)
+            changed = np.concatenate([updated, added])
+            if len(changed):
+                model.ann_index.add(changed, model.item_features[changed])
+        logger.info("Listing updates: %d added, %d updated, %d removed",
+                    len(added), len(updated), len(gone))
+        return len(property_ids)
@@ -0,0 +1,130 @@
+"""Columnar data loading for the recommender.
+
+Every query here is a narrow column projection executed with a server-side
+cursor (``stream_results``) and consumed in chunks of LOADER_CHUNK_SIZE rows
+straight into NumPy arrays, so no ORM objects are ever materialised.
+"""
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.engine import Connection
+
+from config import LOADER_CHUNK_SIZE
+from enums import PropertyStatusEnum
+from models import Feature, Property, PropertyFeature, PropertyLocation, PropertyPricing
+
+# Implicit rating given to each interaction type by the collaborative model
+WISHLIST_RATING = 5.0
+VIEWING_REQUEST_RATING = 4.0
+VIEW_RATING = 3.0
+
+NUMERIC_COLUMNS = ("bedrooms", "bathrooms", "rent_price", "land_area", "floor_area")
+
+
+@dataclass
+class Catalog:
+    """Available properties, one row per property."""
+    property_ids: np.ndarray
+    descriptions: List[str]
+    numeric: np.ndarray
+    city_ids: np.ndarray
+    district_ids: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.property_ids)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.numeric[:, NUMERIC_COLUMNS.index(name)]
+
+
+@dataclass
+class PropertyFeatureLinks:
+    """All Feature ids plus the (property_id, feature_id) rows of PropertyFeature."""
+    feature_ids: np.ndarray
+    property_ids: np.ndarray
+    link_feature_ids: np.ndarray
+
+
+@dataclass
+class Interactions:
+    user_ids: np.ndarray
+    property_ids: np.ndarray
+    ratings: np.ndarray
+    # Implicit signal strength of each interaction, for engines that use
+    # interactions as confidence weights instead of ratings
+    weights: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+def stream_chunks(conn: Connection, statement, chunk_size: int = LOADER_CHUNK_SIZE) -> Iterator[Sequence]:
+    result = conn.execution_options(stream_results=True).execute(statement)
+    try:
+        yield from result.partitions(chunk_size)
+    finally:
+        result.close()
+
+
+def load_array(conn: Connection, statement, n_columns: int, dtype=np.float64) -> np.ndarray:
+    """Run ``statement`` and stack its rows into an (n_rows, n_columns) array."""
+    chunks = [np.array(chunk, dtype=dtype).reshape(-1, n_columns) for chunk in stream_chunks(conn, statement)]
+    if not chunks:
+        return np.zeros((0, n_columns), dtype=dtype)
+    return np.concatenate(chunks)
+
+
+def load_catalog(conn: Connection, property_ids: Optional[Sequence[int]] = None) -> Catalog:
+    """Available properties, optionally only those among ``property_ids``."""
+    statement = (
+        select(
+            Property.property_id,
+            func.coalesce(Property.description, ""),
+            Property.bedrooms,
+            Property.bathrooms,
+            cast(func.coalesce(PropertyPricing.rent_price, 0), Float),
+            cast(func.coalesce(Property.land_area, 0), Float),
+            cast(func.coalesce(Property.floor_area, 0), Float),
+            func.coalesce(PropertyLocation.city_id, -1),
+            func.coalesce(PropertyLocation.district_id, -1),
+        )
+        .select_from(Property)
+        .join(PropertyPricing, PropertyPricing.property_id == Property.property_id, isouter=True)
+        .join(PropertyLocation, PropertyLocation.property_id == Property.property_id, isouter=True)
+        .where(Property.status == PropertyStatusEnum.available)
+        .order_by(Property.property_id)
+    )
+    if property_ids is not None:
+        statement = statement.where(Property.property_id.in_(list(property_ids)))
+    property_ids, descriptions, numeric, city_ids, district_ids = [], [], [], [], []
+    for chunk in stream_chunks(conn, statement):
+        property_ids.append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk)))
+        descriptions.extend(row[1] for row in chunk)
+        numeric.append(np.array([row[2:7] for row in chunk], dtype=np.float64))
+        city_ids.append(np.fromiter((row[7] for row in chunk), dtype=np.int64, count=len(chunk)))
+        district_ids.append(np.fromiter((row[8] for row in chunk), dtype=np.int64, count=len(chunk)))
+    if not property_ids:
+        empty = np.zeros(0, dtype=np.int64)
+        return Catalog(empty, [], np.zeros((0, len(NUMERIC_COLUMNS))), empty, empty)
+    return Catalog(
+        property_ids=np.concatenate(property_ids),
+        descriptions=descriptions,
+        numeric=np.concatenate(numeric),
+        city_ids=np.concatenate(city_ids),
+        district_ids=np.concatenate(district_ids),
+    )
+
+
+def load_feature_links(conn: Connection, property_ids: Optional[Sequence[int]] = None) -> PropertyFeatureLinks:
+    feature_ids = load_array(conn, select(Feature.feature_id).order_by(Feature.feature_id), 1, np.int64)
+    statement = select(PropertyFeature.property_id, PropertyFeature.feature_id)
+    if property_ids is not None:
+        statement = statement.where(PropertyFeature.property_id.in_(list(property_ids)))
+    links = load_array(conn, statement, 2, np.int64)
+    return PropertyFeatureLinks(
+        feature_ids=feature_ids[:, 0],
+        property_ids=links[:, 0],
+        link_feature_ids=links[:, 1],
+    )
@@ -1,22 +1,38 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlmodel import Session, create_engine, select
-from sqlmodel import SQLModel
-from typing import List
-from pydantic import BaseModel
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-from surprise import SVD, Dataset, Reader
-from surprise.model_selection import train_test_split
-import pandas as pd
-import os
-from models import Property, PropertyPricing, WishList, PropertyView, Review, User, ViewingRequest, Feature
-from enums import PropertyStatusEnum, ReviewStatusEnum
-from sqlalchemy.orm import joinedload
-from sqlalchemy import func
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlmodel import Session, select
+from typing import Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+from models import User
+from datetime import datetime
+import hmac
 import logging
+import signal
+import threading
+import time
 # NEW: Import CORSMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+from artifacts import HybridModel
+from cache import RecommendationCache
+from candidates import Constraints, candidate_index
+from collaborative import OnlineUpdater
+from config import (
+    ADMIN_TOKEN, CACHE_MAX_STALE_SECONDS, CACHE_MAX_USERS, CACHE_TTL_SECONDS, DATABASE_URL, EVENTS_CHANNEL,
+    INGEST_INTERVAL_SECONDS, MAX_BATCH_USERS, MODEL_POLL_INTERVAL_SECONDS, ONLINE_UPDATES, SCORING_QUEUE_DEPTH,
+    SCORING_WORKERS, SIMILAR_TOP_K,
+)
+from db import engine, get_session
+from enums import PropertyStatusEnum, ReviewStatusEnum
+from events import ChangeEvent, EventListener
+from executor import PeriodicTask, PoolFullError, ScoringPool
+from interaction_store import KIND_REVIEW, KIND_VIEW, KIND_WISHLIST, InteractionStore, UserInteractionIndex
+from listings import ListingUpdater
+from metrics import REGISTRY, counter, gauge, histogram, span
+from popularity import PopularityRanking
+from precompute import read_precomputed
+from profile_updates import ProfileUpdater
+from recommender import get_batch_recommendations, get_hybrid_recommendations, get_similar_properties
+from registry import ModelRegistry
 
 
 # Setup logging at the top
@@ -40,20 +56,174 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Database connection
-DATABASE_URL = (
-    f"postgresql://{os.getenv('POSTGRES_USER')}:"
-    f"{os.getenv('POSTGRES_PASSWORD')}@"
-    f"{os.getenv('POSTGRES_SERVER')}:"
-    f"{os.getenv('POSTGRES_PORT')}/"
-    f"{os.getenv('POSTGRES_DB')}"
-)
-engine = create_engine(DATABASE_URL)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template, so /recommend/hybrid/{user_id} is one series
+    route = request.scope.get("route")
+    if route is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route=route.path)
+    return response
+
+# Model produced by train.py. train.py publishes a version by renaming its
+# directory into place and replacing LATEST; the registry notices on its own
+# thread (or on SIGHUP), validates the version and swaps it in, while
+# requests keep scoring with the model they started with
+model_registry = ModelRegistry(prepare=candidate_index)
+model_loader = PeriodicTask("model-loader", MODEL_POLL_INTERVAL_SECONDS, model_registry.poll)
+
+
+def get_model() -> Optional[HybridModel]:
+    return model_registry.active
+
+
+# Per-user results, invalidated by change events from the database
+recommendation_cache = RecommendationCache(
+    CACHE_MAX_USERS, CACHE_TTL_SECONDS, CACHE_MAX_STALE_SECONDS)
+event_listener = EventListener(DATABASE_URL, EVENTS_CHANNEL)
+
+# User interactions come from the local store that train.py keeps ingesting;
+# new ones are also folded into the loaded model's factors between retrains,
+# as are listing changes reported by property events
+interaction_store = InteractionStore()
+interaction_index = UserInteractionIndex(interaction_store)
+online_updater = OnlineUpdater(interaction_store)
+profile_updater = ProfileUpdater(interaction_store)
+listing_updater = ListingUpdater(engine)
+# Cold-start rankings, kept current from new interaction rows and property events
+popularity_ranking = PopularityRanking(engine)
+
+
+def apply_live_updates() -> None:
+    model = get_model()
+    state = interaction_store.state()
+    listing_updater.apply(model)
+    if model is not None:
+        # Re-sort the candidate sources here rather than in the first request after a change
+        candidate_index(model)
+    if ONLINE_UPDATES:
+        online_updater.apply(model, state)
+    # Before the index refresh, so the index still shows what the profiles have seen
+    profile_updater.apply(model, state, interaction_index)
+    # Refresh the index after the factors so data_as_of() never runs ahead of them
+    interaction_index.refresh(state)
+    popularity_ranking.refresh()
+
+
+live_updater = PeriodicTask("live-updates", INGEST_INTERVAL_SECONDS, apply_live_updates)
+
+# Scoring and its database reads run here, never on the event loop
+scoring_pool = ScoringPool(SCORING_WORKERS, SCORING_QUEUE_DEPTH)
+
+
+def invalidate_cache(event: ChangeEvent) -> None:
+    if event.is_interaction and event.user_id is not None:
+        recommendation_cache.invalidate_user(event.user_id)
+    elif event.table == "property" and event.property_id is not None:
+        if event.op == "DELETE" or event.status != PropertyStatusEnum.available.value:
+            recommendation_cache.invalidate_property(event.property_id)
+
+
+def track_listing(event: ChangeEvent) -> None:
+    if event.table == "property" and event.property_id is not None:
+        listing_updater.mark(event.property_id)
+        popularity_ranking.mark(event.property_id)
+
+
+# Interaction kind stored for each table whose rows feed the content profiles
+PROFILE_TABLE_KINDS = {"wishlist": KIND_WISHLIST, "review": KIND_REVIEW, "propertyview": KIND_VIEW}
+
+
+def track_removal(event: ChangeEvent) -> None:
+    """Take deleted interactions, and reviews that lost their approval, out of the profiles."""
+    kind = PROFILE_TABLE_KINDS.get(event.table)
+    if kind is None or event.user_id is None or event.property_id is None:
+        return
+    approved = event.status == ReviewStatusEnum.approved.value
+    if kind == KIND_REVIEW:
+        # Only approved reviews are stored
+        removed = (event.op == "DELETE" and approved) or (event.op == "UPDATE" and not approved)
+    else:
+        removed = event.op == "DELETE"
+    if removed:
+        profile_updater.remove(event.user_id, event.property_id, kind)
+
+
+event_listener.subscribe(invalidate_cache)
+event_listener.subscribe(track_listing)
+event_listener.subscribe(track_removal)
+
+
+# Metrics for /metrics; the scoring stages are timed in recommender.py
+CACHE_LOOKUPS = counter(
+    "recommender_cache_lookups_total", "Per-user cache lookups by result (hit, stale, miss, bypass).", ("result",))
+PRECOMPUTED_LOOKUPS = counter(
+    "recommender_precomputed_lookups_total", "Precomputed list lookups by result (hit, miss).", ("result",))
+REJECTED_REQUESTS = counter(
+    "recommender_rejected_requests_total", "Requests turned away because the scoring pool was full.")
+REQUEST_SECONDS = histogram("recommender_request_seconds", "Request latency by route.", ("route",))
+
+
+def _from_model(fn: Callable[[HybridModel], object]) -> Callable[[], object]:
+    """Gauge callback reading the served model; no sample while there is none."""
+    def read():
+        model = get_model()
+        return None if model is None else fn(model)
+    return read
+
+
+gauge("recommender_model_loaded", "1 while a model is being served.", lambda: get_model() is not None)
+gauge("recommender_model_info", "Version of the model being served.",
+      _from_model(lambda model: {model.version: 1}), ("version",))
+gauge("recommender_model_age_seconds", "Seconds since the served model was trained.",
+      _from_model(lambda model: time.time() - datetime.fromisoformat(model.trained_at).timestamp()))
+gauge("recommender_catalog_items", "Listings in the served model's catalog.",
+      _from_model(lambda model: len(model.item_ids)))
+gauge("recommender_model_users", "Users with collaborative factors in the served model.",
+      _from_model(lambda model: len(model.cf_user_ids)))
+gauge("recommender_training_stage_seconds", "Seconds each stage took when the served model was trained.",
+      _from_model(lambda model: model.training_seconds), ("stage",))
+gauge("recommender_cache_entries", "Users with a cached result.", lambda: len(recommendation_cache))
+gauge("recommender_scoring_in_flight", "Jobs running or queued on the scoring pool.", lambda: scoring_pool.in_flight)
+gauge("recommender_indexed_interactions", "Interactions in the request path's index.", lambda: interaction_index.count)
+gauge("recommender_data_lag_seconds", "Seconds since the indexed interactions were complete.",
+      lambda: time.time() - interaction_index.as_of if interaction_index.as_of else None)
+gauge("recommender_popularity_ready", "1 once the cold-start rankings are loaded.",
+      lambda: popularity_ranking.ready)
+
+
+def data_as_of() -> float:
+    """Point in time the inputs of a computation started now reflect."""
+    return min(recommendation_cache.now(), interaction_index.as_of)
+
+
+DEFAULT_TOP_N = 10
+
+
+def compute_recommendations(user_id: int, session: Session, model: Optional[HybridModel]) -> List[int]:
+    """Default recommendations: the precomputed list while it is current, else scored live."""
+    with span("precomputed"):
+        precomputed = read_precomputed(session, user_id, interaction_index, DEFAULT_TOP_N)
+    PRECOMPUTED_LOOKUPS.inc(result="miss" if precomputed is None else "hit")
+    if precomputed is not None:
+        return precomputed.property_ids
+    return get_hybrid_recommendations(user_id, session, model, interaction_index, popularity=popularity_ranking)
 
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+def refresh_recommendations(user_id: int) -> None:
+    """Recompute a user's cached result outside the request that found it stale."""
+    try:
+        started_at = data_as_of()
+        model = get_model()
+        with Session(engine) as session:
+            recommendations = compute_recommendations(user_id, session, model)
+        recommendation_cache.put(user_id, model.version if model else None, recommendations, started_at)
+    except Exception:
+        logger.exception("Background refresh failed for user %s", user_id)
+    finally:
+        recommendation_cache.end_refresh(user_id)
 
 # Pydantic model for response
 
@@ -61,161 +231,221 @@ def get_session():
 class RecommendationResponse(BaseModel):
     property_ids: List[int]
 
-# Hybrid Recommendation
-
-
-def get_hybrid_recommendations(user_id: int, session: Session, top_n: int = 10, content_weight: float = 0.6) -> List[int]:
-    # Fetch user interactions
-    wishlist = session.exec(select(WishList).where(
-        WishList.user_id == user_id)).all()
-    views = session.exec(select(PropertyView).where(
-        PropertyView.user_id == user_id)).all()
-    reviews = session.exec(select(Review).where(
-        Review.user_id == user_id)).all()
-    interacted_property_ids = [
-        item.property_id for item in wishlist + views + reviews]
-
-    # Fetch all available properties with location and features
-    properties = session.exec(
-        select(Property)
-        .where(Property.status == PropertyStatusEnum.available)
-        .options(
-            joinedload(Property.pricing),
-            joinedload(Property.property_location),
-            joinedload(Property.features)
-        )
-    ).unique().all()
-    if not properties:
-        return []
-
-    # Fallback for new users
-    if not interacted_property_ids:
-        popular_properties = session.exec(
-            select(Property)
-            .where(Property.status == PropertyStatusEnum.available)
-            .join(PropertyView, isouter=True)
-            .group_by(Property.property_id)
-            .order_by(func.count(PropertyView.view_id).desc())
-            .limit(top_n)
-        ).all()
-        return [p.property_id for p in popular_properties]
-
-    # Fetch all features to create a feature list for one-hot encoding
-    all_features = session.exec(select(Feature)).all()
-    feature_dict = {f.feature_id: i for i, f in enumerate(all_features)}
-
-    # Create feature vectors
-    descriptions = [p.description or "" for p in properties]
-    tfidf = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = tfidf.fit_transform(descriptions)
-
-    # Numerical features including land_area, floor_area
-    numerical_features = np.array([
-        [
-            p.bedrooms,
-            p.bathrooms,
-            float(p.pricing.rent_price if p.pricing else 0),
-            float(p.land_area),
-            float(p.floor_area)
-        ] for p in properties
-    ])
-    numerical_features = (numerical_features - numerical_features.mean(axis=0)
-                          ) / (numerical_features.std(axis=0) + 1e-8)
-
-    # One-hot encode features (amenities)
-    feature_matrix = np.zeros((len(properties), len(feature_dict)))
-    for i, p in enumerate(properties):
-        for f in p.features:
-            if f.feature_id in feature_dict:
-                feature_matrix[i, feature_dict[f.feature_id]] = 1
-
-    # Combine all features
-    feature_matrix = np.hstack(
-        [tfidf_matrix.toarray(), numerical_features, feature_matrix])
-
-    # Compute user profile
-    interacted_indices = [i for i, p in enumerate(
-        properties) if p.property_id in interacted_property_ids]
-    weights = []
-    for pid in [properties[i].property_id for i in interacted_indices]:
-        if any(w.property_id == pid for w in wishlist):
-            weights.append(2.0)
-        elif any(r.property_id == pid for r in reviews):
-            weights.append(1.5)
-        else:
-            weights.append(1.0)
-    user_profile = np.average(
-        feature_matrix[interacted_indices], axis=0, weights=weights)
-
-    # Compute content-based scores with location boost
-    content_scores = cosine_similarity([user_profile], feature_matrix)[0]
-
-    # Location-based score (city matching)
-    user_cities = {
-        properties[i].property_location.city_id for i in interacted_indices if properties[i].property_location}
-    location_scores = np.array([
-        1.0 if p.property_location and p.property_location.city_id in user_cities else 0.5
-        for p in properties
-    ])
-    content_scores = 0.8 * content_scores + 0.2 * location_scores
-    content_scores = (content_scores - content_scores.min()) / \
-        (content_scores.max() - content_scores.min() + 1e-8)
-
-    # Collaborative Filtering
-    interactions = [(r.user_id, r.property_id, float(r.rating))
-                    for r in session.exec(select(Review).where(Review.status == ReviewStatusEnum.approved)).all()]
-    interactions += [(w.user_id, w.property_id, 5.0)
-                     for w in session.exec(select(WishList)).all()]
-    interactions += [(v.user_id, v.property_id, 3.0)
-                     for v in session.exec(select(PropertyView)).all()]
-    interactions += [(vr.user_id, vr.property_id, 4.0)
-                     for vr in session.exec(select(ViewingRequest)).all()]
-
-    # Calculate average rating for new properties
-    avg_rating = np.mean(
-        [rating for _, _, rating in interactions]) if interactions else 3.0
-
-    # Load into surprise
-    collab_scores = np.zeros(len(properties))
-    if interactions:
-        reader = Reader(rating_scale=(1, 5))
-        data = Dataset.load_from_df(pd.DataFrame(interactions, columns=[
-                                    "user_id", "property_id", "rating"]), reader)
-        trainset, _ = train_test_split(data, test_size=0.2, random_state=42)
-        algo = SVD()
-        algo.fit(trainset)
-        collab_scores = np.array([
-            algo.predict(user_id, p.property_id).est if p.property_id in set(i[1] for i in interactions)
-            else avg_rating
-            for p in properties
-        ])
-        collab_scores = (collab_scores - collab_scores.min()) / \
-            (collab_scores.max() - collab_scores.min() + 1e-8)
-
-    # Combine scores
-    hybrid_scores = content_weight * content_scores + \
-        (1 - content_weight) * collab_scores
-    top_indices = np.argsort(hybrid_scores)[::-1][:top_n]
-    return [properties[i].property_id for i in top_indices if properties[i].property_id not in interacted_property_ids]
 
-# Endpoint
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_items=1, max_items=MAX_BATCH_USERS)
+    top_n: int = Field(DEFAULT_TOP_N, ge=1, le=100)
+    city_id: Optional[int] = None
+    max_price: Optional[float] = Field(None, gt=0)
+    min_bedrooms: Optional[int] = Field(None, ge=0)
 
+    @property
+    def constraints(self) -> Constraints:
+        return Constraints(self.city_id, self.max_price, self.min_bedrooms)
 
-@app.get("/recommend/hybrid/{user_id}", response_model=RecommendationResponse)
-async def hybrid_recommendations(user_id: int, session: Session = Depends(get_session)):
+
+class BatchRecommendationResponse(BaseModel):
+    recommendations: Dict[int, List[int]]
+    unknown_user_ids: List[int]
+
+
+def serve_user_recommendations(user_id: int, session: Session, constraints: Constraints) -> Optional[List[int]]:
+    """Blocking part of the single-user endpoint; None if the user does not exist."""
     user = session.exec(select(User).where(User.user_id == user_id)).first()
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        return None
+    model = get_model()
+    version = model.version if model else None
+    # The cache only holds unconstrained results
+    if not constraints.is_empty:
+        CACHE_LOOKUPS.inc(result="bypass")
+        return get_hybrid_recommendations(user_id, session, model, interaction_index,
+                                          constraints=constraints, popularity=popularity_ranking)
+    cached = recommendation_cache.get(user_id, version)
+    CACHE_LOOKUPS.inc(result="miss" if cached is None else "stale" if cached.stale else "hit")
+    if cached is not None:
+        # Serve stale results right away and refresh them on spare capacity
+        if cached.stale and recommendation_cache.try_begin_refresh(user_id):
+            future = None
+            if scoring_pool.in_flight < scoring_pool.max_workers:
+                future = scoring_pool.try_submit(refresh_recommendations, user_id)
+            if future is None:
+                recommendation_cache.end_refresh(user_id)
+        return cached.property_ids
+    started_at = data_as_of()
+    recommendations = compute_recommendations(user_id, session, model)
+    recommendation_cache.put(user_id, version, recommendations, started_at)
+    return recommendations
+
+
+def serve_batch_recommendations(request: BatchRecommendationRequest, session: Session) -> BatchRecommendationResponse:
+    user_ids = list(dict.fromkeys(request.user_ids))
+    known_ids = set(session.exec(select(User.user_id).where(User.user_id.in_(user_ids))).all())
+    model = get_model()
+    version = model.version if model else None
+    started_at = data_as_of()
+    constraints = request.constraints
+    recommendations = get_batch_recommendations(
+        [u for u in user_ids if u in known_ids], session, model, interaction_index, top_n=request.top_n,
+        constraints=constraints, popularity=popularity_ranking)
+    # Pre-warm the per-user cache, which serves unconstrained results at the default top_n
+    if request.top_n == DEFAULT_TOP_N and constraints.is_empty:
+        for user_id, property_ids in recommendations.items():
+            recommendation_cache.put(user_id, version, property_ids, started_at)
+    return BatchRecommendationResponse(
+        recommendations=recommendations,
+        unknown_user_ids=[u for u in user_ids if u not in known_ids],
+    )
+
+
+def service_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503, detail="Recommendation service is busy, retry shortly", headers={"Retry-After": "1"})
+
+# Endpoint
+
+
+@app.get("/recommend/hybrid/{user_id}", response_model=RecommendationResponse)
+async def hybrid_recommendations(
+    user_id: int,
+    city_id: Optional[int] = None,
+    max_price: Optional[float] = Query(None, gt=0),
+    min_bedrooms: Optional[int] = Query(None, ge=0),
+    session: Session = Depends(get_session),
+):
+    constraints = Constraints(city_id, max_price, min_bedrooms)
     try:
-        recommendations = get_hybrid_recommendations(user_id, session)
-        return RecommendationResponse(property_ids=recommendations)
+        recommendations = await scoring_pool.run(serve_user_recommendations, user_id, session, constraints)
+    except PoolFullError:
+        REJECTED_REQUESTS.inc()
+        raise service_busy()
     except Exception as e:
         logger.exception("Error generating recommendations")  # Logs full traceback
         raise HTTPException(status_code=500, detail=str(e))  # Optional: show error for easier debug
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return RecommendationResponse(property_ids=recommendations)
+
+
+@app.post("/recommend/hybrid/batch", response_model=BatchRecommendationResponse)
+async def batch_hybrid_recommendations(request: BatchRecommendationRequest, session: Session = Depends(get_session)):
+    try:
+        return await scoring_pool.run(serve_batch_recommendations, request, session)
+    except PoolFullError:
+        REJECTED_REQUESTS.inc()
+        raise service_busy()
+    except Exception as e:
+        logger.exception("Error generating batch recommendations")
+        raise HTTPException(status_code=500, detail=str(e))
 
-# Create tables on startup
+
+@app.get("/recommend/similar/{property_id}", response_model=RecommendationResponse)
+async def similar_properties(
+    property_id: int,
+    top_n: int = Query(DEFAULT_TOP_N, ge=1, le=SIMILAR_TOP_K),
+    session: Session = Depends(get_session),
+):
+    """Listings saved, requested or viewed by the same users as ``property_id``."""
+    try:
+        recommendations = await scoring_pool.run(get_similar_properties, property_id, session, get_model(), top_n)
+    except PoolFullError:
+        REJECTED_REQUESTS.inc()
+        raise service_busy()
+    except Exception as e:
+        logger.exception("Error finding similar properties")
+        raise HTTPException(status_code=500, detail=str(e))
+    return RecommendationResponse(property_ids=recommendations)
+
+
+@app.get("/recommend/popular", response_model=RecommendationResponse)
+def popular_recommendations(
+    city_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    top_n: int = Query(DEFAULT_TOP_N, ge=1, le=100),
+):
+    """Most popular available listings, optionally within a city and/or category."""
+    if not popularity_ranking.ready:
+        raise service_busy()
+    return RecommendationResponse(
+        property_ids=popularity_ranking.top(top_n, Constraints(city_id=city_id), category_id))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Counters, stage timings and gauges in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/health/ready")
+def readiness():
+    """200 once a model is loaded, 503 until then."""
+    model = get_model()
+    if model is None:
+        return JSONResponse(status_code=503, content={"ready": False, "model_version": None})
+    return {"ready": True, "model_version": model.version}
+
+
+class RollbackRequest(BaseModel):
+    version: Optional[str] = None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    # Closed unless a token is configured
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled; set RECOMMENDER_ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+def model_report():
+    return model_registry.report()
+
+
+@app.post("/admin/model/rollback", dependencies=[Depends(require_admin)])
+def rollback_model(request: RollbackRequest):
+    """Serve ``version`` (default: the previously active one) until resumed."""
+    try:
+        model_registry.rollback(request.version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Version rejected: {e}")
+    return model_registry.report()
+
+
+@app.post("/admin/model/resume", dependencies=[Depends(require_admin)])
+def resume_model():
+    """Follow LATEST again; the newest version is picked up on the next poll."""
+    model_registry.resume()
+    model_registry.poll()
+    return model_registry.report()
+
+# Load the latest trained model on startup
 
 
 @app.on_event("startup")
 async def on_startup():
-    pass
+    if model_registry.poll() is None:
+        logger.warning("No trained model found; run train.py to produce one")
+    # Signal handlers can only be installed from the main thread (not e.g. under TestClient)
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, model_registry.request_reload)
+    # The model serves from its artifacts; if the database is unreachable at
+    # boot, live_updater retries on its next run
+    try:
+        apply_live_updates()
+    except Exception:
+        logger.exception("Initial live update failed; retrying in %ss", INGEST_INTERVAL_SECONDS)
+    model_loader.start()
+    live_updater.start()
+    if engine.dialect.name == "postgresql":
+        event_listener.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    event_listener.stop()
+    model_loader.stop()
+    live_updater.stop()
+    scoring_pool.shutdown()
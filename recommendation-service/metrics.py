@@ -0,0 +1,193 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are updated from request threads under a per-metric
+lock; gauges are read from a callback when ``/metrics`` is scraped, so they
+never go stale. Use ``span`` to time a stage of the request path into
+``recommender_stage_seconds``.
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Seconds; finer than Prometheus' defaults at the low end, where most stages are
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) of every series."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0.0)]
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+
+class Gauge(Metric):
+    """Value read from ``fn`` at scrape time.
+
+    With labels, ``fn`` returns {label value(s): value}; a None result (or
+    value) leaves the series out, e.g. while no model is loaded.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 fn: Callable[[], Union[None, float, Dict[Union[str, LabelValues], float]]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        result = self.fn()
+        if result is None:
+            return []
+        if not self.labelnames:
+            return [(self.name, "", float(result))]
+        samples = []
+        for key, value in sorted(result.items()):
+            if value is not None:
+                key = key if isinstance(key, tuple) else (key,)
+                samples.append((self.name, _format_labels(self.labelnames, key), float(value)))
+        return samples
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        samples = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, fn: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, fn, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram(
+    "recommender_stage_seconds", "Time spent in each stage of computing recommendations.", ("stage",))
+
+
+@contextmanager
+def span(stage: str, durations: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Time the enclosed block as ``stage``, also adding it to ``durations`` if given."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if durations is not None:
+            durations[stage] = durations.get(stage, 0.0) + elapsed
@@ -14,6 +14,7 @@ class PropertyFeature(SQLModel, table=True):
 
 class User(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, primary_key=True)
+    is_active: bool = Field(default=True)
     wishlist_items: List["WishList"] = Relationship(back_populates="user")
     property_views: List["PropertyView"] = Relationship(back_populates="user")
     reviews: List["Review"] = Relationship(back_populates="user")
@@ -24,6 +25,7 @@ class User(SQLModel, table=True):
 class Property(SQLModel, table=True):
     property_id: Optional[int] = Field(default=None, primary_key=True)
     description: str = Field(sa_column=Column(String))
+    category_id: Optional[int] = Field(default=None)
     bedrooms: int = Field(default=0)
     bathrooms: int = Field(default=0)
     land_area: Decimal = Field(default=Decimal(
@@ -121,7 +123,25 @@ class PropertyLocation(SQLModel, table=True):
     property_id: int = Field(sa_column=Column(Integer, ForeignKey(
         "property.property_id", ondelete="CASCADE"), primary_key=True))
     city_id: int = Field(index=True)
+    district_id: Optional[int] = Field(default=None, index=True)
     latitude: Optional[float] = Field(default=None)
     longitude: Optional[float] = Field(default=None)
     property: Optional["Property"] = Relationship(
         back_populates="property_location")
+
+
+class UserRecommendation(SQLModel, table=True):
+    """Top-N list written by precompute.py, one row per (user, rank)."""
+    __tablename__ = "user_recommendation"
+    user_id: int = Field(sa_column=Column(Integer, ForeignKey(
+        "user.user_id", ondelete="CASCADE"), primary_key=True))
+    rank: int = Field(sa_column=Column(Integer, primary_key=True))
+    property_id: int = Field(sa_column=Column(Integer, ForeignKey(
+        "property.property_id", ondelete="CASCADE"), nullable=False))
+    score: float
+    model_version: str = Field(sa_column=Column(String(32), nullable=False))
+    # Stored interactions of the user and store generation when scored; a
+    # different count, or a compaction since, means the user may have changed
+    interaction_count: int
+    interactions_generation: int = Field(default=0)
+    computed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
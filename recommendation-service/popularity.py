@@ -0,0 +1,221 @@
+"""Time-decayed popularity rankings for cold-start users.
+
+Every view, wishlist addition and viewing request adds its IMPLICIT_WEIGHTS
+weight to the listing's score, decayed with a half-life of
+POPULARITY_HALF_LIFE_DAYS. Scores are kept relative to a reference time, as
+sum(w * exp(lambda * (t - t_ref))): decaying everything at once multiplies all
+scores by the same factor, so new events can simply be added and the order
+never has to be recomputed just because time passed.
+
+``PopularityRanking.refresh`` reads only rows past its watermarks (plus
+listings marked by property events) and swaps in new sorted arrays, overall
+and per city and category, so a request just slices an array.
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from candidates import Constraints
+from config import POPULARITY_HALF_LIFE_DAYS, POPULARITY_WINDOW_DAYS
+from enums import PropertyStatusEnum
+from interaction_store import IMPLICIT_WEIGHTS, KIND_VIEW, KIND_VIEWING_REQUEST, KIND_WISHLIST
+from loader import stream_chunks
+from models import Property, PropertyLocation, PropertyPricing, PropertyView, ViewingRequest, WishList
+
+logger = logging.getLogger(__name__)
+
+# Re-reference scores once exp(lambda * (t - t_ref)) grows past e^REBASE_EXPONENT
+REBASE_EXPONENT = 50.0
+
+
+def _epoch(value: datetime) -> float:
+    # Naive timestamps come from columns written in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _group(keys: np.ndarray) -> Dict[int, np.ndarray]:
+    """Positions of each non-negative key, in their existing (score) order."""
+    grouping = np.argsort(keys, kind="stable")
+    unique_keys, starts = np.unique(keys[grouping], return_index=True)
+    ends = np.append(starts[1:], len(grouping))
+    return {int(key): grouping[start:end] for key, start, end in zip(unique_keys, starts, ends) if key >= 0}
+
+
+@dataclass
+class Rankings:
+    """Available listings ordered by popularity, with per-city and per-category positions."""
+    property_ids: np.ndarray
+    city_ids: np.ndarray
+    category_ids: np.ndarray
+    prices: np.ndarray
+    bedrooms: np.ndarray
+    by_city: Dict[int, np.ndarray] = field(default_factory=dict)
+    by_category: Dict[int, np.ndarray] = field(default_factory=dict)
+
+    def top(self, top_n: int, constraints: Optional[Constraints] = None,
+            category_id: Optional[int] = None) -> List[int]:
+        positions = None
+        if constraints is not None and constraints.city_id is not None:
+            positions = self.by_city.get(constraints.city_id, np.zeros(0, dtype=np.int64))
+        if category_id is not None:
+            in_category = self.by_category.get(category_id, np.zeros(0, dtype=np.int64))
+            positions = in_category if positions is None else positions[self.category_ids[positions] == category_id]
+        if constraints is not None and (constraints.max_price is not None or constraints.min_bedrooms is not None):
+            if positions is None:
+                positions = np.arange(len(self.property_ids))
+            if constraints.max_price is not None:
+                positions = positions[self.prices[positions] <= constraints.max_price]
+            if constraints.min_bedrooms is not None:
+                positions = positions[self.bedrooms[positions] >= constraints.min_bedrooms]
+        if positions is None:
+            return self.property_ids[:top_n].tolist()
+        return self.property_ids[positions[:top_n]].tolist()
+
+
+class PopularityRanking:
+    def __init__(self, engine: Engine, half_life_days: float = POPULARITY_HALF_LIFE_DAYS,
+                 window_days: float = POPULARITY_WINDOW_DAYS):
+        self.engine = engine
+        self.decay_rate = math.log(2) / (half_life_days * 86400)
+        self.window_seconds = window_days * 86400
+        self._lock = threading.Lock()
+        self._pending: Set[int] = set()
+        self._scores: Dict[int, float] = {}
+        # property_id -> (city_id, category_id, rent price, bedrooms) of available listings
+        self._listings: Dict[int, Tuple[int, int, float, int]] = {}
+        self._reference = time.time()
+        self._view_id: Optional[int] = None
+        self._request_id = 0
+        self._wishlist_since: Optional[datetime] = None
+        self._wishlist_keys: Set[Tuple[int, int]] = set()
+        self._rankings: Optional[Rankings] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._rankings is not None
+
+    def mark(self, property_id: int) -> None:
+        """Reload this listing's availability and attributes on the next refresh."""
+        with self._lock:
+            self._pending.add(property_id)
+
+    def top(self, top_n: int, constraints: Optional[Constraints] = None,
+            category_id: Optional[int] = None) -> List[int]:
+        return self._rankings.top(top_n, constraints, category_id)
+
+    def _add(self, property_ids: List[int], timestamps: List[float], weight: float) -> None:
+        now = time.time()
+        if self.decay_rate * (now - self._reference) > REBASE_EXPONENT:
+            factor = math.exp(-self.decay_rate * (now - self._reference))
+            self._scores = {p: score * factor for p, score in self._scores.items()}
+            self._reference = now
+        for property_id, at in zip(property_ids, timestamps):
+            self._scores[property_id] = (self._scores.get(property_id, 0.0)
+                                         + weight * math.exp(self.decay_rate * (at - self._reference)))
+
+    def _load_listings(self, conn: Connection,
+                       property_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, int, float, int]]:
+        statement = (
+            select(Property.property_id, func.coalesce(PropertyLocation.city_id, -1),
+                   func.coalesce(Property.category_id, -1),
+                   cast(PropertyPricing.rent_price, Float), func.coalesce(Property.bedrooms, 0))
+            .select_from(Property)
+            .join(PropertyLocation, PropertyLocation.property_id == Property.property_id, isouter=True)
+            .join(PropertyPricing, PropertyPricing.property_id == Property.property_id, isouter=True)
+            .where(Property.status == PropertyStatusEnum.available)
+        )
+        if property_ids is not None:
+            statement = statement.where(Property.property_id.in_(property_ids))
+        # Unpriced listings get NaN, which no price limit admits
+        return {int(p): (int(city), int(category), np.nan if price is None else float(price), int(bedrooms))
+                for chunk in stream_chunks(conn, statement) for p, city, category, price, bedrooms in chunk}
+
+    def _read_events(self, conn: Connection) -> int:
+        """Add events past the watermarks (initially: those within the window); returns how many."""
+        first = self._view_id is None
+        cutoff = datetime.fromtimestamp(time.time() - self.window_seconds, timezone.utc).replace(tzinfo=None)
+        added = 0
+        for id_column, property_column, at_column, kind in (
+            (PropertyView.view_id, PropertyView.property_id, PropertyView.viewed_at, KIND_VIEW),
+            (ViewingRequest.request_id, ViewingRequest.property_id, ViewingRequest.created_at, KIND_VIEWING_REQUEST),
+        ):
+            after = self._view_id if kind == KIND_VIEW else self._request_id
+            statement = select(id_column, property_column, at_column).where(id_column > (after or 0))
+            if first:
+                # Fix the watermark before scanning so nothing slips in between
+                last_id = conn.execute(select(func.max(id_column))).scalar() or 0
+                statement = statement.where(id_column <= last_id, at_column >= cutoff)
+            rows = [row for chunk in stream_chunks(conn, statement.order_by(id_column)) for row in chunk]
+            if not first:
+                last_id = max((row[0] for row in rows), default=after)
+            self._add([row[1] for row in rows], [_epoch(row[2]) for row in rows], IMPLICIT_WEIGHTS[kind])
+            if kind == KIND_VIEW:
+                self._view_id = last_id
+            else:
+                self._request_id = last_id
+            added += len(rows)
+
+        # Wishlist rows have no id: follow added_at, skipping keys already seen at the watermark
+        since = cutoff if first else self._wishlist_since
+        rows = conn.execute(select(WishList.user_id, WishList.property_id, WishList.added_at)
+                            .where(WishList.added_at >= since).order_by(WishList.added_at)).all()
+        new = [(u, p, at) for u, p, at in rows if (u, p) not in self._wishlist_keys]
+        self._wishlist_since = since
+        if new:
+            latest = max(at for _, _, at in new)
+            keys = {(u, p) for u, p, at in rows if at == latest}
+            if latest == since:
+                keys |= self._wishlist_keys
+            self._wishlist_since, self._wishlist_keys = latest, keys
+            self._add([p for _, p, _ in new], [_epoch(at) for _, _, at in new], IMPLICIT_WEIGHTS[KIND_WISHLIST])
+        return added + len(new)
+
+    def _build(self) -> Rankings:
+        n_listings = len(self._listings)
+        property_ids = np.fromiter(self._listings, dtype=np.int64, count=n_listings)
+        attributes = np.array(list(self._listings.values()), dtype=np.float64).reshape(n_listings, 4)
+        scores = np.fromiter((self._scores.get(p, 0.0) for p in property_ids.tolist()), dtype=np.float64,
+                             count=n_listings)
+        # Most popular first; ties (e.g. never seen) newest listing first
+        order = np.lexsort((-property_ids, -scores))
+        attributes = attributes[order]
+        rankings = Rankings(
+            property_ids=property_ids[order],
+            city_ids=attributes[:, 0].astype(np.int64),
+            category_ids=attributes[:, 1].astype(np.int64),
+            prices=attributes[:, 2],
+            bedrooms=attributes[:, 3].astype(np.int64),
+        )
+        rankings.by_city = _group(rankings.city_ids)
+        rankings.by_category = _group(rankings.category_ids)
+        return rankings
+
+    def refresh(self) -> int:
+        """Fold in new events and listing changes; returns how many events were added."""
+        with self._lock:
+            marked, self._pending = sorted(self._pending), set()
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            if self._rankings is None:
+                self._listings = self._load_listings(conn)
+            elif marked:
+                available = self._load_listings(conn, marked)
+                for property_id in marked:
+                    self._listings.pop(property_id, None)
+                self._listings.update(available)
+            added = self._read_events(conn)
+        if self._rankings is None or added or marked:
+            self._rankings = self._build()
+            logger.info("Popularity rankings: %d listings, %d new events, rebuilt in %.3fs",
+                        len(self._listings), added, time.perf_counter() - started)
+        return added
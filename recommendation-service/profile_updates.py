@@ -0,0 +1,163 @@
+"""Keeps the serving model's stored user profiles in step with the interaction store.
+
+Records appended to the store after the model's training prefix are folded
+in once each, and interactions deleted since (reported by change events via
+``remove``) are taken out: a profile only changes when a user's strongest
+signal on an item moves, and then by a single rank-one adjustment, negative
+for removals. Removed records stay in the store until the next compaction,
+which starts a new generation; the profiles are then rebuilt from the
+compacted store in one pass.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifacts import HybridModel
+from interaction_store import PROFILE_WEIGHTS, InteractionStore, StoreState, UserInteractionIndex, profile_weights
+from profiles import build_profiles
+
+logger = logging.getLogger(__name__)
+
+# (user_id, property_id, kind) of a stored record
+RecordKey = Tuple[int, int, int]
+
+
+def _keys(records: np.ndarray) -> List[RecordKey]:
+    return list(zip(records["user_id"].tolist(), records["property_id"].tolist(), records["kind"].tolist()))
+
+
+def _weights(records: np.ndarray, removed: Counter) -> Dict[int, Dict[int, float]]:
+    """``profile_weights`` of ``records`` once ``removed[key]`` records of each key are left out."""
+    if removed:
+        left = Counter(removed)
+        keep = np.ones(len(records), dtype=bool)
+        for k, key in enumerate(_keys(records)):
+            if left[key] > 0:
+                left[key] -= 1
+                keep[k] = False
+        records = records[keep]
+    return profile_weights(records)
+
+
+class ProfileUpdater:
+    """Applies interactions the model's profiles have not seen, like ``OnlineUpdater`` does for the factors.
+
+    Removals are counted per record key for the current store generation;
+    ``_applied`` is the part of them the model's profiles already reflect.
+    """
+
+    def __init__(self, store: InteractionStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._model: Optional[HybridModel] = None
+        self._generation = -1
+        self._position = 0
+        self._pending_removals: List[RecordKey] = []
+        self._removed: Counter = Counter()
+        self._applied: Counter = Counter()
+
+    def remove(self, user_id: int, property_id: int, kind: int) -> None:
+        """Take one stored ``kind`` interaction of the user with the listing out on the next ``apply``.
+
+        Ignored if the profiles never saw such a record (e.g. it was deleted
+        before it was ingested).
+        """
+        if kind in PROFILE_WEIGHTS:
+            with self._lock:
+                self._pending_removals.append((user_id, property_id, kind))
+
+    def _seen_records(self, stored: np.ndarray, user_ids: np.ndarray,
+                      index: Optional[UserInteractionIndex]) -> np.ndarray:
+        # The index holds exactly what the profiles have seen when it was last
+        # refreshed to the same point; otherwise scan the stored prefix
+        if index is not None and index.generation == self._generation and index.count == self._position:
+            return index.records(user_ids.tolist())
+        seen = stored[:self._position]
+        return seen[np.isin(seen["user_id"], user_ids)]
+
+    def apply(self, model: Optional[HybridModel], state: Optional[StoreState] = None,
+              index: Optional[UserInteractionIndex] = None) -> int:
+        """Fold records not yet seen by ``model``'s profiles in; returns how many were applied.
+
+        ``index``, if given, must not have been refreshed past ``state`` yet.
+        """
+        if model is None:
+            return 0
+        state = state or self.store.state()
+        with self._lock:
+            if model is not self._model:
+                self._model = model
+                if model.interactions_generation != self._generation:
+                    self._removed.clear()
+                self._generation = model.interactions_generation
+                self._position = model.interactions_count
+                # A new model's profiles were built with every removed record
+                self._applied = Counter()
+            stored = self.store.read(state)
+            if (model.user_profiles is None or state.generation != self._generation
+                    or state.count < self._position):
+                started = time.perf_counter()
+                model.user_profiles = build_profiles(stored, model.item_ids, model.item_features)
+                self._generation = state.generation
+                self._position = state.count
+                self._removed.clear()
+                self._applied = Counter()
+                logger.info("Rebuilt %d user profiles of model %s from the interaction store in %.2fs",
+                            len(model.user_profiles.user_ids), model.version, time.perf_counter() - started)
+                return 0
+            records = stored[self._position:state.count]
+            removals, self._pending_removals = self._pending_removals, []
+            removed = self._adjust(model, stored, records, removals, index)
+            self._position = state.count
+        if len(records) or removed:
+            logger.info("Applied %d new and %d removed interactions to the user profiles of model %s",
+                        len(records), removed, model.version)
+        return len(records)
+
+    def _adjust(self, model: HybridModel, stored: np.ndarray, records: np.ndarray, removals: List[RecordKey],
+                index: Optional[UserInteractionIndex]) -> int:
+        """Adjust the profiles for ``records`` and ``removals``; returns how many removals counted."""
+        weighted = records[np.isin(records["kind"], list(PROFILE_WEIGHTS))]
+        pairs = {(u, p) for u, p, _ in _keys(weighted)}
+        pairs.update((u, p) for u, p, _ in removals)
+        # Removals the profiles do not reflect yet, e.g. after a model change
+        pairs.update(key[:2] for key in self._removed if self._removed[key] != self._applied[key])
+        if not pairs:
+            return 0
+        user_ids = np.unique([u for u, _ in pairs]).astype(np.int64)
+        before = self._seen_records(stored, user_ids, index)
+        after = np.concatenate([before, records[np.isin(records["user_id"], user_ids)]])
+
+        # A removal only counts against a record the profiles have seen
+        stored_counts = Counter(_keys(after))
+        counted = 0
+        for key in removals:
+            if stored_counts[key] > self._removed[key]:
+                self._removed[key] += 1
+                counted += 1
+        previous, current = _weights(before, self._applied), _weights(after, self._removed)
+        self._applied = Counter(self._removed)
+
+        # Read once: listing updates may grow the catalog meanwhile
+        item_features = model.item_features
+        n_items = item_features.shape[0]
+        user_rows = {int(u): k for k, u in enumerate(user_ids)}
+        rows, cols, deltas = [], [], []
+        for user_id, property_id in pairs:
+            item = model.item_index.get(property_id)
+            delta = (current.get(user_id, {}).get(property_id, 0.0)
+                     - previous.get(user_id, {}).get(property_id, 0.0))
+            if item is not None and item < n_items and delta != 0:
+                rows.append(user_rows[user_id])
+                cols.append(item)
+                deltas.append(delta)
+        if deltas:
+            weight_deltas = sp.csr_matrix((deltas, (rows, cols)), shape=(len(user_ids), n_items))
+            changed = np.flatnonzero(np.diff(weight_deltas.indptr))
+            model.user_profiles.adjust(user_ids[changed].tolist(), weight_deltas[changed], item_features)
+        return counted
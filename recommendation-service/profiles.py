@@ -0,0 +1,124 @@
+"""Stored content profiles of every user.
+
+A user's content profile is the PROFILE_WEIGHTS-weighted average of the
+feature rows of the catalog items they interacted with (strongest signal per
+item). It is kept as the weighted sum plus the running weight total, so when
+an interaction raises (or a removal lowers) an item's weight by ``delta``
+the profile is adjusted in place, sum += delta * x_item and total += delta,
+without looking at the user's other interactions. ``build_profiles`` builds
+them for every user at training time and they are saved with the model;
+``profile_updates.ProfileUpdater`` folds in interactions stored since.
+"""
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from interaction_store import PROFILE_WEIGHTS
+
+# Profile weight of each interaction kind (a uint8), indexed by kind
+KIND_WEIGHTS = np.zeros(256)
+for _kind, _weight in PROFILE_WEIGHTS.items():
+    KIND_WEIGHTS[_kind] = _weight
+
+
+class UserProfiles:
+    """Profile sums and weight totals of the users in ``user_ids`` (sorted).
+
+    Row k of ``sums`` and ``totals[k]`` belong to ``user_ids[k]``, as
+    trained. Users adjusted since, or first seen since, live in ``_updates``
+    as (column indices, values, total); an entry is replaced whole, so a
+    concurrent lookup sees a user's previous profile or the new one.
+    """
+
+    def __init__(self, user_ids: np.ndarray, sums: sp.csr_matrix, totals: np.ndarray):
+        self.user_ids = user_ids
+        self.sums = sums
+        self.totals = totals
+        self._updates: Dict[int, Tuple[np.ndarray, np.ndarray, float]] = {}
+        # Serializes adjustments; lookups never take it
+        self._lock = threading.Lock()
+
+    @property
+    def n_columns(self) -> int:
+        return self.sums.shape[1]
+
+    @property
+    def n_updated(self) -> int:
+        return len(self._updates)
+
+    def _rows(self, user_ids: List[int]) -> Tuple[sp.csr_matrix, np.ndarray, np.ndarray]:
+        """Raw sums and totals of ``user_ids`` (zero for unknown users) and which are known."""
+        wanted = np.asarray(user_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.user_ids, wanted), max(len(self.user_ids) - 1, 0))
+        trained = (self.user_ids[positions] == wanted) if len(self.user_ids) else np.zeros(len(wanted), dtype=bool)
+        indptr, indices, values = [0], [], []
+        totals = np.zeros(len(wanted))
+        found = np.zeros(len(wanted), dtype=bool)
+        updates, sums = self._updates, self.sums
+        for k, user_id in enumerate(wanted.tolist()):
+            update = updates.get(user_id)
+            if update is not None:
+                row_indices, row_values, totals[k] = update
+            elif trained[k]:
+                start, end = sums.indptr[positions[k]], sums.indptr[positions[k] + 1]
+                row_indices, row_values = sums.indices[start:end], sums.data[start:end]
+                totals[k] = self.totals[positions[k]]
+            else:
+                indptr.append(indptr[-1])
+                continue
+            found[k] = True
+            indices.append(row_indices)
+            values.append(row_values)
+            indptr.append(indptr[-1] + len(row_indices))
+        matrix = sp.csr_matrix(
+            (np.concatenate(values) if values else np.zeros(0, dtype=sums.dtype),
+             np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+             np.array(indptr)),
+            shape=(len(wanted), self.n_columns))
+        return matrix, totals, found
+
+    def lookup(self, user_ids: List[int]) -> Tuple[sp.csr_matrix, np.ndarray]:
+        """Profiles of ``user_ids`` as rows, and a mask of the users that have one."""
+        sums, totals, found = self._rows(user_ids)
+        inverse_totals = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+        return sp.diags(inverse_totals) @ sums, found
+
+    def adjust(self, user_ids: List[int], weight_deltas: sp.csr_matrix, item_features: sp.csr_matrix) -> None:
+        """Add row k of ``weight_deltas`` (over catalog rows) to the profile of ``user_ids[k]``."""
+        with self._lock:
+            sums, totals, _ = self._rows(user_ids)
+            sums = (sums + weight_deltas @ item_features).tocsr()
+            sums.sort_indices()
+            totals = totals + np.asarray(weight_deltas.sum(axis=1)).ravel()
+            for k, user_id in enumerate(user_ids):
+                start, end = sums.indptr[k], sums.indptr[k + 1]
+                self._updates[int(user_id)] = (sums.indices[start:end].copy(), sums.data[start:end].copy(),
+                                               float(totals[k]))
+
+
+def build_profiles(records: np.ndarray, item_ids: np.ndarray, item_features: sp.csr_matrix) -> UserProfiles:
+    """Profiles of every user in the interaction ``records`` over the catalog ``item_ids``."""
+    n_items = item_features.shape[0]
+    weights = KIND_WEIGHTS[records["kind"]]
+    records, weights = records[weights > 0], weights[weights > 0]
+    order = np.argsort(item_ids, kind="stable")
+    property_ids = records["property_id"].astype(np.int64)
+    positions = np.minimum(np.searchsorted(item_ids, property_ids, sorter=order), max(len(item_ids) - 1, 0))
+    in_catalog = (item_ids[order[positions]] == property_ids) if len(item_ids) else np.zeros(len(records), dtype=bool)
+    items = order[positions[in_catalog]]
+    user_ids, users = np.unique(records["user_id"][in_catalog].astype(np.int64), return_inverse=True)
+    weights = weights[in_catalog]
+
+    # Strongest signal per (user, item): sort by pair then weight and keep the last
+    stride = max(n_items, 1)
+    keys = users.astype(np.int64) * stride + items
+    order = np.lexsort((weights, keys))
+    keys, weights = keys[order], weights[order]
+    last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.zeros(0, dtype=bool)
+    weight_matrix = sp.csr_matrix((weights[last], (keys[last] // stride, keys[last] % stride)),
+                                  shape=(len(user_ids), n_items))
+    sums = (weight_matrix @ item_features).tocsr()
+    sums.sort_indices()
+    return UserProfiles(user_ids, sums, np.asarray(weight_matrix.sum(axis=1)).ravel())
@@ -0,0 +1,259 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from artifacts import HybridModel
+from collaborative import predict_ratings
+from candidates import Constraints, generate_candidates
+from config import BATCH_CHUNK_SIZE
+from enums import PropertyStatusEnum
+from features import cosine_scores
+from interaction_store import UserInteractionIndex
+from metrics import counter, span
+from models import Property, PropertyLocation, PropertyPricing, PropertyView
+from popularity import PopularityRanking
+
+COLD_STARTS = counter(
+    "recommender_cold_starts_total", "Users served popular listings for lack of interactions or a model.")
+FALLBACKS = counter(
+    "recommender_fallbacks_total", "Users served by a fallback path, by reason.", ("reason",))
+
+
+def get_popular_properties(session: Session, top_n: int, constraints: Optional[Constraints] = None) -> List[int]:
+    query = select(Property.property_id).where(Property.status == PropertyStatusEnum.available)
+    if constraints is not None and constraints.city_id is not None:
+        query = query.join(PropertyLocation, PropertyLocation.property_id == Property.property_id).where(
+            PropertyLocation.city_id == constraints.city_id)
+    if constraints is not None and constraints.max_price is not None:
+        query = query.join(PropertyPricing, PropertyPricing.property_id == Property.property_id).where(
+            PropertyPricing.rent_price <= constraints.max_price)
+    if constraints is not None and constraints.min_bedrooms is not None:
+        query = query.where(Property.bedrooms >= constraints.min_bedrooms)
+    popular_properties = session.exec(
+        query
+        .join(PropertyView, isouter=True)
+        .group_by(Property.property_id)
+        .order_by(func.count(PropertyView.view_id).desc())
+        .limit(top_n)
+    ).all()
+    return list(popular_properties)
+
+
+def available_rows(session: Session, model: HybridModel) -> np.ndarray:
+    """Rows of the trained catalog whose property is still available."""
+    available_ids = session.exec(
+        select(Property.property_id).where(Property.status == PropertyStatusEnum.available)).all()
+    return np.flatnonzero(np.isin(model.item_ids, np.fromiter(available_ids, dtype=np.int64)))
+
+
+def _min_max_rows(scores: np.ndarray) -> np.ndarray:
+    low = scores.min(axis=1, keepdims=True)
+    high = scores.max(axis=1, keepdims=True)
+    return (scores - low) / (high - low + 1e-8)
+
+
+def interaction_weights(
+    model: HybridModel, user_ids: List[int], interactions: Dict[int, Dict[int, float]], rows: np.ndarray,
+    n_items: int,
+) -> sp.csr_matrix:
+    """(users x n_items) interaction weights over catalog rows, keeping only the rows in ``rows``."""
+    in_rows = np.zeros(n_items, dtype=bool)
+    in_rows[rows] = True
+    w_rows, w_cols, w_data = [], [], []
+    for u, user_id in enumerate(user_ids):
+        for property_id, weight in interactions.get(user_id, {}).items():
+            i = model.item_index.get(property_id)
+            if i is not None and i < n_items and in_rows[i]:
+                w_rows.append(u)
+                w_cols.append(i)
+                w_data.append(weight)
+    return sp.csr_matrix((w_data, (w_rows, w_cols)), shape=(len(user_ids), n_items))
+
+
+def user_profiles(weights: sp.csr_matrix, feature_matrix: sp.csr_matrix) -> sp.csr_matrix:
+    """Content profiles as the weighted average of each user's interacted items."""
+    totals = np.asarray(weights.sum(axis=1)).ravel()
+    inverse_totals = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+    return sp.diags(inverse_totals) @ weights @ feature_matrix
+
+
+def stored_profiles(
+    model: HybridModel, user_ids: List[int], weights: sp.csr_matrix, feature_matrix: sp.csr_matrix,
+) -> sp.csr_matrix:
+    """Content profiles of ``user_ids`` from the model's store, computed from ``weights`` for users missing there."""
+    if model.user_profiles is None:
+        return user_profiles(weights, feature_matrix)
+    profiles, found = model.user_profiles.lookup(user_ids)
+    if found.all():
+        return profiles
+    missing = np.flatnonzero(~found)
+    placement = sp.csr_matrix((np.ones(len(missing)), (missing, np.arange(len(missing)))),
+                              shape=(len(user_ids), len(missing)))
+    return profiles + placement @ user_profiles(weights[missing], feature_matrix)
+
+
+def score_users(
+    model: HybridModel,
+    user_ids: List[int],
+    weights: sp.csr_matrix,
+    profiles: sp.csr_matrix,
+    rows: np.ndarray,
+    content_weight: float = 0.6,
+) -> np.ndarray:
+    """Hybrid scores of shape (len(user_ids), len(rows)).
+
+    ``weights`` and ``profiles`` are the users' interaction weights and
+    content profiles, so content and collaborative scores each come out of a
+    single matrix product over the rows being re-ranked.
+    """
+    feature_matrix = model.item_features[rows]
+    item_norms = model.item_norms[rows]
+    content_scores = cosine_scores(feature_matrix, profiles.toarray(), item_norms)
+
+    # Location-based score (city matching against the user's interacted items)
+    cities, city_cols = np.unique(model.item_city_ids[rows], return_inverse=True)
+    interacted = weights.tocoo()
+    interacted_cities = model.item_city_ids[interacted.col]
+    positions = np.minimum(np.searchsorted(cities, interacted_cities), len(cities) - 1)
+    matched = (interacted.data > 0) & (interacted_cities >= 0) & (cities[positions] == interacted_cities)
+    user_cities = np.zeros((len(user_ids), len(cities)), dtype=bool)
+    user_cities[interacted.row[matched], positions[matched]] = True
+    location_scores = np.where(user_cities[:, city_cols], 1.0, 0.5)
+
+    content_scores = _min_max_rows(0.8 * content_scores + 0.2 * location_scores)
+
+    # Collaborative Filtering from the persisted SVD factors
+    collab_scores = np.zeros_like(content_scores)
+    if len(model.cf_item_ids):
+        collab_scores = _min_max_rows(predict_ratings(model, user_ids, rows))
+
+    # Combine scores
+    return content_weight * content_scores + (1 - content_weight) * collab_scores
+
+
+def top_n_per_row(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """Column indices of the ``top_n`` best scores of each row, best first."""
+    top_n = min(top_n, scores.shape[1])
+    if top_n == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def rank_users(
+    user_ids: List[int],
+    model: HybridModel,
+    interactions: Dict[int, Dict[int, float]],
+    all_rows: np.ndarray,
+    top_n: int = 10,
+    content_weight: float = 0.6,
+    constraints: Optional[Constraints] = None,
+) -> Dict[int, List[Tuple[int, float]]]:
+    """Top ``top_n`` (property_id, score) pairs of each user among ``all_rows``, best first.
+
+    Every user must have interactions in ``interactions``.
+    """
+    results: Dict[int, List[Tuple[int, float]]] = {}
+    for start in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+        chunk = user_ids[start:start + BATCH_CHUNK_SIZE]
+        # Read once: listing updates may grow the catalog while this chunk is scored
+        feature_matrix = model.item_features
+        with span("profiles"):
+            weights = interaction_weights(model, chunk, interactions, all_rows, feature_matrix.shape[0])
+            profiles = stored_profiles(model, chunk, weights, feature_matrix)
+        # Candidate stage, then the full hybrid score on the candidates only
+        with span("candidates"):
+            rows, membership = generate_candidates(model, weights, profiles, all_rows, constraints)
+        if not len(rows):
+            FALLBACKS.inc(len(chunk), reason="no_candidates")
+            results.update({u: [] for u in chunk})
+            continue
+        item_ids = model.item_ids[rows]
+        with span("scoring"):
+            scores = score_users(model, chunk, weights, profiles, rows, content_weight)
+        with span("ranking"):
+            scores[~membership] = -np.inf
+            # Never recommend what the user already interacted with
+            for u, user_id in enumerate(chunk):
+                seen = np.isin(item_ids, list(interactions[user_id]))
+                scores[u, seen] = -np.inf
+            for u, top in enumerate(top_n_per_row(scores, top_n)):
+                results[chunk[u]] = [(int(item_ids[i]), float(scores[u, i]))
+                                     for i in top if np.isfinite(scores[u, i])]
+    return results
+
+
+def get_batch_recommendations(
+    user_ids: List[int],
+    session: Session,
+    model: Optional[HybridModel],
+    index: UserInteractionIndex,
+    top_n: int = 10,
+    content_weight: float = 0.6,
+    constraints: Optional[Constraints] = None,
+    popularity: Optional[PopularityRanking] = None,
+) -> Dict[int, List[int]]:
+    with span("interactions"):
+        interactions = index.lookup(user_ids)
+    results: Dict[int, List[int]] = {}
+
+    # Fallback for new users, or while no model has been trained yet: the
+    # in-memory rankings, or the database until they are first loaded
+    cold_users = [u for u in user_ids if model is None or not interactions.get(u)]
+    if cold_users:
+        COLD_STARTS.inc(len(cold_users))
+        if model is None:
+            FALLBACKS.inc(len(cold_users), reason="no_model")
+        with span("popular"):
+            if popularity is not None and popularity.ready:
+                popular = popularity.top(top_n, constraints)
+            else:
+                FALLBACKS.inc(len(cold_users), reason="popularity_from_database")
+                popular = get_popular_properties(session, top_n, constraints)
+        results.update({u: popular for u in cold_users})
+    warm_users = [u for u in user_ids if u not in results]
+    if not warm_users:
+        return results
+
+    with span("available_rows"):
+        all_rows = available_rows(session, model)
+    ranked = rank_users(warm_users, model, interactions, all_rows, top_n, content_weight, constraints)
+    results.update({u: [property_id for property_id, _ in ranked[u]] for u in warm_users})
+    return results
+
+
+def get_similar_properties(property_id: int, session: Session, model: Optional[HybridModel],
+                           top_n: int = 10) -> List[int]:
+    """Available listings most often interacted with by the users of ``property_id``, best first."""
+    row = model.item_index.get(property_id) if model is not None else None
+    # Listings added since training have no neighbors yet
+    if row is None or row >= len(model.item_neighbors):
+        return []
+    rows = model.item_neighbors[row]
+    neighbor_ids = model.item_ids[rows[rows >= 0]].tolist()
+    if not neighbor_ids:
+        return []
+    with span("similar_availability"):
+        available = set(session.exec(
+            select(Property.property_id)
+            .where(Property.property_id.in_(neighbor_ids), Property.status == PropertyStatusEnum.available)
+        ).all())
+    return [p for p in neighbor_ids if p in available][:top_n]
+
+
+def get_hybrid_recommendations(
+    user_id: int,
+    session: Session,
+    model: Optional[HybridModel],
+    index: UserInteractionIndex,
+    top_n: int = 10,
+    content_weight: float = 0.6,
+    constraints: Optional[Constraints] = None,
+    popularity: Optional[PopularityRanking] = None,
+) -> List[int]:
+    return get_batch_recommendations(
+        [user_id], session, model, index, top_n, content_weight, constraints, popularity)[user_id]
@@ -0,0 +1,219 @@
+"""In-process registry of the model version being served.
+
+Requests read ``ModelRegistry.active`` once and score with that object, so
+swapping the reference never disturbs a request in flight: it finishes on
+the model it started with. New versions are loaded, validated and warmed on
+the registry's own thread and only then swapped in; a version that fails is
+remembered and skipped, and the current model keeps serving. Admins can pin
+an older version (rollback) and later resume following LATEST.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifacts import HybridModel, latest_mtime, latest_version, list_versions, load_model
+from config import MODEL_DIR, REGISTRY_HISTORY
+from recommender import score_users, user_profiles
+
+logger = logging.getLogger(__name__)
+
+# Users and catalog rows scored by the smoke test of a new version
+SMOKE_USERS = 4
+SMOKE_ITEMS = 1000
+
+
+class ModelValidationError(Exception):
+    """Raised when a loaded version is inconsistent or cannot score."""
+
+
+def _check(condition: bool, message: str) -> None:
+    if not condition:
+        raise ModelValidationError(message)
+
+
+def check_shapes(model: HybridModel) -> None:
+    n_items = len(model.item_ids)
+    for name in ("item_city_ids", "item_norms", "item_district_ids", "item_prices", "item_bedrooms",
+                 "item_popularity", "item_cf_rows", "item_neighbors", "item_neighbor_scores"):
+        _check(len(getattr(model, name)) == n_items, f"{name} has {len(getattr(model, name))} rows, expected {n_items}")
+    n_columns = len(model.vocabulary) + len(model.numeric_mean) + len(model.feature_ids)
+    _check(model.item_features.shape == (n_items, n_columns),
+           f"item_features is {model.item_features.shape}, expected {(n_items, n_columns)}")
+    _check(len(model.idf) == len(model.vocabulary), "idf does not match the vocabulary")
+    _check(len(model.numeric_std) == len(model.numeric_mean), "numeric scaling arrays differ in length")
+
+    n_users, n_cf_items = len(model.cf_user_ids), len(model.cf_item_ids)
+    _check(model.user_factors.shape[0] == n_users and len(model.user_bias) == n_users,
+           "user factors do not match cf_user_ids")
+    _check(model.item_factors.shape[0] == n_cf_items and len(model.item_bias) == n_cf_items,
+           "item factors do not match cf_item_ids")
+    _check(model.user_factors.shape[1:] == model.item_factors.shape[1:], "user and item factors differ in rank")
+    for name in ("user_factors", "item_factors", "user_bias", "item_bias"):
+        _check(bool(np.isfinite(getattr(model, name)).all()), f"{name} has non-finite values")
+
+    profiles = model.user_profiles
+    if profiles is not None:
+        n_profiles = len(profiles.user_ids)
+        _check(profiles.sums.shape == (n_profiles, n_columns) and len(profiles.totals) == n_profiles,
+               "user profiles do not match the feature columns or their users")
+
+    index = model.ann_index
+    if index is not None:
+        _check(index.projection.shape[0] == n_columns, "ANN projection does not match the feature columns")
+        _check(index.centroids.shape[1] == index.projection.shape[1], "ANN centroids do not match the projection")
+        _check(len(index.assignments) == n_items, "ANN assignments do not match the catalog")
+
+
+def smoke_score(model: HybridModel) -> None:
+    """Score a few known users against part of the catalog, as a request would."""
+    n_items = len(model.item_ids)
+    if not n_items:
+        return
+    rng = np.random.default_rng(0)
+    user_ids = [int(u) for u in model.cf_user_ids[:SMOKE_USERS]] or [-1]
+    rows = np.sort(rng.choice(n_items, min(SMOKE_ITEMS, n_items), replace=False))
+    weights = sp.csr_matrix(
+        (np.ones(len(user_ids)), (np.arange(len(user_ids)), rng.choice(rows, len(user_ids)))),
+        shape=(len(user_ids), n_items))
+    profiles = user_profiles(weights, model.item_features)
+    scores = score_users(model, user_ids, weights, profiles, rows)
+    _check(scores.shape == (len(user_ids), len(rows)), f"smoke scores have shape {scores.shape}")
+    _check(bool(np.isfinite(scores).all()), "smoke scores are not finite")
+    if model.ann_index is not None:
+        model.ann_index.search(profiles, 10)
+
+
+def validate_model(model: HybridModel) -> None:
+    """Raise ModelValidationError unless ``model`` is safe to serve."""
+    check_shapes(model)
+    try:
+        smoke_score(model)
+    except ModelValidationError:
+        raise
+    except Exception as e:
+        raise ModelValidationError(f"smoke scoring failed: {e!r}") from e
+
+
+class ModelRegistry:
+    """Holds the active model and swaps in new versions without blocking requests.
+
+    ``poll`` runs on a background thread: when LATEST changes (or a reload is
+    requested) it loads the version it points at, validates it, runs
+    ``prepare`` on it and only then makes it active. ``prepare`` is where the
+    service warms per-model state so the first requests on a new version are
+    not slower than the rest.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, history: int = REGISTRY_HISTORY,
+                 prepare: Optional[Callable[[HybridModel], None]] = None):
+        self.model_dir = model_dir
+        self.history_size = history
+        self.prepare = prepare
+        self._active: Optional[HybridModel] = None
+        self._activated_at: Optional[str] = None
+        self._history: List[dict] = []
+        self._failed: Dict[str, str] = {}
+        self._pinned = False
+        self._latest_mtime: Optional[int] = None
+        self._reload_requested = threading.Event()
+        self._reload_requested.set()
+        # Serializes loads and swaps; readers never take it
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> Optional[HybridModel]:
+        return self._active
+
+    @property
+    def pinned(self) -> bool:
+        return self._pinned
+
+    def request_reload(self, *_) -> None:
+        """Check LATEST on the next poll; usable as a signal handler."""
+        self._reload_requested.set()
+
+    def poll(self) -> Optional[HybridModel]:
+        """Activate the version LATEST points at if it is new and not pinned away."""
+        mtime = latest_mtime(self.model_dir)
+        if mtime != self._latest_mtime:
+            self._latest_mtime = mtime
+            self._reload_requested.set()
+        if not self._reload_requested.is_set() or self._pinned:
+            return self._active
+        self._reload_requested.clear()
+        version = latest_version(self.model_dir)
+        active = self._active
+        if version is None or version in self._failed or (active is not None and active.version == version):
+            return active
+        try:
+            return self.activate(version)
+        except Exception:
+            return self._active
+
+    def activate(self, version: str, pin: bool = False) -> HybridModel:
+        """Load, validate, prepare and swap in ``version``; the active model is kept on failure."""
+        with self._lock:
+            if self._pinned and not pin:
+                # Rolled back while this version was being considered
+                return self._active
+            try:
+                model = load_model(version, self.model_dir)
+                if model is None:
+                    raise ModelValidationError(f"version {version} not found")
+                validate_model(model)
+                if self.prepare is not None:
+                    self.prepare(model)
+            except Exception as e:
+                self._failed[version] = repr(e)
+                logger.exception("Rejected model %s; keeping %s", version,
+                                 self._active.version if self._active else "no model")
+                raise
+            previous = self._active
+            if previous is not None:
+                self._history.insert(0, {"version": previous.version, "activated_at": self._activated_at})
+                del self._history[self.history_size:]
+            self._active = model
+            self._activated_at = datetime.now(timezone.utc).isoformat()
+            self._pinned = pin
+            self._failed.pop(version, None)
+        logger.info("Activated model %s%s", version, " (pinned)" if pin else "")
+        return model
+
+    def rollback(self, version: Optional[str] = None) -> HybridModel:
+        """Pin ``version``, by default the previously active one."""
+        if version is None:
+            if not self._history:
+                raise LookupError("no previous version to roll back to")
+            version = self._history[0]["version"]
+        if version not in list_versions(self.model_dir):
+            raise LookupError(f"version {version} is not on disk")
+        return self.activate(version, pin=True)
+
+    def resume(self) -> None:
+        """Unpin and follow LATEST again from the next poll, retrying rejected versions."""
+        with self._lock:
+            self._pinned = False
+            self._failed.clear()
+        self._reload_requested.set()
+
+    def report(self) -> dict:
+        active = self._active
+        return {
+            "active": None if active is None else {
+                "version": active.version,
+                "trained_at": active.trained_at,
+                "activated_at": self._activated_at,
+                "cf_engine": active.cf_engine,
+                "n_items": int(len(active.item_ids)),
+                "n_cf_users": int(len(active.cf_user_ids)),
+            },
+            "pinned": self._pinned,
+            "latest": latest_version(self.model_dir),
+            "history": list(self._history),
+            "rejected": dict(self._failed),
+            "on_disk": list_versions(self.model_dir),
+        }
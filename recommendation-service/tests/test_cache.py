@@ -0,0 +1,93 @@
+from cache import RecommendationCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(clock, max_users=10):
+    return RecommendationCache(max_users=max_users, ttl_seconds=60, max_stale_seconds=120, clock=clock)
+
+
+def test_entries_go_stale_then_expire():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.put(1, "v1", [10, 11], started_at=clock())
+
+    entry = cache.get(1, "v1")
+    assert entry.property_ids == [10, 11] and not entry.stale
+    # Another model version marks the entry stale without dropping it
+    assert cache.get(1, "v2").stale
+
+    clock.now += 61
+    assert cache.get(1, "v1").stale
+    clock.now += 120
+    assert cache.get(1, "v1") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_user_marks_stale():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.put(1, "v1", [10], started_at=clock())
+    cache.put(2, "v1", [10], started_at=clock())
+    cache.invalidate_user(1)
+    assert cache.get(1, "v1").stale
+    assert not cache.get(2, "v1").stale
+
+
+def test_invalidate_property_drops_it_from_every_entry():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.put(1, "v1", [10, 11], started_at=clock())
+    cache.put(2, "v1", [11, 12], started_at=clock())
+    cache.put(3, "v1", [12], started_at=clock())
+    cache.invalidate_property(11)
+
+    first, second, third = cache.get(1, "v1"), cache.get(2, "v1"), cache.get(3, "v1")
+    assert first.property_ids == [10] and first.stale
+    assert second.property_ids == [12] and second.stale
+    assert third.property_ids == [12] and not third.stale
+
+
+def test_result_read_before_invalidation_is_stored_stale():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    started_at = clock()
+    clock.now += 1
+    cache.invalidate_user(1)
+    cache.invalidate_property(20)
+    cache.put(1, "v1", [10], started_at=started_at)
+    assert cache.get(1, "v1").stale
+
+    cache.put(2, "v1", [20, 21], started_at=started_at)
+    entry = cache.get(2, "v1")
+    assert entry.property_ids == [21] and entry.stale
+
+    # Computed after the invalidation: fresh
+    clock.now += 1
+    cache.put(1, "v1", [10], started_at=clock())
+    assert not cache.get(1, "v1").stale
+
+
+def test_least_recently_used_entry_is_evicted():
+    clock = FakeClock()
+    cache = make_cache(clock, max_users=2)
+    cache.put(1, "v1", [10], started_at=clock())
+    cache.put(2, "v1", [10], started_at=clock())
+    cache.get(1, "v1")
+    cache.put(3, "v1", [10], started_at=clock())
+    assert cache.get(2, "v1") is None
+    assert cache.get(1, "v1") is not None and cache.get(3, "v1") is not None
+
+
+def test_only_one_refresh_per_user():
+    cache = make_cache(FakeClock())
+    assert cache.try_begin_refresh(1)
+    assert not cache.try_begin_refresh(1)
+    cache.end_refresh(1)
+    assert cache.try_begin_refresh(1)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from surprise import SVD, Dataset, Reader
+
+from als import conjugate_gradient
+from artifacts import HybridModel
+from collaborative import INIT_STD, LEARNING_RATE, RATING_SCALE, REGULARIZATION, predict_ratings, train_collaborative
+from loader import Interactions
+from recommender import top_n_per_row
+
+
+# Small random interaction set: 12 users, 9 items, ratings 1-5
+@pytest.fixture
+def interactions():
+    rng = np.random.default_rng(7)
+    pairs = np.array([(u, i) for u in range(1, 13) for i in range(101, 110) if rng.random() < 0.5])
+    ratings = rng.integers(1, 6, len(pairs)).astype(np.float64)
+    return Interactions(user_ids=pairs[:, 0], property_ids=pairs[:, 1], ratings=ratings,
+                        weights=ratings.astype(np.float32))
+
+
+def make_model(params, item_ids):
+    n_items = len(item_ids)
+    return HybridModel(
+        version="test",
+        trained_at="2026-01-01T00:00:00+00:00",
+        item_ids=np.asarray(item_ids, dtype=np.int64),
+        item_city_ids=np.zeros(n_items, dtype=np.int64),
+        item_features=sp.csr_matrix((n_items, 1)),
+        item_norms=np.zeros(n_items),
+        feature_ids=np.zeros(0, dtype=np.int64),
+        vocabulary={},
+        idf=np.zeros(0),
+        numeric_mean=np.zeros(5),
+        numeric_std=np.ones(5),
+        rating_scale=RATING_SCALE,
+        **params,
+    )
+
+
+def test_conjugate_gradient_matches_direct_solve():
+    rng = np.random.default_rng(0)
+    n_users, n_items, n_factors = 6, 8, 4
+    strengths = sp.random(n_users, n_items, density=0.4, random_state=1, format="csr") * 5
+    other = rng.normal(0, 1, (n_items, n_factors))
+    regularization, alpha = 0.1, 2.0
+
+    expected = np.zeros((n_users, n_factors))
+    for u in range(n_users):
+        confidence = np.ones(n_items)
+        preference = np.zeros(n_items)
+        row = strengths[u]
+        confidence[row.indices] += alpha * row.data
+        preference[row.indices] = 1
+        lhs = other.T @ np.diag(confidence) @ other + regularization * np.eye(n_factors)
+        expected[u] = np.linalg.solve(lhs, other.T @ (confidence * preference))
+
+    # Exact after k steps in exact arithmetic; a few extra absorb rounding
+    start = rng.normal(0, 0.01, (n_users, n_factors))
+    solved = conjugate_gradient(start, other, strengths, regularization, alpha, steps=3 * n_factors)
+    np.testing.assert_allclose(solved, expected, rtol=1e-6, atol=1e-8)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pooled = conjugate_gradient(start, other, strengths, regularization, alpha, 3 * n_factors, pool)
+    np.testing.assert_allclose(pooled, expected, rtol=1e-6, atol=1e-8)
+
+
+def test_predict_ratings_matches_surprise(interactions):
+    params = train_collaborative(interactions, "svd")
+    data = Dataset.load_from_df(pd.DataFrame({
+        "user_id": interactions.user_ids,
+        "property_id": interactions.property_ids,
+        "rating": interactions.ratings,
+    }), Reader(rating_scale=RATING_SCALE))
+    algo = SVD(lr_all=LEARNING_RATE, reg_all=REGULARIZATION, init_std_dev=INIT_STD, random_state=42)
+    algo.fit(data.build_full_trainset())
+
+    item_ids = np.unique(interactions.property_ids)
+    model = make_model(params, item_ids)
+    # User 99 never interacted: surprise falls back to the item-bias estimate
+    user_ids = [1, 5, 12, 99]
+    scores = predict_ratings(model, user_ids, np.arange(len(item_ids)))
+    expected = [[algo.predict(u, int(i)).est for i in item_ids] for u in user_ids]
+    np.testing.assert_allclose(scores, expected, rtol=1e-9)
+
+
+def test_predict_ratings_unknown_item_gets_global_mean(interactions):
+    params = train_collaborative(interactions, "svd")
+    model = make_model(params, [101, 555])
+    scores = predict_ratings(model, [1], np.array([1]))
+    assert scores[0, 0] == pytest.approx(params["global_mean"])
+
+
+def test_top_n_per_row_matches_full_sort():
+    rng = np.random.default_rng(3)
+    scores = rng.normal(0, 1, (5, 40))
+    for top_n in (1, 7, 40, 60):
+        expected = np.argsort(-scores, axis=1)[:, :top_n]
+        np.testing.assert_array_equal(top_n_per_row(scores, top_n), expected)
+    assert top_n_per_row(scores, 0).shape == (5, 0)
@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from enums import ReviewStatusEnum
+from interaction_store import (
+    KIND_REVIEW, KIND_VIEW, KIND_WISHLIST, InteractionStore, UserInteractionIndex, compact, ingest,
+)
+from models import Property, PropertyView, Review, User, WishList
+
+
+# SQLite database with three users and three listings
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(user_id=u) for u in (1, 2, 3)])
+        session.add_all([Property(property_id=p, description=f"listing {p}") for p in (1, 2, 3)])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return InteractionStore(str(tmp_path / "store"))
+
+
+def run(engine, step, store):
+    with engine.connect() as conn:
+        return step(conn, store)
+
+
+def stored(store):
+    records = store.read()
+    return sorted(zip(records["user_id"].tolist(), records["property_id"].tolist(), records["kind"].tolist()))
+
+
+def test_ingest_only_appends_new_rows(engine, store):
+    with Session(engine) as session:
+        session.add_all([PropertyView(user_id=1, property_id=1), PropertyView(user_id=2, property_id=1),
+                         WishList(user_id=1, property_id=2),
+                         Review(review_id=1, user_id=3, property_id=3, rating=5, status=ReviewStatusEnum.approved)])
+        session.commit()
+    assert run(engine, ingest, store) == 4
+    assert run(engine, ingest, store) == 0
+
+    with Session(engine) as session:
+        session.add_all([PropertyView(user_id=3, property_id=2), WishList(user_id=2, property_id=3)])
+        session.commit()
+    assert run(engine, ingest, store) == 2
+    assert stored(store) == [(1, 1, KIND_VIEW), (1, 2, KIND_WISHLIST), (2, 1, KIND_VIEW), (2, 3, KIND_WISHLIST),
+                             (3, 2, KIND_VIEW), (3, 3, KIND_REVIEW)]
+    assert store.state().count == 6
+
+
+def test_ingest_picks_up_late_review_approvals(engine, store):
+    with Session(engine) as session:
+        session.add_all([
+            Review(review_id=1, user_id=1, property_id=1, rating=4, status=ReviewStatusEnum.pending),
+            Review(review_id=2, user_id=2, property_id=1, rating=5, status=ReviewStatusEnum.approved),
+            Review(review_id=3, user_id=3, property_id=2, rating=3, status=ReviewStatusEnum.approved),
+        ])
+        session.commit()
+    assert run(engine, ingest, store) == 2
+    marks = store.state().watermarks
+    assert marks.review_pending_floor == 1
+    assert marks.review_ids_above_floor == [2, 3]
+    # The pending review pins the floor; approved ones above it are not stored twice
+    assert run(engine, ingest, store) == 0
+
+    with Session(engine) as session:
+        session.get(Review, 1).status = ReviewStatusEnum.approved
+        session.commit()
+    assert run(engine, ingest, store) == 1
+    marks = store.state().watermarks
+    assert marks.review_pending_floor == 4
+    assert marks.review_ids_above_floor == []
+    assert [k for _, _, k in stored(store)] == [KIND_REVIEW] * 3
+
+
+def test_compact_drops_deleted_rows_and_keeps_old_readers_valid(engine, store):
+    with Session(engine) as session:
+        session.add_all([PropertyView(user_id=1, property_id=1), WishList(user_id=1, property_id=2),
+                         WishList(user_id=2, property_id=3)])
+        session.commit()
+    run(engine, ingest, store)
+    before = store.state()
+    old_view = store.read(before)
+
+    with Session(engine) as session:
+        session.delete(session.get(WishList, (1, 2)))
+        session.add(PropertyView(user_id=3, property_id=3))
+        session.commit()
+    assert run(engine, compact, store) == 3
+    after = store.state()
+    assert after.generation == before.generation + 1
+    assert stored(store) == [(1, 1, KIND_VIEW), (2, 3, KIND_WISHLIST), (3, 3, KIND_VIEW)]
+    # A reader holding the previous state still maps the previous generation's file
+    assert len(old_view) == 3 and len(store.read(before)) == 3
+    assert run(engine, ingest, store) == 0
+
+    run(engine, compact, store)
+    run(engine, compact, store)
+    # Only the current and the previous generation's files are kept
+    assert sorted(name for name in os.listdir(store.path) if name.endswith(".bin")) == [
+        f"interactions.{after.generation + 1}.bin", f"interactions.{after.generation + 2}.bin"]
+
+
+def test_user_interaction_index(engine, store):
+    with Session(engine) as session:
+        session.add_all([PropertyView(user_id=1, property_id=1), PropertyView(user_id=1, property_id=2),
+                         WishList(user_id=1, property_id=1), PropertyView(user_id=2, property_id=3)])
+        session.commit()
+    run(engine, ingest, store)
+    index = UserInteractionIndex(store)
+    index.refresh()
+    assert index.lookup([1, 2, 3]) == {1: {1: 2.0, 2: 1.0}, 2: {3: 1.0}}
+    np.testing.assert_array_equal(index.counts([1, 2, 3]), [3, 1, 0])
+
+    # New records are served from the unsorted tail
+    with Session(engine) as session:
+        session.add(PropertyView(user_id=3, property_id=2))
+        session.commit()
+    run(engine, ingest, store)
+    index.refresh()
+    assert index.lookup([3]) == {3: {2: 1.0}}
+    np.testing.assert_array_equal(index.counts([1, 3]), [3, 1])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from enums import PropertyStatusEnum
+from features import row_norms
+from interaction_store import InteractionStore, ingest
+from listings import ListingUpdater
+from models import Feature, Property, PropertyFeature, PropertyLocation, PropertyPricing, PropertyView, User
+from train import train
+
+DESCRIPTIONS = ["garden pool villa", "city studio metro", "quiet river house", "loft downtown view"]
+
+
+# 40 listings in three cities, each viewed once, with a model trained on them
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(user_id=u) for u in range(1, 6)])
+        session.add(Feature(feature_id=1, feature_name="pool"))
+        for p in range(1, 41):
+            session.add(Property(property_id=p, description=DESCRIPTIONS[p % 4], bedrooms=p % 4, bathrooms=1))
+            session.add(PropertyPricing(property_id=p, rent_price=100 * p))
+            session.add(PropertyLocation(property_id=p, city_id=1 + p % 3, district_id=10 + p % 5))
+        session.commit()
+        session.add_all([PropertyView(user_id=1 + p % 5, property_id=p) for p in range(1, 41)])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def model(engine, tmp_path):
+    store = InteractionStore(str(tmp_path / "store"))
+    with engine.connect() as conn:
+        ingest(conn, store)
+        return train(conn, store)
+
+
+def test_marks_wait_for_a_model(engine, model):
+    updater = ListingUpdater(engine)
+    updater.mark(3)
+    assert updater.apply(None) == 0
+    assert updater.apply(model) == 1
+    assert updater.apply(model) == 0
+
+
+def test_apply_updates_adds_and_removes_listings(engine, model):
+    with Session(engine) as session:
+        edited = session.get(Property, 3)
+        edited.description = "penthouse terrace"
+        edited.bedrooms = 5
+        session.exec(select(PropertyPricing).where(PropertyPricing.property_id == 3)).one().rent_price = 4321
+        session.exec(select(PropertyLocation).where(PropertyLocation.property_id == 3)).one().city_id = 9
+        session.add(PropertyFeature(property_id=3, feature_id=1))
+        session.get(Property, 4).status = PropertyStatusEnum.rented
+        session.add(Property(property_id=99, description="garden pool villa", bedrooms=2, bathrooms=1))
+        session.commit()
+    row = model.item_index[3]
+    old_features = model.item_features[row].toarray()
+    n_items = len(model.item_ids)
+
+    updater = ListingUpdater(engine)
+    for property_id in (3, 4, 99):
+        updater.mark(property_id)
+    assert updater.apply(model) == 3
+
+    assert model.item_bedrooms[row] == 5
+    assert model.item_prices[row] == 4321
+    assert model.item_city_ids[row] == 9
+    assert not np.allclose(model.item_features[row].toarray(), old_features)
+    np.testing.assert_allclose(model.item_norms, row_norms(model.item_features))
+    # Other rows are untouched
+    assert model.item_bedrooms[model.item_index[7]] == 3
+
+    assert len(model.item_ids) == n_items + 1 and model.item_ids[-1] == 99
+    assert model.item_features.shape[0] == n_items + 1
+    assert model.ann_index.assignments[model.item_index[4]] == -1
+    assert model.ann_index.assignments[model.item_index[99]] >= 0
+    assert model.ann_index.assignments[row] >= 0
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from interaction_store import KIND_VIEW, KIND_WISHLIST, InteractionStore, UserInteractionIndex, ingest
+from models import Property, PropertyLocation, PropertyPricing, PropertyView, User, WishList
+from profile_updates import ProfileUpdater
+from profiles import build_profiles
+from train import train
+
+DESCRIPTIONS = ["garden pool villa", "city studio metro", "quiet river house", "loft downtown view"]
+
+
+# 20 listings, each viewed by one of four users
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(user_id=u) for u in range(1, 5)])
+        for p in range(1, 21):
+            session.add(Property(property_id=p, description=DESCRIPTIONS[p % 4], bedrooms=p % 4, bathrooms=1))
+            session.add(PropertyPricing(property_id=p, rent_price=100 * p))
+            session.add(PropertyLocation(property_id=p, city_id=1 + p % 3))
+        session.commit()
+        session.add_all([PropertyView(user_id=1 + p % 4, property_id=p) for p in range(1, 21)])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def store(engine, tmp_path):
+    store = InteractionStore(str(tmp_path / "store"))
+    with engine.connect() as conn:
+        ingest(conn, store)
+    return store
+
+
+def trained(engine, store):
+    with engine.connect() as conn:
+        return train(conn, store)
+
+
+def assert_profile(model, records, user_id):
+    """The model's profile of ``user_id`` matches one built from scratch over ``records``."""
+    expected, _ = build_profiles(records, model.item_ids, model.item_features).lookup([user_id])
+    actual, found = model.user_profiles.lookup([user_id])
+    assert found[0]
+    np.testing.assert_allclose(actual.toarray(), expected.toarray(), atol=1e-12)
+
+
+def without(records, user_id, property_id, kind):
+    match = np.flatnonzero((records["user_id"] == user_id) & (records["property_id"] == property_id)
+                           & (records["kind"] == kind))
+    return np.delete(records, match[:1])
+
+
+def test_new_interactions_are_folded_in(engine, store):
+    model = trained(engine, store)
+    updater = ProfileUpdater(store)
+    assert updater.apply(model) == 0
+
+    with Session(engine) as session:
+        session.add_all([WishList(user_id=1, property_id=2), PropertyView(user_id=1, property_id=3)])
+        session.commit()
+    with engine.connect() as conn:
+        ingest(conn, store)
+    index = UserInteractionIndex(store)
+    assert updater.apply(model, index=index) == 2
+    assert_profile(model, store.read(), 1)
+
+
+def test_removals_are_taken_out(engine, store):
+    with Session(engine) as session:
+        session.add_all([WishList(user_id=1, property_id=2), WishList(user_id=2, property_id=5)])
+        session.commit()
+    with engine.connect() as conn:
+        ingest(conn, store)
+    model = trained(engine, store)
+    updater = ProfileUpdater(store)
+    updater.apply(model)
+
+    # User 1 viewed listing 4 too, so dropping that view leaves nothing of it;
+    # user 2 keeps the view of listing 5 after the wishlist entry goes
+    updater.remove(1, 4, KIND_VIEW)
+    updater.remove(2, 5, KIND_WISHLIST)
+    # Never stored: ignored
+    updater.remove(3, 1, KIND_WISHLIST)
+    updater.apply(model)
+    records = without(without(store.read(), 1, 4, KIND_VIEW), 2, 5, KIND_WISHLIST)
+    for user_id in (1, 2, 3):
+        assert_profile(model, records, user_id)
+
+    # The same removal again has no record left to take out
+    updater.remove(2, 5, KIND_WISHLIST)
+    updater.apply(model)
+    assert_profile(model, records, 2)
+
+    # A model loaded later was trained with the removed records; they are taken out again
+    reloaded = trained(engine, store)
+    updater.apply(reloaded)
+    for user_id in (1, 2):
+        assert_profile(reloaded, records, user_id)
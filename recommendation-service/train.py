@@ -0,0 +1,153 @@
+"""Offline training job for the hybrid recommender.
+
+Usage:
+    python train.py                  # ingest new interactions, train once and exit
+    python train.py --compact        # rebuild the interaction store first
+    python train.py --schedule       # keep ingesting every RECOMMENDER_INGEST_INTERVAL
+                                     # seconds, compact every RECOMMENDER_COMPACT_INTERVAL
+                                     # and retrain every RECOMMENDER_TRAIN_INTERVAL
+    python train.py --schedule --interval 600
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.engine import Connection
+
+from ann import build_index
+from artifacts import HybridModel, new_version, save_model
+from collaborative import RATING_SCALE, train_collaborative
+from config import (
+    ANN_DIMENSIONS, CF_ENGINE, COMPACT_INTERVAL_SECONDS, INGEST_INTERVAL_SECONDS, MODEL_DIR, SIMILAR_TOP_K,
+    TRAIN_INTERVAL_SECONDS,
+)
+from cooccurrence import build_neighbors
+from features import build_item_features, lookup_rows
+from interaction_store import InteractionStore, compact, ingest
+from loader import load_catalog, load_feature_links
+from metrics import span
+from profiles import build_profiles
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def train(conn: Connection, store: InteractionStore, cf_engine: str = CF_ENGINE) -> HybridModel:
+    started = time.perf_counter()
+    # Seconds per stage, saved with the model and reported by the service
+    stages: Dict[str, float] = {}
+    with span("load_catalog", stages):
+        catalog = load_catalog(conn)
+        links = load_feature_links(conn)
+    with span("item_features", stages):
+        item_features = build_item_features(catalog, links)
+
+    state = store.state()
+    with span("load_interactions", stages):
+        records = store.read(state)
+        interactions = store.interactions(state)
+    with span("collaborative", stages):
+        collaborative = train_collaborative(interactions, cf_engine)
+    # Interactions per catalog item, the candidate stage's popularity signal
+    rows, _ = lookup_rows(catalog.property_ids, interactions.property_ids)
+    popularity = np.bincount(rows, minlength=len(catalog)).astype(np.float64)
+    with span("neighbors", stages):
+        neighbors, neighbor_scores = build_neighbors(records, catalog.property_ids, SIMILAR_TOP_K)
+    with span("ann_index", stages):
+        ann_index = build_index(item_features.matrix, ANN_DIMENSIONS)
+    with span("user_profiles", stages):
+        user_profiles = build_profiles(records, catalog.property_ids, item_features.matrix)
+
+    model = HybridModel(
+        version=new_version(),
+        trained_at=datetime.now(timezone.utc).isoformat(),
+        item_ids=catalog.property_ids,
+        item_city_ids=catalog.city_ids,
+        item_district_ids=catalog.district_ids,
+        item_prices=catalog.column("rent_price"),
+        item_bedrooms=catalog.column("bedrooms"),
+        item_popularity=popularity,
+        item_neighbors=neighbors,
+        item_neighbor_scores=neighbor_scores,
+        item_features=item_features.matrix,
+        item_norms=item_features.norms,
+        feature_ids=item_features.feature_ids,
+        vocabulary=item_features.vocabulary,
+        idf=item_features.idf,
+        numeric_mean=item_features.numeric_mean,
+        numeric_std=item_features.numeric_std,
+        rating_scale=RATING_SCALE,
+        interactions_generation=state.generation,
+        interactions_count=state.count,
+        ann_index=ann_index,
+        user_profiles=user_profiles,
+        training_seconds=stages,
+        **collaborative,
+    )
+    logger.info("Trained model %s (%s) on %d properties and %d interactions in %.2fs",
+                model.version, model.cf_engine, len(catalog), len(interactions), time.perf_counter() - started)
+    return model
+
+
+def run_once(model_dir: str = MODEL_DIR, store: Optional[InteractionStore] = None, compact_store: bool = False) -> str:
+    # Imported here so that train() also runs against other databases (benchmark.py)
+    from db import engine
+
+    store = store or InteractionStore()
+    with engine.connect() as conn:
+        if compact_store:
+            compact(conn, store)
+        else:
+            ingest(conn, store)
+        model = train(conn, store)
+    save_model(model, model_dir)
+    return model.version
+
+
+def run_schedule(model_dir: str, train_interval: float) -> None:
+    """Ingest, compact and retrain, each on its own interval, until killed."""
+    from db import engine
+
+    store = InteractionStore()
+    last_compact = last_train = float("-inf")
+    while True:
+        started = time.monotonic()
+        try:
+            with engine.connect() as conn:
+                if started - last_compact >= COMPACT_INTERVAL_SECONDS:
+                    compact(conn, store)
+                    last_compact = started
+                else:
+                    ingest(conn, store)
+                if started - last_train >= train_interval:
+                    model = train(conn, store)
+                    save_model(model, model_dir)
+                    last_train = started
+        except Exception:
+            logger.exception("Training pipeline run failed; keeping the previous model")
+        time.sleep(max(0.0, INGEST_INTERVAL_SECONDS - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hybrid recommender and write model artifacts.")
+    parser.add_argument("--schedule", action="store_true",
+                        help="keep running, ingesting continuously and retraining every --interval seconds")
+    parser.add_argument("--interval", type=int, default=TRAIN_INTERVAL_SECONDS,
+                        help="seconds between training runs in scheduled mode")
+    parser.add_argument("--compact", action="store_true",
+                        help="rebuild the interaction store from Postgres before training")
+    parser.add_argument("--model-dir", default=MODEL_DIR,
+                        help="directory to write versioned artifacts to")
+    args = parser.parse_args()
+
+    if args.schedule:
+        run_schedule(args.model_dir, args.interval)
+    else:
+        run_once(args.model_dir, compact_store=args.compact)
+
+
+if __name__ == "__main__":
+    main()